@@ -1,39 +1,109 @@
 import ujson
+import _thread
 from usr.umodbus.rtu import RTU as ModbusRTUMaster
+from usr.umodbus.planner import ReadPlanner
+from usr.umodbus.bus import BusOwner, PRIORITY_COMMAND, PRIORITY_POLL
+from usr.umodbus.scheduler import PollScheduler, PollGroup
+from usr.umodbus.cache import RegisterCache
 from usr.modules.logging import getLogger
 
 log = getLogger(__name__)
 
 
 class ModbusAdapter(object):
-    def __init__(self):
+    def __init__(self, cache_ttl=0, cache_size=512):
         super().__init__()
         self.host = ModbusRTUMaster(None)
+        # cloud requests may run in parallel threads, only the bus owner
+        # thread talks on the line, writes go ahead of reads
+        self.bus = BusOwner(self.host)
+        self.master = self.bus.client(PRIORITY_COMMAND)
+        # routine polls queue behind writes and cloud commands
+        self.scheduler = PollScheduler(self.bus.client(PRIORITY_POLL))
+        self.scheduler_started = False
+        self.bus.start()
+        # register values read within cache_ttl milliseconds are answered from memory
+        self.cache = RegisterCache(cache_size, cache_ttl) if cache_ttl > 0 else None
+        self.cache_lock = _thread.allocate_lock()
         log.info('modbus adapter init success')
 
     def add_channel(self, channel):
         self.host.update_channel(channel)
 
+    def add_poll_group(self, name, points, interval_ms, priority=0, sheddable=False, callback=None):
+        # points: [(<slave_addr>, <"COILS", "ISTS", "HREGS" or "IREGS">, <starting_addr>, <qty>)...]
+        self.scheduler.add_group(PollGroup(name, points, interval_ms, priority, sheddable, callback))
+        # the scheduler thread is started with the first group
+        if not self.scheduler_started:
+            self.scheduler_started = True
+            _thread.start_new_thread(self.scheduler.run, ())
+        log.info('poll group {} added, {} points every {} ms'.format(name, len(points), interval_ms))
+
+    def remove_poll_group(self, name):
+        self.scheduler.remove_group(name)
+
+    def poll_report(self):
+        return self.scheduler.report()
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+    def __read_through(self, table, data, read):
+        if self.cache is not None:
+            with self.cache_lock:
+                value = self.cache.get_range(data['slave'], table, data['startAddress'], data['quantity'])
+                # a write back finishing during the bus read makes the read stale
+                generation = self.cache.generation(data['slave'], table)
+            if value is not None:
+                log.info('{} served from cache'.format(table))
+                return value
+
+        value = read(data['slave'], data['startAddress'], data['quantity'])[:data['quantity']]
+        if self.cache is not None:
+            with self.cache_lock:
+                self.cache.put_range(data['slave'], table, data['startAddress'], value, generation)
+        return value
+
+    def __write_through(self, table, data, write, values=None, **kwargs):
+        try:
+            operation_status = write(data['slave'], data['startAddress'], data['value'], **kwargs)
+        except Exception:
+            # the slave may have applied the write before the error, e.g. a lost echo
+            self.__write_back(table, data, False)
+            raise
+        self.__write_back(table, data, operation_status, values)
+        return operation_status
+
+    def __write_back(self, table, data, operation_status, values=None):
+        if self.cache is None:
+            return
+        quantity = len(data['value']) if isinstance(data['value'], list) else 1
+        with self.cache_lock:
+            if operation_status and values is not None:
+                self.cache.write_range(data['slave'], table, data['startAddress'], values)
+            else:
+                self.cache.invalidate_range(data['slave'], table, data['startAddress'], quantity)
+
     def read_coils(self, data):
         """READ COILS slave_addr, coil_address, coil_qty"""
         # data: {"slave": <slave_addr>, "startAddress": <starting_addr>, "quantity": <coil_qty>}
         log.info('slave_addr={}, hreg_address={}, register_qty={}'.format(data['slave'], data['startAddress'], data['quantity']))
-        coil_status = self.host.read_coils(data['slave'], data['startAddress'], data['quantity'])
-        log.info('Status of coil coil_status: {}'.format(coil_status[data['quantity']]))
-        return self.dumps(data, coil_status[:data['quantity']])
+        coil_status = self.__read_through('COILS', data, self.master.read_coils)
+        log.info('Status of coil coil_status: {}'.format(coil_status))
+        return self.dumps(data, coil_status)
 
     def write_single_coil(self, data):
         # WRITE COILS slave_addr, coil_address, new_coil_val
         # data: {"slave": <slave_addr>, "startAddress": <starting_addr>, "value": <0 or 0xFF00>}
         log.info('slave_addr={}, hreg_address={}, value={}'.format(data['slave'], data['startAddress'], data['value']))
-        operation_status = self.host.write_single_coil(data['slave'], data['startAddress'], data['value'])
+        operation_status = self.__write_through('COILS', data, self.master.write_single_coil, [bool(data['value'])])
         log.info('Result of setting coil operation_status: {}'.format(operation_status))
         return operation_status
 
     def write_multiple_coils(self, data):
         # data: {"slave": <slave_addr>, "startAddress": <starting_addr>, "value": [0, 0, 0xFF00...]}
         log.info('slave_addr={}, hreg_address={}, register_qty={}'.format(data['slave'], data['startAddress'], data['value']))
-        operation_status = self.host.write_multiple_coils(data['slave'], data['startAddress'], data['value'])
+        operation_status = self.__write_through('COILS', data, self.master.write_multiple_coils)
         log.info('Status of ireg operation_status: {}'.format(operation_status))
         return operation_status
 
@@ -41,7 +111,7 @@ class ModbusAdapter(object):
         # READ HREGS
         # data: {"slave": <slave_addr>, "startAddress": <starting_addr>, "quantity": <register_qty>}
         log.info('slave_addr={}, hreg_address={}, register_qty={}'.format(data['slave'], data['startAddress'], data['quantity']))
-        register_value = self.host.read_holding_registers(data['slave'], data['startAddress'], data['quantity'], signed=False)
+        register_value = self.__read_through('HREGS', data, self.__read_hregs)
         log.info('Status of hreg value: {}'.format(register_value))
         return self.dumps(data, register_value)
 
@@ -49,14 +119,14 @@ class ModbusAdapter(object):
         # WRITE HREGS
         # data: {"slave": <slave_addr>, "startAddress": <starting_addr>, "value": <new_hreg_val>}
         log.info('slave_addr={}, hreg_address={}, register_qty={}'.format(data['slave'], data['startAddress'], data['value']))
-        operation_status = self.host.write_single_register(data['slave'], data['startAddress'], data['value'], signed=False)
+        operation_status = self.__write_through('HREGS', data, self.master.write_single_register, [data['value']], signed=False)
         log.info('Result of setting operation_status: {}'.format(operation_status))
         return operation_status
 
     def write_multiple_registers(self, data):
         # data: {"slave": <slave_addr>, "startAddress": <starting_addr>, "value": [<new_hreg_val>...]}
         log.info('slave_addr={}, hreg_address={}, register_qty={}'.format(data['slave'], data['startAddress'], data['value']))
-        operation_status = self.host.write_multiple_registers(data['slave'], data['startAddress'], data['value'], signed=False)
+        operation_status = self.__write_through('HREGS', data, self.master.write_multiple_registers, data['value'], signed=False)
         log.info('Status of ireg operation_status: {}'.format(operation_status))
         return operation_status
 
@@ -64,18 +134,40 @@ class ModbusAdapter(object):
         # READ ISTS
         # data: {"slave": <slave_addr>, "startAddress": <starting_addr>, "quantity": <input_qty>}
         log.info('slave_addr={}, hreg_address={}, register_qty={}'.format(data['slave'], data['startAddress'], data['quantity']))
-        input_status = self.host.read_discrete_inputs(data['slave'], data['startAddress'], data['quantity'])
-        log.info('Status of ist input_status: {}'.format(input_status[:data['quantity']]))
-        return self.dumps(data, input_status[:data['quantity']])
+        input_status = self.__read_through('ISTS', data, self.master.read_discrete_inputs)
+        log.info('Status of ist input_status: {}'.format(input_status))
+        return self.dumps(data, input_status)
 
     def read_input_registers(self, data):
         # READ IREGS
         # data: {"slave": <slave_addr>, "startAddress": <starting_addr>, "quantity": <register_qty>}
         log.info('slave_addr={}, hreg_address={}, register_qty={}'.format(data['slave'], data['startAddress'], data['quantity']))
-        register_value = self.host.read_input_registers(data['slave'], data['startAddress'], data['quantity'], signed=False)
+        register_value = self.__read_through('IREGS', data, self.__read_iregs)
         log.info('Status of ireg register_value: {}'.format(register_value))
         return self.dumps(data, register_value)
 
+    def __read_hregs(self, slave_addr, starting_addr, register_qty):
+        return self.master.read_holding_registers(slave_addr, starting_addr, register_qty, signed=False)
+
+    def __read_iregs(self, slave_addr, starting_addr, register_qty):
+        return self.master.read_input_registers(slave_addr, starting_addr, register_qty, signed=False)
+
+    def read_points(self, data):
+        # READ scattered points, adjacent ranges are merged into one request
+        # data: {"points": [{"slave": <slave_addr>, "table": <"COILS", "ISTS", "HREGS" or "IREGS">,
+        #                    "startAddress": <starting_addr>, "quantity": <qty>}...], "gap": <max_gap>}
+        points = [(p['slave'], p['table'], p['startAddress'], p['quantity']) for p in data['points']]
+        planner = ReadPlanner(gap=data.get('gap', 0))
+        blocks = planner.plan(points)
+        log.info('read {} points with {} requests'.format(len(points), len(blocks)))
+        planner.execute(self.master, blocks)
+        for block in blocks:
+            if block.error is not None:
+                log.error('{} failed: {}'.format(block, block.error))
+        for point, value in zip(data['points'], planner.split(points, blocks)):
+            point.update({'value': None if value is None else list(value)})
+        return ujson.dumps(data)
+
     def dumps(self, data, value):
         data.update({'value': list(value)})
         return ujson.dumps(data)
@@ -27,6 +27,7 @@ class Serial(object):
                  rs485_direction_pin=""):
 
         uart_port = getattr(UART, "UART%d" % int(uart))
+        self.baudrate = buadrate
         self._uart = UART(uart_port, buadrate, databits, parity, stopbits, flowctl)
         # init rs458 rx/tx pin
         if rs485_direction_pin != "":
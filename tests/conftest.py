@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Host test setup
+
+The umodbus modules fall back to the CPython standard library where the
+MicroPython modules are missing. The only difference left is the queue of
+QuecPython, which calls qsize size.
+"""
+
+# system packages
+import os
+import queue
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not hasattr(queue.Queue, 'size'):
+    queue.Queue.size = queue.Queue.qsize
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import json
+import logging
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeMaster(object):
+    """Master lookalike with a register table, writes fail while error is set"""
+    def __init__(self):
+        self.hregs = list(range(100, 120))
+        self.coils = [False] * 16
+        self.reads = 0
+        self.error = None
+
+    def read_holding_registers(self, slave_addr, starting_addr, register_qty, signed=True):
+        self.reads += 1
+        return self.hregs[starting_addr:starting_addr + register_qty]
+
+    def read_coils(self, slave_addr, starting_addr, coil_qty):
+        self.reads += 1
+        return self.coils[starting_addr:starting_addr + coil_qty]
+
+    def write_single_register(self, slave_addr, register_address, register_value, signed=True):
+        # the slave applies the write, the echo may get lost afterwards
+        self.hregs[register_address] = register_value
+        if self.error is not None:
+            raise self.error
+        return True
+
+    def write_multiple_coils(self, slave_addr, starting_address, output_values):
+        for offset, value in enumerate(output_values):
+            self.coils[starting_address + offset] = bool(value)
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+@pytest.fixture
+def adapter(monkeypatch):
+    # the adapter imports its modules the way the QuecPython firmware lays them out
+    usr = types.ModuleType('usr')
+    usr.__path__ = [ROOT]
+    usr_logging = types.ModuleType('usr.modules.logging')
+    usr_logging.getLogger = logging.getLogger
+    monkeypatch.setitem(sys.modules, 'usr', usr)
+    monkeypatch.setitem(sys.modules, 'usr.modules.logging', usr_logging)
+    monkeypatch.setitem(sys.modules, 'ujson', json)
+    monkeypatch.syspath_prepend(ROOT)
+
+    import modbus_adapter
+
+    adapter = modbus_adapter.ModbusAdapter(cache_ttl=10000)
+    adapter.master = FakeMaster()
+    yield adapter
+    adapter.bus.stop()
+
+
+def _read_hregs(adapter, start, quantity):
+    return json.loads(adapter.read_hoding_registers({'slave': 1, 'startAddress': start, 'quantity': quantity}))['value']
+
+
+def test_reads_are_served_from_cache(adapter):
+    assert _read_hregs(adapter, 2, 3) == [102, 103, 104]
+    assert _read_hregs(adapter, 3, 2) == [103, 104]
+
+    assert adapter.master.reads == 1
+    assert adapter.cache_stats()['hits'] == 1
+
+
+def test_write_updates_cached_registers(adapter):
+    _read_hregs(adapter, 0, 4)
+
+    assert adapter.write_single_register({'slave': 1, 'startAddress': 1, 'value': 7})
+    assert _read_hregs(adapter, 0, 4) == [100, 7, 102, 103]
+    assert adapter.master.reads == 1
+
+
+def test_failed_write_invalidates_cached_registers(adapter):
+    _read_hregs(adapter, 0, 4)
+    adapter.master.error = OSError('no response')
+
+    with pytest.raises(OSError):
+        adapter.write_single_register({'slave': 1, 'startAddress': 1, 'value': 7})
+
+    # the slave took the write, the cache must not answer the old value
+    assert _read_hregs(adapter, 0, 4) == [100, 7, 102, 103]
+    assert adapter.master.reads == 2
+
+
+def test_failed_coil_write_invalidates_cached_coils(adapter):
+    data = {'slave': 1, 'startAddress': 0, 'quantity': 4}
+    json.loads(adapter.read_coils(dict(data)))
+    adapter.master.error = OSError('invalid CRC')
+
+    with pytest.raises(OSError):
+        adapter.write_multiple_coils({'slave': 1, 'startAddress': 2, 'value': [1, 1]})
+
+    assert json.loads(adapter.read_coils(dict(data)))['value'] == [False, False, True, True]
+    assert adapter.master.reads == 2
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import asyncio
+import struct
+
+# custom packages
+from umodbus import const as Const
+from umodbus.async_server import AsyncTCPServer
+from umodbus.async_tcp import AsyncTCP
+from umodbus.modbus import ModbusTCP
+
+
+def run(test):
+    async def main():
+        modbus = ModbusTCP()
+        modbus.add_hreg(0, [1, 2, 3])
+        modbus.add_ireg(0, 0)
+
+        server = AsyncTCPServer(modbus, max_connections=4)
+        await server.start('127.0.0.1', 0)
+        try:
+            await test(modbus, server, server._server.sockets[0].getsockname()[1])
+        finally:
+            await server.stop()
+
+    asyncio.run(main())
+
+
+async def _transact(reader, writer, pdu, trans_id=1):
+    writer.write(struct.pack('>HHHB', trans_id, 0, len(pdu) + 1, 1) + pdu)
+    await writer.drain()
+
+    trans_id, _, length, _ = struct.unpack('>HHHB', await reader.readexactly(7))
+    return await reader.readexactly(length - 1)
+
+
+def test_serves_masters_concurrently():
+    async def test(modbus, server, port):
+        masters = [AsyncTCP('127.0.0.1', port) for _ in range(4)]
+        for master in masters:
+            await master.connect()
+
+        results = await asyncio.gather(*[master.read_holding_registers(1, 0, 3) for master in masters])
+        assert [list(values) for values in results] == [[1, 2, 3]] * 4
+
+        assert await masters[0].write_single_register(1, 1, 7)
+        assert modbus.get_hreg(0) == [1, 7, 3]
+        assert server.connections == 4
+        assert server.requests == 5
+
+        for master in masters:
+            await master.close()
+
+    run(test)
+
+
+def test_bad_requests_keep_the_session():
+    async def test(modbus, server, port):
+        modbus.set_provider('IREGS', 0, lambda: 1 // 0)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+        # too short for its function code
+        assert await _transact(reader, writer, b'\x03\x00') == \
+            bytes([0x83, Const.ILLEGAL_DATA_VALUE])
+        # a failing provider
+        assert await _transact(reader, writer, b'\x04\x00\x00\x00\x01') == \
+            bytes([0x84, Const.SERVER_DEVICE_FAILURE])
+
+        # processing raises
+        modbus._banks['HREGS'].read = None
+        assert await _transact(reader, writer, b'\x03\x00\x00\x00\x01') == \
+            bytes([0x83, Const.SERVER_DEVICE_FAILURE])
+        del modbus._banks['HREGS'].read
+
+        assert await _transact(reader, writer, b'\x03\x00\x00\x00\x03') == b'\x03\x06\x00\x01\x00\x02\x00\x03'
+
+        writer.close()
+        await writer.wait_closed()
+
+    run(test)
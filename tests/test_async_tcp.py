@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import asyncio
+import struct
+import time
+
+import pytest
+
+# custom packages
+from umodbus.async_tcp import AsyncTCP
+
+SILENT_ADDRESS = 9999
+
+
+async def _slave(reader, writer):
+    # answers after 50 ms, FC03 with the start address as value
+    try:
+        while True:
+            trans_id, _, length, unit_id = struct.unpack('>HHHB', await reader.readexactly(7))
+            pdu = await reader.readexactly(length - 1)
+            function_code, start, qty = struct.unpack_from('>BHH', pdu)
+
+            await asyncio.sleep(0.05)
+            if start == SILENT_ADDRESS:
+                continue
+
+            if function_code == 3:
+                response = bytes([3, qty * 2]) + struct.pack('>H', start) * qty
+            elif function_code == 1:
+                response = bytes([1, 1, 0b101])
+            else:
+                response = pdu[:5]
+
+            writer.write(struct.pack('>HHHB', trans_id, 0, len(response) + 1, unit_id) + response)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+
+
+def run(test):
+    async def main():
+        server = await asyncio.start_server(_slave, '127.0.0.1', 0, backlog=256)
+        try:
+            await test(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_sessions_run_concurrently():
+    async def test(port):
+        masters = [AsyncTCP('127.0.0.1', port) for _ in range(50)]
+        for master in masters:
+            await master.connect()
+
+        start = time.monotonic()
+        results = await asyncio.gather(*[master.read_holding_registers(1, index, 2)
+                                         for index, master in enumerate(masters)])
+
+        # one round trip of 50 ms, not 50 of them
+        assert time.monotonic() - start < 0.5
+        assert [list(values) for values in results] == [[index, index] for index in range(50)]
+
+        for master in masters:
+            await master.close()
+
+    run(test)
+
+
+def test_requests_of_one_session():
+    async def test(port):
+        master = AsyncTCP('127.0.0.1', port)
+        await master.connect()
+
+        assert list(await master.read_coils(1, 0, 3)) == [True, False, True]
+        assert await master.write_single_register(1, 5, 7)
+
+        start = time.monotonic()
+        with pytest.raises(OSError):
+            await master.read_holding_registers(1, SILENT_ADDRESS, 1, timeout=0.2)
+        assert time.monotonic() - start < 0.4
+
+        # the session recovers after the timeout
+        assert list(await master.read_holding_registers(1, 3, 1)) == [3]
+        await master.close()
+
+    run(test)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import pytest
+
+# custom packages
+from umodbus.bank import RegisterBank
+from umodbus.common import BitView
+
+
+def test_adjacent_and_overlapping_ranges_are_merged():
+    bank = RegisterBank()
+    bank.define(0, 4)
+    bank.write(0, [1, 2, 3, 4])
+    bank.define(4, 2)
+    bank.define(10, 2)
+    bank.define(3, 8)
+
+    assert bank.segments == [(0, 12)]
+    assert list(bank.read(0, 6)) == [1, 2, 3, 4, 0, 0]
+
+
+def test_ranges_across_a_gap_are_not_readable():
+    bank = RegisterBank()
+    bank.define(0, 2)
+    bank.define(5, 2)
+
+    assert bank.contains(0, 2)
+    assert not bank.contains(1, 5)
+    assert not bank.contains(0, 0)
+    with pytest.raises(KeyError):
+        bank.read(1, 5)
+    with pytest.raises(KeyError):
+        bank.write(6, [1, 2])
+
+
+def test_undefine_splits_segments():
+    bank = RegisterBank()
+    bank.define(0, 10)
+    bank.write(0, list(range(10)))
+    bank.undefine(3, 2)
+
+    assert bank.segments == [(0, 3), (5, 5)]
+    assert list(bank.read(5, 5)) == [5, 6, 7, 8, 9]
+
+
+def test_bits_are_packed():
+    bank = RegisterBank(bits=True)
+    bank.define(0, 10)
+    bank.write(2, [True, 1, 0])
+
+    assert bank.bits
+    assert bank.read(0, 5) == [False, False, True, True, False]
+    assert len(bank._data[0]) == 2
+
+
+def test_registers_are_unsigned_16_bit():
+    bank = RegisterBank()
+    bank.define(0, 1)
+    bank.write(0, [0xFFFF])
+
+    assert bank.read(0, 1).typecode == 'H'
+    assert list(bank.read(0, 1)) == [0xFFFF]
+
+
+def test_negative_registers_are_stored_unsigned():
+    bank = RegisterBank()
+    bank.define(0, 3)
+    bank.write(0, [-5, 0x12345, 7])
+
+    assert list(bank.read(0, 3)) == [65531, 0x2345, 7]
+
+
+def test_bit_read_is_a_view():
+    bank = RegisterBank(bits=True)
+    bank.define(0, 20)
+    view = bank.read(3, 10)
+    bank.write(4, [True])
+
+    assert isinstance(view, BitView)
+    assert len(view) == 10
+    assert view[1] is True
+    assert view._data is bank._data[0]
+
+
+def test_merged_bits_keep_their_values():
+    bank = RegisterBank(bits=True)
+    bank.define(0, 20)
+    bank.write(0, [i % 3 == 0 for i in range(20)])
+    bank.define(5, 4)
+    bank.write(5, [True, False, True, True])
+    bank.define(8, 20)
+
+    expected = [i % 3 == 0 for i in range(20)] + [False] * 8
+    expected[5:9] = [True, False, True, True]
+    assert bank.segments == [(0, 28)]
+    assert list(bank.read(0, 28)) == expected
+
+    bank.undefine(10, 3)
+    assert list(bank.read(13, 15)) == expected[13:]
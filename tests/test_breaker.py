@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import time
+
+import pytest
+
+# custom packages
+from umodbus import breaker
+from umodbus.breaker import CircuitBreaker
+from umodbus.rtu import RTU
+
+
+class BrokenChannel(object):
+    """Serial lookalike whose uart fails on write"""
+    def read(self, nbytes, timeout=0):
+        return b''
+
+    def write(self, data):
+        raise OSError('uart error')
+
+
+class SilentChannel(BrokenChannel):
+    def write(self, data):
+        pass
+
+
+def test_opens_after_threshold_and_probes():
+    cb = CircuitBreaker(threshold=2, backoff_ms=20, max_backoff_ms=40)
+
+    cb.failure(1)
+    assert cb.allow(1)
+    cb.failure(1)
+    assert cb.state(1) == breaker.STATE_OPEN
+    assert not cb.allow(1)
+
+    time.sleep(0.03)
+    assert cb.allow(1)
+    assert cb.state(1) == breaker.STATE_HALF_OPEN
+    assert not cb.allow(1)
+
+    cb.success(1)
+    assert cb.state(1) == breaker.STATE_CLOSED
+
+
+def test_silent_slave_opens_circuit():
+    rtu = RTU(None, timeout=10)
+    rtu.update_channel(SilentChannel())
+    rtu.set_breaker(threshold=1, backoff_ms=1000)
+
+    with pytest.raises(OSError):
+        rtu.read_holding_registers(1, 0, 1)
+    assert rtu.breaker.state(1) == breaker.STATE_OPEN
+
+    with pytest.raises(OSError, match='request skipped'):
+        rtu.read_holding_registers(1, 0, 1)
+
+
+def test_failing_uart_during_probe_reopens_circuit():
+    rtu = RTU(None, timeout=10)
+    rtu.update_channel(BrokenChannel())
+    rtu.set_breaker(threshold=1, backoff_ms=20)
+
+    rtu.breaker.failure(1)
+    time.sleep(0.03)
+
+    with pytest.raises(OSError, match='uart error'):
+        rtu.read_holding_registers(1, 0, 1)
+    assert rtu.breaker.state(1) == breaker.STATE_OPEN
+
+    with pytest.raises(OSError, match='uart error'):
+        rtu.send_receive_pdu(2, b'\x03\x00\x00\x00\x01')
+    assert rtu.breaker._slaves[2].failures == 1
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import threading
+import time
+
+import pytest
+
+# custom packages
+from umodbus.bus import BusOwner, PRIORITY_COMMAND, PRIORITY_POLL, PRIORITY_WRITE
+from umodbus.scheduler import PollGroup, PollScheduler
+
+
+class GatedHost(object):
+    """Master lookalike which records its calls, the first one blocks"""
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+
+    def read_holding_registers(self, slave_addr, starting_addr, register_qty, signed=True):
+        if not self.calls:
+            self.calls.append(('blocker', slave_addr))
+            self.gate.wait(2)
+        else:
+            self.calls.append(('read', slave_addr))
+        if slave_addr < 0:
+            raise OSError('no response')
+        return [0] * register_qty
+
+    def write_single_register(self, slave_addr, register_address, register_value, signed=True):
+        self.calls.append(('write', slave_addr))
+        return True
+
+
+@pytest.fixture
+def bus():
+    bus = BusOwner(GatedHost())
+    bus.start()
+    yield bus
+    bus._host.gate.set()
+    bus.stop()
+
+
+def _block(bus):
+    # keeps the worker busy while the other calls queue up
+    blocker = bus.submit('read_holding_registers', 9, 0, 1, priority=PRIORITY_COMMAND)
+    _wait_pending(bus, 0)
+    return blocker
+
+
+def _wait_pending(bus, count):
+    for _ in range(200):
+        if bus.pending == count:
+            return
+        time.sleep(0.005)
+    raise AssertionError('{} calls pending instead of {}'.format(bus.pending, count))
+
+
+def test_scheduled_polls_queue_behind_commands_and_writes():
+    host = GatedHost()
+    bus = BusOwner(host)
+    bus.start()
+
+    # keeps the worker busy while the other calls queue up
+    blocker = bus.submit('read_holding_registers', 9, 0, 1, priority=PRIORITY_COMMAND)
+    _wait_pending(bus, 0)
+
+    scheduler = PollScheduler(bus.client(PRIORITY_POLL))
+    scheduler.add_group(PollGroup('routine', [(1, 'HREGS', 0, 2)], 1000))
+    threads = [threading.Thread(target=scheduler.run_once)]
+    threads[0].start()
+    _wait_pending(bus, 1)
+
+    command = bus.client(PRIORITY_COMMAND)
+    for target, args in ((command.read_holding_registers, (2, 0, 1)),
+                         (command.write_single_register, (3, 0, 1))):
+        thread = threading.Thread(target=target, args=args)
+        thread.start()
+        threads.append(thread)
+        _wait_pending(bus, len(threads))
+
+    host.gate.set()
+    blocker.result()
+    for thread in threads:
+        thread.join(2)
+
+    assert host.calls == [('blocker', 9), ('write', 3), ('read', 2), ('read', 1)]
+    assert scheduler.get_group('routine').values == [[0, 0]]
+
+
+def test_writes_overtake_queued_polls_in_order(bus):
+    blocker = _block(bus)
+
+    txns = [bus.submit('read_holding_registers', 1, 0, 1, priority=PRIORITY_POLL),
+            bus.submit('read_holding_registers', 2, 0, 1, priority=PRIORITY_POLL),
+            bus.submit('write_single_register', 3, 0, 1, priority=PRIORITY_WRITE),
+            bus.submit('read_holding_registers', 4, 0, 1, priority=PRIORITY_COMMAND),
+            bus.submit('write_single_register', 5, 0, 1, priority=PRIORITY_WRITE)]
+
+    bus._host.gate.set()
+    blocker.result()
+    for txn in txns:
+        txn.result()
+
+    # most urgent first, first come first served within a priority
+    assert bus._host.calls == [('blocker', 9), ('write', 3), ('write', 5),
+                               ('read', 4), ('read', 1), ('read', 2)]
+
+
+def test_worker_survives_failing_calls(bus):
+    bus._host.gate.set()
+    bus.call('read_holding_registers', 9, 0, 1)
+
+    with pytest.raises(OSError, match='no response'):
+        bus.call('read_holding_registers', -1, 0, 1)
+    with pytest.raises(AttributeError):
+        bus.call('read_file_record', 1)
+
+    assert bus.call('read_holding_registers', 1, 0, 2) == [0, 0]
+
+
+def test_stop_fails_queued_calls_and_ends_the_worker(bus):
+    blocker = _block(bus)
+    queued = bus.submit('read_holding_registers', 1, 0, 1)
+
+    bus.stop()
+    with pytest.raises(OSError, match='bus stopped'):
+        queued.result()
+
+    # the running call completes, nothing runs after it
+    bus._host.gate.set()
+    assert blocker.result() == [0]
+    late = bus.submit('read_holding_registers', 2, 0, 1)
+    time.sleep(0.05)
+    assert bus.pending == 1
+    assert bus._host.calls == [('blocker', 9)]
+
+    # a restart picks up the queued call
+    bus.start()
+    assert late.result() == [0]
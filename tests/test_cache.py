@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import time
+
+# custom packages
+from umodbus.cache import LRUCache, RegisterCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+
+    cache.put('c', 3)
+    assert cache.keys() == ['a', 'c']
+    assert cache.evictions == 1
+
+
+def test_range_expires_after_ttl():
+    cache = RegisterCache(maxsize=16, ttl_ms=20)
+    cache.put_range(1, 'HREGS', 10, [1, 2, 3])
+
+    assert cache.get_range(1, 'HREGS', 10, 3) == [1, 2, 3]
+    assert cache.get_range(1, 'HREGS', 10, 4) is None
+
+    time.sleep(0.03)
+    assert cache.get_range(1, 'HREGS', 10, 3) is None
+
+
+def test_read_overlapping_a_write_is_not_stored():
+    cache = RegisterCache(maxsize=16)
+
+    # a read starts, a write finishes before the read returns
+    generation = cache.generation(1, 'HREGS')
+    cache.write_range(1, 'HREGS', 10, [42])
+    assert not cache.put_range(1, 'HREGS', 10, [7, 8], generation)
+
+    assert cache.get_range(1, 'HREGS', 10, 1) == [42]
+    assert cache.get_range(1, 'HREGS', 11, 1) is None
+    assert cache.stats()['stale'] == 1
+
+    # other slaves and tables are not affected
+    generation = cache.generation(1, 'HREGS')
+    cache.invalidate_range(2, 'HREGS', 10, 1)
+    cache.invalidate_range(1, 'COILS', 10, 1)
+    assert cache.put_range(1, 'HREGS', 10, [7, 8], generation)
+    assert cache.get_range(1, 'HREGS', 10, 2) == [7, 8]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import pytest
+
+# custom packages
+from umodbus.changelog import ChangeLog
+from umodbus.modbus import Modbus
+
+
+def test_read_after_sequence_and_lost_events():
+    log = ChangeLog(capacity=4)
+    for address in range(6):
+        log.append('HREGS', address, address * 10, timestamp=address)
+
+    assert log.seq == 6
+    assert log.first_seq == 3
+
+    events, lost = log.read(0)
+    assert [event[0] for event in events] == [3, 4, 5, 6]
+    assert lost == 2
+
+    events, lost = log.read(4, limit=1)
+    assert events == [(5, 4, 'HREGS', 4, 40)]
+    assert lost == 0
+
+    assert log.read(6) == ([], 0)
+
+
+def test_changed_registers_survive_log_overflow():
+    modbus = Modbus(None, [1], change_log_size=4)
+
+    modbus._set_changed_register('HREGS', 1, 11)
+    modbus._set_changed_register('COILS', 2, True)
+    for value in range(8):
+        modbus._set_changed_register('HREGS', 3, value)
+
+    # the ring only holds the latest writes to address 3
+    events, lost = modbus.changes_since(0)
+    assert [event[3] for event in events] == [3, 3, 3, 3]
+    assert lost == 6
+
+    changed = modbus.changed_registers
+    assert set(changed['HREGS']) == {1, 3}
+    assert changed['HREGS'][3]['val'] == 7
+    assert changed['COILS'][2]['val'] is True
+
+
+def test_remove_changed_register():
+    modbus = Modbus(None, [1])
+    modbus._set_changed_register('HREGS', 1, 11)
+    timestamp = modbus.changed_hregs[1]['time']
+
+    assert not modbus._remove_changed_register('HREGS', 1, timestamp + 1)
+    assert modbus._remove_changed_register('HREGS', 1, timestamp)
+    assert modbus.changed_hregs == {}
+
+    with pytest.raises(KeyError):
+        modbus._remove_changed_register('HREGS', 1, timestamp)
+    with pytest.raises(KeyError):
+        modbus._set_changed_register('IREGS', 1, 11)
+
+    # the change log still has the removed write
+    assert modbus.changes_since(0)[0][0][4] == 11
+
+
+def test_changed_registers_are_not_rebuilt_per_access():
+    modbus = Modbus(None, [1])
+    modbus._set_changed_register('HREGS', 1, 11)
+
+    assert modbus.changed_registers is modbus.changed_registers
+    assert modbus.changed_hregs is modbus.changed_registers['HREGS']
+
+
+def test_removed_registers_drop_their_changes():
+    modbus = Modbus(None, [1])
+    modbus.add_hreg(0, [0, 0, 0])
+    modbus.add_hreg(2, 0)
+    for address in range(3):
+        modbus._set_changed_register('HREGS', address, 5)
+
+    # address 2 is still defined by the single register
+    modbus.remove_hreg(0)
+    assert list(modbus.changed_hregs) == [2]
+
+    modbus.remove_hreg(2)
+    assert modbus.changed_hregs == {}
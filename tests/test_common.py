@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import pytest
+
+# custom packages
+from umodbus.common import BitView, registers_from_bytes
+
+DATA = bytes([0b10110101, 0b00000011, 0xFF])
+BITS = [bool(DATA[i >> 3] & (1 << (i & 7))) for i in range(19)]
+
+
+def test_bit_view_indexing():
+    view = BitView(DATA, 19)
+
+    assert len(view) == 19
+    assert list(view) == BITS
+    assert view == BITS
+    assert view[-1] == BITS[-1]
+
+    with pytest.raises(IndexError):
+        view[19]
+
+
+@pytest.mark.parametrize('index', [slice(None), slice(3, 10), slice(-5, None), slice(None, None, -1),
+                                   slice(1, 15, 3), slice(20, 30), slice(-100, 2)])
+def test_bit_view_slices_like_a_list(index):
+    view = BitView(DATA, 19)
+
+    assert list(view[index]) == BITS[index]
+    assert list(view[3:][index]) == BITS[3:][index]
+
+
+def test_registers_from_bytes():
+    assert list(registers_from_bytes(b'\xff\xfe\x00\x01')) == [-2, 1]
+    assert list(registers_from_bytes(b'\xff\xfe\x00\x01', False)) == [0xFFFE, 1]
+    assert registers_from_bytes(b'\x00\x05', False).typecode == 'H'
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import os
+import struct
+
+# custom packages
+from umodbus import crc
+from umodbus.crc import CRC16, CRC16_INIT, check, crc16
+
+
+def test_known_value():
+    # read holding registers 0..1 of slave 1
+    assert crc16(b'\x01\x03\x00\x00\x00\x02') == 0x0BC4
+
+
+def test_matches_bytewise_loop_for_all_lengths():
+    data = os.urandom(300)
+
+    for length in (0, 1, 2, 31, 32, 33, 64, 255, 300):
+        assert crc16(data[:length]) == crc._crc16_bytewise(data[:length])
+
+
+def test_range_and_resume():
+    data = bytearray(os.urandom(100))
+
+    assert crc16(data, start=10, end=90) == crc16(data[10:90])
+    assert crc16(data[50:], crc16(data[:50])) == crc16(data)
+    assert crc16(memoryview(data)) == crc16(bytes(data))
+
+
+def test_check_and_resumable_state():
+    frame = b'\x01\x03\x04\x00\x01\x00\x02'
+    frame += struct.pack('<H', crc16(frame))
+
+    assert check(frame)
+    assert not check(frame[:-1] + b'\x00')
+    assert not check(frame[:2])
+
+    state = CRC16(frame[:3])
+    state.update(frame, 3)
+    assert state.is_valid()
+
+    state.reset()
+    assert state.crc == CRC16_INIT
+    state.update(frame, 0, len(frame) - 2)
+    assert state.digest() == frame[-2:]
+
+    buf = bytearray(4)
+    state.pack_into(buf, 1)
+    assert bytes(buf[1:3]) == frame[-2:]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import struct
+
+# custom packages
+from umodbus.crc import crc16
+from umodbus.framer import RTUFramer, frame_length, UNKNOWN_LENGTH, INVALID_FRAME
+
+
+def _adu(data):
+    return data + struct.pack('<H', crc16(data))
+
+
+READ_REQUEST = _adu(b'\x01\x03\x00\x00\x00\x02')
+READ_RESPONSE = _adu(b'\x01\x03\x04\x00\x01\x00\x02')
+WRITE_REQUEST = _adu(b'\x01\x10\x00\x00\x00\x02\x04\x00\x01\x00\x02')
+EXCEPTION_RESPONSE = _adu(b'\x01\x83\x02')
+
+
+def test_frame_length_from_header():
+    assert frame_length(READ_REQUEST[:1], request=True) == 0
+    assert frame_length(READ_REQUEST[:2], request=True) == 8
+    assert frame_length(READ_RESPONSE[:2]) == 0
+    assert frame_length(READ_RESPONSE[:3]) == 9
+    assert frame_length(WRITE_REQUEST[:7], request=True) == 13
+    assert frame_length(EXCEPTION_RESPONSE[:2]) == 5
+    assert frame_length(b'\x01\x83', request=True) == INVALID_FRAME
+    assert frame_length(b'\x01\x00') == INVALID_FRAME
+    assert frame_length(b'\x01\x41', request=True) == UNKNOWN_LENGTH
+
+
+def test_frames_split_over_chunks():
+    framer = RTUFramer()
+    stream = READ_RESPONSE + EXCEPTION_RESPONSE
+
+    frames = []
+    for pos in range(0, len(stream), 3):
+        frames.extend(framer.feed(stream[pos:pos + 3]))
+
+    assert frames == [READ_RESPONSE, EXCEPTION_RESPONSE]
+    assert framer.pending == 0
+
+
+def test_back_to_back_requests_in_one_chunk():
+    framer = RTUFramer(request=True)
+
+    assert framer.feed(READ_REQUEST + WRITE_REQUEST + READ_REQUEST[:4]) == [READ_REQUEST, WRITE_REQUEST]
+    assert framer.pending == 4
+    assert framer.feed(READ_REQUEST[4:]) == [READ_REQUEST]
+
+
+def test_skips_garbage_in_front_of_a_frame():
+    framer = RTUFramer()
+
+    assert framer.feed(b'\x00\x00' + READ_RESPONSE) == [READ_RESPONSE]
+
+
+def test_bad_crc_is_dropped_on_silence():
+    framer = RTUFramer()
+    corrupted = READ_RESPONSE[:-1] + bytes([READ_RESPONSE[-1] ^ 0xFF])
+
+    # a shifted header may claim a longer frame, the silence ends it
+    assert framer.feed(corrupted) == []
+    framer.flush()
+    assert framer.feed(READ_RESPONSE) == [READ_RESPONSE]
+
+
+def test_flush_returns_pending_bytes():
+    framer = RTUFramer(request=True)
+
+    assert framer.feed(b'\x01\x41\x00') == []
+    assert framer.flush() == b'\x01\x41\x00'
+    assert framer.pending == 0
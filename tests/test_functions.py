@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import struct
+
+import pytest
+
+# custom packages
+from umodbus import const as Const
+from umodbus import functions, structs
+
+
+def test_register_response_into_buffer():
+    buf = bytearray(16)
+    length = functions.response_into(buf, 3, Const.READ_HOLDING_REGISTERS, 0, 3, None, [1, -2, 3])
+
+    assert length == 8
+    assert bytes(buf[3:3 + length]) == struct.pack('>BBhhh', 3, 6, 1, -2, 3)
+    assert buf[:3] == bytearray(3)
+
+
+def test_response_wraps_response_into():
+    assert functions.response(Const.READ_INPUT_REGISTER, 0, 2, None, [0xFFFF, 1], signed=False) == \
+        struct.pack('>BBHH', 4, 4, 0xFFFF, 1)
+    assert functions.response(Const.READ_HOLDING_REGISTERS, 0, 2, None, [-1, 0xFFFF], signed=[True, False]) == \
+        struct.pack('>BBhH', 3, 4, -1, 0xFFFF)
+    assert functions.response(Const.READ_COILS, 0, 10, None, [1, 0, 1, 0, 0, 0, 0, 0, 0, 1]) == b'\x01\x02\x05\x02'
+    assert functions.response(Const.WRITE_SINGLE_REGISTER, 7, 1, b'\x12\x34') == b'\x06\x00\x07\x12\x34'
+    assert functions.response(Const.WRITE_MULTIPLE_COILS, 7, 12, None) == b'\x0f\x00\x07\x00\x0c'
+    assert functions.response(0x2B, 0, 0, None) is None
+
+
+def test_coil_response_clears_reused_buffer():
+    buf = bytearray(b'\xff' * 8)
+    length = functions.response_into(buf, 0, Const.READ_DISCRETE_INPUTS, 0, 3, None, [0, 1, 0])
+
+    assert bytes(buf[:length]) == b'\x02\x01\x02'
+
+
+def test_register_count_is_checked():
+    with pytest.raises(ValueError):
+        functions.response(Const.READ_HOLDING_REGISTERS, 0, 126, None, [0] * 126)
+
+
+def test_layout_cache_evicts_least_recently_used():
+    structs._layouts.clear()
+    frequent = structs.layout('>BB', 1, False)
+
+    for quantity in range(2, 126):
+        structs.layout('>BB', quantity, False)
+        assert structs.layout('>BB', 1, False) is frequent
+
+    assert len(structs._layouts) == structs.MAX_LAYOUTS
+    assert ('>BB', 2, False) not in structs._layouts
+    assert ('>BB', 125, False) in structs._layouts
+
+
+def test_layout_without_struct_class():
+    compiled = structs._Layout('>BH2h')
+    buf = bytearray(8)
+
+    compiled.pack_into(buf, 1, 3, 0x1234, -1, 2)
+    assert compiled.size == 7
+    assert compiled.pack(3, 0x1234, -1, 2) == bytes(buf[1:])
+    assert compiled.unpack_from(buf, 1) == (3, 0x1234, -1, 2)
+    assert compiled.unpack(bytes(buf[1:])) == (3, 0x1234, -1, 2)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+# custom packages
+from umodbus.crc import crc16
+from umodbus.gateway import ModbusGateway
+from umodbus.rtu import RTU
+from umodbus.tcp import TCP, TCPServer
+
+SILENT_UNIT = 2
+FAILING_UNIT = 3
+
+
+class FakeBus(object):
+    """Serial lookalike with RTU slaves answering after 10 ms"""
+    def __init__(self):
+        self._rx = bytearray()
+        self._cv = threading.Condition()
+
+    def write(self, data):
+        frame = bytes(data)
+        unit_id = frame[0]
+        if unit_id == SILENT_UNIT:
+            return
+
+        if unit_id == FAILING_UNIT:
+            pdu = bytes([frame[1] | 0x80, 0x02])
+        else:
+            qty = struct.unpack_from('>H', frame, 4)[0]
+            pdu = bytes([3, qty * 2]) + b'\x00\x2a' * qty
+
+        adu = bytes([unit_id]) + pdu
+        threading.Timer(0.01, self._push, (adu + struct.pack('<H', crc16(adu)),)).start()
+
+    def _push(self, data):
+        with self._cv:
+            self._rx.extend(data)
+            self._cv.notify_all()
+
+    def read(self, nbytes, timeout=0):
+        with self._cv:
+            if not self._rx and timeout:
+                self._cv.wait(None if timeout < 0 else timeout / 1000)
+            data = bytes(self._rx[:nbytes])
+            del self._rx[:nbytes]
+            return data
+
+
+@pytest.fixture
+def gateway():
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    rtu = RTU(None)
+    rtu.update_channel(FakeBus())
+    server = TCPServer()
+    server.bind('127.0.0.1', port)
+
+    gateway = ModbusGateway(server, timeout=300)
+    gateway.add_route(1, rtu)
+    gateway.add_route(SILENT_UNIT, rtu, timeout=100)
+    gateway.add_route(FAILING_UNIT, rtu)
+    thread = threading.Thread(target=gateway.run, daemon=True)
+    thread.start()
+
+    master = TCP('127.0.0.1', port)
+    yield gateway, master
+
+    master.close()
+    gateway.stop()
+    thread.join()
+    server.close()
+
+
+def test_request_is_forwarded(gateway):
+    gateway, master = gateway
+
+    assert list(master.read_holding_registers(1, 0, 3)) == [42, 42, 42]
+    assert gateway.forwarded == 1
+
+
+def test_silent_unit_answers_target_failed(gateway):
+    gateway, master = gateway
+
+    start = time.monotonic()
+    with pytest.raises(ValueError, match='exception code: 11'):
+        master.read_holding_registers(SILENT_UNIT, 0, 1)
+
+    # the route timeout, not the default one
+    assert time.monotonic() - start < 0.25
+    assert gateway.timeouts == 1
+
+
+def test_exception_of_the_unit_is_passed_on(gateway):
+    gateway, master = gateway
+
+    with pytest.raises(ValueError, match='exception code: 2'):
+        master.read_holding_registers(FAILING_UNIT, 0, 1)
+
+
+def test_unknown_unit_is_rejected(gateway):
+    gateway, master = gateway
+
+    with pytest.raises(ValueError, match='exception code: 10'):
+        master.read_holding_registers(9, 0, 1)
+    assert gateway.rejected == 1
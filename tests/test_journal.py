@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import os
+
+import pytest
+
+# custom packages
+from umodbus.async_server import _Responder
+from umodbus.common import Request
+from umodbus.journal import RegisterJournal
+from umodbus.modbus import Modbus
+
+
+def _slave():
+    modbus = Modbus(None, [1])
+    modbus.add_hreg(0, [0] * 10)
+    modbus.add_hreg(20, 0)
+    modbus.add_coil(0, [False] * 8)
+    return modbus
+
+
+def _write(modbus, pdu):
+    modbus._process_request(Request(_Responder(), b'\x01' + pdu))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'journal.bin')
+
+
+def test_writes_are_restored(path):
+    modbus = _slave()
+    journal = RegisterJournal(modbus, path, flush_ms=0)
+    assert journal.restore() == 0
+
+    _write(modbus, b'\x10\x00\x02\x00\x03\x06\x00\x07\x00\x08\x00\x09')
+    _write(modbus, b'\x06\x00\x14\x12\x34')
+    _write(modbus, b'\x05\x00\x03\xff\x00')
+    assert journal.flush() == 3
+    assert journal.flush() == 0
+
+    restored = _slave()
+    journal = RegisterJournal(restored, path)
+    assert journal.restore() == os.path.getsize(path)
+
+    assert restored.get_hreg(0)[:5] == [0, 0, 7, 8, 9]
+    assert restored.get_hreg(20) == 0x1234
+    assert restored.get_coil(0)[3] is True
+    # restoring is no write of a master, nothing to flush
+    assert restored.changed_hregs == {}
+    assert journal.flush() == 0
+
+
+def test_torn_tail_is_dropped(path):
+    modbus = _slave()
+    journal = RegisterJournal(modbus, path)
+    journal.restore()
+
+    _write(modbus, b'\x06\x00\x01\x00\x05')
+    journal.flush()
+    valid = os.path.getsize(path)
+    _write(modbus, b'\x06\x00\x02\x00\x06')
+    journal.flush()
+
+    # a power cut in the middle of the second record
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+    restored = _slave()
+    journal = RegisterJournal(restored, path)
+    assert journal.restore() == valid
+    assert restored.get_hreg(0)[1:3] == [5, 0]
+    # the journal was rewritten as a snapshot
+    assert journal.compactions == 1
+
+
+def test_compaction_bounds_the_journal(path):
+    modbus = _slave()
+    journal = RegisterJournal(modbus, path, max_size=64)
+    journal.restore()
+
+    for value in range(20):
+        _write(modbus, b'\x06\x00\x01' + bytes([0, value]))
+        journal.flush()
+
+    assert journal.compactions > 0
+    assert os.path.getsize(path) <= 64 + 32
+
+    restored = _slave()
+    RegisterJournal(restored, path).restore()
+    assert restored.get_hreg(0)[1] == 19
+
+
+def test_compaction_cut_off_before_the_rename(path):
+    modbus = _slave()
+    journal = RegisterJournal(modbus, path)
+    journal.restore()
+    _write(modbus, b'\x06\x00\x01\x00\x05')
+    journal.compact()
+
+    # the old journal was removed, the snapshot not renamed yet
+    os.rename(path, path + '.tmp')
+
+    restored = _slave()
+    RegisterJournal(restored, path).restore()
+    assert restored.get_hreg(0)[1] == 5
+    assert os.path.exists(path)
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_incomplete_snapshot_is_ignored(path):
+    modbus = _slave()
+    journal = RegisterJournal(modbus, path)
+    journal.restore()
+    _write(modbus, b'\x06\x00\x01\x00\x05')
+    journal.flush()
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(b'\xa5\x01')
+
+    restored = _slave()
+    RegisterJournal(restored, path).restore()
+    assert restored.get_hreg(0)[1] == 5
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_removed_registers_are_skipped(path):
+    modbus = _slave()
+    journal = RegisterJournal(modbus, path)
+    journal.restore()
+
+    _write(modbus, b'\x06\x00\x14\x00\x05')
+    modbus.remove_hreg(20)
+    assert journal.flush() == 0
+
+
+def test_change_log_overflow_compacts(path):
+    modbus = Modbus(None, [1], change_log_size=4)
+    modbus.add_hreg(0, [0] * 10)
+    journal = RegisterJournal(modbus, path)
+    journal.restore()
+
+    for address in range(6):
+        _write(modbus, b'\x06\x00' + bytes([address, 0, address + 1]))
+    journal.flush()
+    assert journal.compactions == 1
+
+    restored = Modbus(None, [1])
+    restored.add_hreg(0, [0] * 10)
+    RegisterJournal(restored, path).restore()
+    assert restored.get_hreg(0)[:6] == [1, 2, 3, 4, 5, 6]
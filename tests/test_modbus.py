@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import struct
+
+import pytest
+
+# custom packages
+from umodbus import const as Const
+from umodbus.async_server import _Responder
+from umodbus.common import Request
+from umodbus.modbus import Modbus
+
+UNIT = 1
+
+
+def serve(modbus, pdu):
+    """Answer a request PDU from the registers, returns the response PDU"""
+    responder = _Responder()
+    modbus.handle_request(Request(responder, bytes([UNIT]) + pdu))
+
+    return responder.pdu
+
+
+@pytest.fixture
+def modbus():
+    return Modbus(None, [UNIT])
+
+
+def test_provider_is_called_on_read_and_cached(modbus):
+    calls = []
+
+    def provider():
+        calls.append(None)
+        return len(calls)
+
+    modbus.add_ireg(10, 0)
+    modbus.set_provider('IREGS', 10, provider, cache_ms=1000)
+
+    assert serve(modbus, b'\x04\x00\x0a\x00\x01') == b'\x04\x02\x00\x01'
+    assert serve(modbus, b'\x04\x00\x0a\x00\x01') == b'\x04\x02\x00\x01'
+    assert len(calls) == 1
+    assert modbus.get_ireg(10) == 1
+
+
+def test_failing_provider_answers_device_failure(modbus):
+    def provider():
+        raise OSError('sensor gone')
+
+    modbus.add_ireg(10, 0)
+    modbus.set_provider('IREGS', 10, provider)
+
+    assert serve(modbus, b'\x04\x00\x0a\x00\x01') == \
+        bytes([Const.ERROR_BIAS + 4, Const.SERVER_DEVICE_FAILURE])
+
+
+def test_write_hook_is_called_after_write(modbus):
+    written = []
+
+    modbus.add_hreg(5, [0, 0])
+    modbus.set_write_hook('HREGS', 5, lambda reg_type, address, value: written.append((reg_type, address, value)))
+
+    assert serve(modbus, b'\x10\x00\x05\x00\x02\x04\x00\x07\x00\x08') == b'\x10\x00\x05\x00\x02'
+    assert written == [('HREGS', 5, [7, 8])]
+
+    with pytest.raises(KeyError):
+        modbus.set_write_hook('HREGS', 6, print)
+
+
+def test_read_spans_added_registers(modbus):
+    modbus.add_hreg(0, list(range(60)))
+    modbus.add_hreg(60, list(range(100, 160)))
+    modbus.add_coil(0, [True, False, True])
+    modbus.add_coil(3, True)
+
+    response = serve(modbus, b'\x03\x00\x0a\x00\x64')
+    values = struct.unpack('>100H', response[2:])
+    assert (values[0], values[49], values[50], values[99]) == (10, 59, 100, 149)
+    assert serve(modbus, b'\x01\x00\x01\x00\x03') == b'\x01\x01\x06'
+
+    # getters keep the shape the registers were added with
+    assert modbus.get_hreg(60)[:2] == [100, 101]
+    assert modbus.get_coil(3) is True
+
+    modbus.remove_hreg(60)
+    assert serve(modbus, b'\x03\x00\x3b\x00\x02') == bytes([0x83, Const.ILLEGAL_DATA_ADDRESS])
+
+
+def test_signed_register_is_read_unsigned(modbus):
+    modbus.add_hreg(0, -2)
+
+    assert serve(modbus, b'\x03\x00\x00\x00\x01') == struct.pack('>BBH', 3, 2, 0xFFFE)
+
+
+def test_write_multiple_registers_and_coils(modbus):
+    modbus.add_hreg(0, [0] * 60)
+    modbus.add_coil(0, [False] * 20)
+
+    pdu = struct.pack('>BHHB', 16, 5, 50, 100) + struct.pack('>50H', *range(100, 150))
+    assert serve(modbus, pdu) == b'\x10\x00\x05\x00\x32'
+    assert modbus.get_hreg(0)[4:8] == [0, 100, 101, 102]
+    assert len(modbus.changed_hregs) == 50
+
+    assert serve(modbus, b'\x0f\x00\x02\x00\x09\x02\x0d\x01') == b'\x0f\x00\x02\x00\x09'
+    assert modbus.get_coil(0)[:12] == [False, False, True, False, True, True,
+                                       False, False, False, False, True, False]
+
+    # the range ends behind the registers
+    pdu = struct.pack('>BHHB', 16, 55, 10, 20) + bytes(20)
+    assert serve(modbus, pdu) == bytes([0x90, Const.ILLEGAL_DATA_ADDRESS])
+
+
+def test_mask_write_register(modbus):
+    modbus.add_hreg(5, 0x64)
+
+    assert serve(modbus, struct.pack('>BHHH', 22, 5, 0x00F2, 0x0025)) == struct.pack('>BHHH', 22, 5, 0x00F2, 0x0025)
+    assert modbus.get_hreg(5) == (0x64 & 0xF2) | (0x25 & ~0xF2 & 0xFFFF)
+    assert serve(modbus, struct.pack('>BHHH', 22, 6, 0, 0)) == bytes([0x96, Const.ILLEGAL_DATA_ADDRESS])
+
+
+def test_read_write_multiple_registers(modbus):
+    modbus.add_hreg(0, list(range(20)))
+
+    # write 2 registers at 10, then read 3 at 9
+    pdu = struct.pack('>BHHHHBHH', 23, 9, 3, 10, 2, 4, 7, 8)
+    assert serve(modbus, pdu) == struct.pack('>BB3H', 23, 6, 9, 7, 8)
+    assert sorted(modbus.changed_hregs) == [10, 11]
+
+    pdu = struct.pack('>BHHHHBHH', 23, 19, 3, 10, 2, 4, 7, 8)
+    assert serve(modbus, pdu) == bytes([0x97, Const.ILLEGAL_DATA_ADDRESS])
+
+
+def test_read_write_checks_write_range_before_providers(modbus):
+    calls = []
+
+    def provider():
+        calls.append(None)
+        raise OSError('sensor gone')
+
+    modbus.add_hreg(0, list(range(20)))
+    modbus.set_provider('HREGS', 0, provider)
+
+    # the write range ends behind the registers
+    pdu = struct.pack('>BHHHHBHH', 23, 0, 1, 19, 2, 4, 7, 8)
+    assert serve(modbus, pdu) == bytes([0x97, Const.ILLEGAL_DATA_ADDRESS])
+    assert calls == []
+
+    pdu = struct.pack('>BHHHHBHH', 23, 0, 1, 10, 2, 4, 7, 8)
+    assert serve(modbus, pdu) == bytes([0x97, Const.SERVER_DEVICE_FAILURE])
+    assert len(calls) == 1
+
+
+def test_read_responses_are_cached_until_a_register_changes(modbus):
+    modbus.add_hreg(0, list(range(20)))
+    modbus.add_coil(0, [False] * 4)
+
+    for _ in range(3):
+        assert serve(modbus, b'\x03\x00\x00\x00\x02') == b'\x03\x04\x00\x00\x00\x01'
+    serve(modbus, b'\x03\x00\x0a\x00\x02')
+    stats = modbus.response_cache_stats()
+    assert (stats['hits'], stats['size']) == (2, 2)
+
+    # a master write drops the overlapping responses only
+    serve(modbus, b'\x06\x00\x01\x00\x4d')
+    assert modbus._response_cache.keys() == [(UNIT, 3, 10, 2)]
+    assert serve(modbus, b'\x03\x00\x00\x00\x02') == b'\x03\x04\x00\x00\x00\x4d'
+
+    # so do local setters
+    modbus.set_hreg(0, [9] * 20)
+    assert serve(modbus, b'\x03\x00\x00\x00\x02') == b'\x03\x04\x00\x09\x00\x09'
+
+    serve(modbus, b'\x01\x00\x00\x00\x04')
+    serve(modbus, b'\x05\x00\x01\xff\x00')
+    assert serve(modbus, b'\x01\x00\x00\x00\x04') == b'\x01\x01\x02'
+
+
+def test_response_cache_can_be_disabled():
+    modbus = Modbus(None, [UNIT], response_cache_size=0)
+    modbus.add_hreg(0, 1)
+
+    assert serve(modbus, b'\x03\x00\x00\x00\x01') == b'\x03\x02\x00\x01'
+    assert modbus.response_cache_stats() == dict()
+
+
+def test_register_ranges_and_restore(modbus):
+    modbus.add_hreg(0, [1, 2])
+    modbus.add_hreg(2, 3)
+    modbus.add_coil(8, [False, False])
+
+    assert modbus.register_ranges('HREGS') == [(0, 3)]
+    assert modbus.read_range('HREGS', 1, 2) == [2, 3]
+
+    modbus.restore_range('HREGS', 0, [7, 8, 9])
+    modbus.restore_range('COILS', 8, [0, 1])
+    assert modbus.read_range('HREGS', 0, 3) == [7, 8, 9]
+    assert modbus.get_coil(8) == [False, True]
+    # restoring is no write of a master
+    assert modbus.changes_since(0) == ([], 0)
+
+    with pytest.raises(KeyError):
+        modbus.read_range('HREGS', 2, 2)
+    with pytest.raises(KeyError):
+        modbus.read_range('FOO', 0, 1)
+
+
+def test_accepts_unit_addresses():
+    assert Modbus(None, [UNIT]).accepts(UNIT)
+    assert not Modbus(None, [UNIT]).accepts(UNIT + 1)
+    assert Modbus(None, None).accepts(UNIT + 1)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import pytest
+
+# custom packages
+from umodbus.planner import ReadPlanner
+
+
+class FakeMaster(object):
+    """Master lookalike returning the address as value, slave 9 fails"""
+    def __init__(self):
+        self.requests = []
+
+    def _read(self, table, slave_addr, starting_addr, qty):
+        self.requests.append((slave_addr, table, starting_addr, qty))
+        if slave_addr == 9:
+            raise OSError('no data received from slave')
+        return list(range(starting_addr, starting_addr + qty))
+
+    def read_coils(self, slave_addr, starting_addr, coil_qty):
+        return self._read('COILS', slave_addr, starting_addr, coil_qty)
+
+    def read_discrete_inputs(self, slave_addr, starting_addr, input_qty):
+        return self._read('ISTS', slave_addr, starting_addr, input_qty)
+
+    def read_holding_registers(self, slave_addr, starting_addr, register_qty, signed=True):
+        return self._read('HREGS', slave_addr, starting_addr, register_qty)
+
+    def read_input_registers(self, slave_addr, starting_addr, register_qty, signed=True):
+        return self._read('IREGS', slave_addr, starting_addr, register_qty)
+
+
+def test_merges_adjacent_and_overlapping_points():
+    blocks = ReadPlanner().plan([(1, 'HREGS', 10, 2), (1, 'HREGS', 0, 4),
+                                 (1, 'HREGS', 4, 2), (1, 'HREGS', 11, 3)])
+
+    assert [(b.address, b.quantity, sorted(b.points)) for b in blocks] == [(0, 6, [1, 2]), (10, 4, [0, 3])]
+
+
+def test_gap_and_request_limits():
+    points = [(1, 'HREGS', 0, 1), (1, 'HREGS', 3, 1), (1, 'COILS', 0, 1), (1, 'COILS', 40, 1)]
+
+    assert len(ReadPlanner(gap=1).plan(points)) == 4
+    # 16 bits per register of gap for coils
+    assert len(ReadPlanner(gap=2).plan(points)) == 3
+    assert len(ReadPlanner(gap=3).plan(points)) == 2
+
+    # one request reads 125 registers at most
+    blocks = ReadPlanner(gap=100).plan([(1, 'HREGS', 0, 100), (1, 'HREGS', 100, 100)])
+    assert [(b.address, b.quantity) for b in blocks] == [(0, 100), (100, 100)]
+
+
+def test_slaves_and_tables_are_not_merged():
+    blocks = ReadPlanner().plan([(2, 'HREGS', 0, 1), (1, 'IREGS', 1, 1), (1, 'HREGS', 1, 1)])
+
+    assert [(b.slave, b.table) for b in blocks] == [(1, 'HREGS'), (1, 'IREGS'), (2, 'HREGS')]
+
+
+def test_invalid_points():
+    with pytest.raises(ValueError):
+        ReadPlanner().plan([(1, 'FOO', 0, 1)])
+    with pytest.raises(ValueError):
+        ReadPlanner().plan([(1, 'HREGS', 0, 126)])
+
+
+def test_read_splits_values_and_keeps_failures():
+    master = FakeMaster()
+    points = [(1, 'HREGS', 5, 2), (1, 'HREGS', 7, 1), (9, 'COILS', 0, 8), (1, 'ISTS', 3, 2)]
+
+    values = ReadPlanner().read(master, points)
+
+    assert values == [[5, 6], [7], None, [3, 4]]
+    assert len(master.requests) == 3
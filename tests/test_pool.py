@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import time
+
+import pytest
+
+# custom packages
+from umodbus import pool
+from umodbus.pool import TCPPool
+
+
+class FakeTCP(object):
+    """TCP lookalike whose connects fail with the queued errors first"""
+    errors = []
+    connects = 0
+    lookups = 0
+
+    def __init__(self, slave_ip, slave_port=502, timeout=5, connect=True, addr=None):
+        self.endpoint = (slave_ip, slave_port)
+        self.address = addr
+        self.is_connected = False
+
+    def connect(self):
+        FakeTCP.connects += 1
+        if self.address is None:
+            FakeTCP.lookups += 1
+            self.address = ('10.0.0.1', self.endpoint[1])
+        if FakeTCP.errors:
+            raise FakeTCP.errors.pop(0)
+        self.is_connected = True
+
+    def is_healthy(self):
+        return self.is_connected
+
+    def close(self):
+        self.is_connected = False
+
+
+@pytest.fixture(autouse=True)
+def fake_tcp(monkeypatch):
+    monkeypatch.setattr(pool, 'TCP', FakeTCP)
+    FakeTCP.errors = []
+    FakeTCP.connects = 0
+    FakeTCP.lookups = 0
+
+
+def test_connection_is_reused():
+    tcp_pool = TCPPool()
+
+    conn = tcp_pool.acquire('10.0.0.1')
+    tcp_pool.release(conn)
+
+    assert tcp_pool.acquire('10.0.0.1') is conn
+    assert FakeTCP.connects == 1
+
+
+def test_reconnect_waits_out_the_backoff():
+    tcp_pool = TCPPool(backoff_ms=20, wait_ms=500)
+    FakeTCP.errors = [OSError('refused'), OSError('refused')]
+
+    start = time.monotonic()
+    conn = tcp_pool.acquire('10.0.0.1')
+
+    # backoff of 20 ms, then 40 ms
+    assert time.monotonic() - start >= 0.055
+    assert conn.is_connected
+    assert FakeTCP.connects == 3
+    # the reconnects reuse the address of the refused first connect
+    assert FakeTCP.lookups == 1
+    assert tcp_pool._endpoint(conn.endpoint).backoff == 0
+
+
+def test_backoff_beyond_wait_time_fails_fast():
+    tcp_pool = TCPPool(backoff_ms=1000, wait_ms=100)
+    FakeTCP.errors = [OSError('refused')]
+
+    start = time.monotonic()
+    with pytest.raises(OSError, match='unreachable'):
+        tcp_pool.acquire('10.0.0.1')
+
+    assert time.monotonic() - start < 0.05
+    assert tcp_pool._endpoint(('10.0.0.1', 502)).in_use == 0
+
+
+def test_unexpected_connect_error_releases_the_slot():
+    tcp_pool = TCPPool(backoff_ms=0)
+    FakeTCP.errors = [ValueError('bad address')]
+
+    with pytest.raises(ValueError):
+        tcp_pool.acquire('10.0.0.1')
+    assert tcp_pool._endpoint(('10.0.0.1', 502)).in_use == 0
+
+    assert tcp_pool.acquire('10.0.0.1').is_connected
+
+
+def test_endpoint_at_its_limit_times_out():
+    tcp_pool = TCPPool(max_per_endpoint=1, wait_ms=30)
+    tcp_pool.acquire('10.0.0.1')
+
+    with pytest.raises(OSError, match='no free connection'):
+        tcp_pool.acquire('10.0.0.1')
+
+
+def test_new_connections_reuse_the_resolved_address():
+    tcp_pool = TCPPool(max_per_endpoint=2)
+
+    first = tcp_pool.acquire('plc.local')
+    second = tcp_pool.acquire('plc.local')
+    tcp_pool.release(first, discard=True)
+    third = tcp_pool.acquire('plc.local')
+
+    assert FakeTCP.connects == 3
+    assert FakeTCP.lookups == 1
+    assert third.address == second.address == ('10.0.0.1', 502)
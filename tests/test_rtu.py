@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import array
+import struct
+
+import pytest
+
+# custom packages
+from umodbus import const as Const
+from umodbus.common import Request
+from umodbus.crc import crc16
+from umodbus.modbus import ModbusRTU
+from umodbus.rtu import RTU
+
+
+class RecordingChannel(object):
+    """Serial lookalike which keeps the written frames, answers with reply"""
+    def __init__(self):
+        self.frames = []
+        self.buffers = []
+        self.reply = b''
+        self._rx = b''
+
+    def read(self, nbytes, timeout=0):
+        data, self._rx = self._rx, b''
+        return data
+
+    def write(self, data):
+        self.frames.append(bytes(data))
+        self.buffers.append(data)
+        self._rx = self.reply
+
+
+@pytest.fixture
+def rtu():
+    rtu = RTU(None, timeout=10)
+    rtu.update_channel(RecordingChannel())
+    return rtu
+
+
+def _adu(slave_addr, pdu):
+    adu = bytes([slave_addr]) + pdu
+    return adu + struct.pack('<H', crc16(adu))
+
+
+def test_request_is_encoded_in_place(rtu):
+    channel = rtu._RTU__channel
+
+    with pytest.raises(OSError):
+        rtu.read_holding_registers(1, 0x10, 2)
+    with pytest.raises(OSError):
+        rtu.read_holding_registers(2, 0x20, 3)
+
+    assert channel.frames == [
+        _adu(1, b'\x03\x00\x10\x00\x02'),
+        _adu(2, b'\x03\x00\x20\x00\x03'),
+    ]
+    # frames of the same length are written from the same view
+    assert channel.buffers[0] is channel.buffers[1]
+
+
+def test_registers_are_returned_as_array(rtu):
+    rtu._RTU__channel.reply = _adu(1, b'\x03\x04\xff\xfe\x00\x01')
+
+    values = rtu.read_holding_registers(1, 0, 2)
+    assert isinstance(values, array.array)
+    assert list(values) == [-2, 1]
+
+    assert list(rtu.read_input_registers(1, 0, 2, signed=False)) == [0xFFFE, 1]
+
+
+def test_coils_are_returned_as_bit_view(rtu):
+    rtu._RTU__channel.reply = _adu(1, b'\x01\x02\x05\x02')
+
+    coils = rtu.read_coils(1, 0, 10)
+    assert len(coils) == 10
+    assert coils == [True, False, True, False, False, False, False, False, False, True]
+    assert list(coils[8:]) == [False, True]
+
+
+def test_too_long_pdu_raises_value_error(rtu):
+    pdu = bytes(Const.MAX_ADU_LENGTH)
+
+    with pytest.raises(ValueError, match='PDU too long'):
+        rtu.send_receive_pdu(1, pdu)
+    with pytest.raises(ValueError, match='PDU too long'):
+        rtu._send(pdu, 1)
+
+    assert len(rtu._tx_buf) == Const.MAX_ADU_LENGTH
+    assert rtu._RTU__channel.frames == []
+
+
+def test_response_is_encoded_in_place(rtu):
+    rtu.send_response(5, Const.READ_HOLDING_REGISTERS, 0, 2, None, [1, 2])
+
+    frame = rtu._RTU__channel.buffers[0]
+    assert bytes(frame) == _adu(5, b'\x03\x04\x00\x01\x00\x02')
+    assert frame.obj is rtu._tx_buf
+
+
+def test_slave_sends_cached_frame():
+    modbus = ModbusRTU(3)
+    channel = RecordingChannel()
+    modbus._itf.update_channel(channel)
+    modbus.add_hreg(0, [1, 2, 3])
+
+    for _ in range(2):
+        modbus._process_request(Request(modbus._itf, b'\x03\x03\x00\x00\x00\x03'))
+
+    assert channel.frames[0] == _adu(3, b'\x03\x06\x00\x01\x00\x02\x00\x03')
+    assert channel.frames[1] == channel.frames[0]
+    assert modbus.response_cache_stats()['hits'] == 1
+
+
+def test_passthrough_returns_the_raw_reply(rtu):
+    channel = rtu._RTU__channel
+
+    channel.reply = b'\x01\x03\x02\x00\x01\xff\xff'
+    assert rtu.passthrough_send_receive(b'\x01\x03\x00\x00\x00\x01\x84\x0a') == channel.reply
+
+    # bytes in front of a valid frame are forwarded as well
+    channel.reply = b'\x00\x7f' + _adu(1, b'\x03\x02\x00\x01')
+    assert rtu.passthrough_send_receive(b'\x01\x03\x00\x00\x00\x01\x84\x0a') == channel.reply
+
+    channel.reply = b''
+    with pytest.raises(OSError):
+        rtu.passthrough_send_receive(b'\x01\x03\x00\x00\x00\x01\x84\x0a', timeout=10)
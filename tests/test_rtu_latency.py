@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Per transaction latency of the RTU master over a pty
+
+A fake slave on the other end of the pty answers with the pace of a 4800
+baud line. The master has to return as soon as the response is complete
+instead of polling, a silent slave has to cost the response deadline only.
+
+The bounds are relative to a plain reader measured under the same load,
+which waits for the known number of response bytes.
+"""
+
+# system packages
+import os
+import pty
+import select
+import struct
+import threading
+import time
+import tty
+
+import pytest
+
+# custom packages
+from umodbus.crc import crc16
+from umodbus.rtu import RTU
+
+BAUDRATE = 4800
+CHAR_S = 11 / BAUDRATE
+T35_S = 3.5 * CHAR_S
+SLAVE_ADDR = 1
+SILENT_ADDR = 2
+REGISTER_QTY = 10
+
+
+class PtyChannel(object):
+    """Serial lookalike on the tty end of a pty"""
+    def __init__(self, fd, baudrate):
+        self.baudrate = baudrate
+        self._fd = fd
+
+    def write(self, data):
+        os.write(self._fd, bytes(data))
+
+    def read(self, nbytes, timeout=0):
+        wait = None if timeout < 0 else timeout / 1000
+        if not select.select([self._fd], [], [], wait)[0]:
+            return b''
+
+        return os.read(self._fd, nbytes)
+
+
+class PtySlave(object):
+    """
+    Answers FC03 of SLAVE_ADDR on the pty, sleeps for the time the bytes
+    need on the wire. The response trickles in with gaps below t3.5.
+
+    A loaded host may still stretch a gap beyond t3.5, which ends the
+    frame early. late keeps a flag per response whether that happened.
+    """
+    def __init__(self):
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.late = []
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        fd = self.master_fd
+
+        while not self._stop.is_set():
+            if not select.select([fd], [], [], 0.05)[0]:
+                continue
+
+            try:
+                request = os.read(fd, 256)
+            except OSError:
+                return
+
+            time.sleep(len(request) * CHAR_S)
+            if request[0] != SLAVE_ADDR:
+                continue
+
+            start, qty = struct.unpack_from('>HH', request, 2)
+            adu = bytes([SLAVE_ADDR, 3, qty * 2]) + struct.pack('>{}H'.format(qty), *range(start, start + qty))
+            adu += struct.pack('<H', crc16(adu))
+
+            late = False
+            written = None
+            for pos in range(0, len(adu), 2):
+                chunk = adu[pos:pos + 2]
+                time.sleep(len(chunk) * CHAR_S)
+                os.write(fd, chunk)
+
+                now = time.monotonic()
+                if written is not None and now - written > T35_S:
+                    late = True
+                written = now
+            self.late.append(late)
+
+    def wait_answered(self, count):
+        for _ in range(100):
+            if len(self.late) >= count:
+                return
+            time.sleep(0.01)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+
+@pytest.fixture
+def slave():
+    slave = PtySlave()
+    yield slave
+    slave.close()
+
+
+@pytest.fixture
+def master(slave):
+    rtu = RTU(None, baudrate=BAUDRATE, timeout=200)
+    rtu.update_channel(PtyChannel(slave.slave_fd, BAUDRATE))
+    return rtu
+
+
+def _median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def _plain_read(channel, request, length):
+    # the baseline, reads until the known response length arrived
+    start = time.monotonic()
+    channel.write(request)
+
+    received = b''
+    while len(received) < length:
+        received += channel.read(256, 1000)
+
+    return time.monotonic() - start
+
+
+def test_latency_is_wire_time(master, slave):
+    channel = master._RTU__channel
+    request = bytes([SLAVE_ADDR, 3, 0, 100, 0, REGISTER_QTY])
+    request += struct.pack('<H', crc16(request))
+    response_length = 5 + REGISTER_QTY * 2
+    wire_s = (len(request) + response_length) * CHAR_S
+    baseline = []
+    latencies = []
+
+    for _ in range(30):
+        if len(latencies) == 10:
+            break
+
+        answered = len(slave.late)
+        plain = _plain_read(channel, request, response_length)
+        start = time.monotonic()
+        try:
+            values = master.read_holding_registers(SLAVE_ADDR, 100, REGISTER_QTY)
+            latency = time.monotonic() - start
+            error = None
+        except OSError as e:
+            error = e
+
+        slave.wait_answered(answered + 2)
+        if any(slave.late[answered:]):
+            # a gap of the slave beyond t3.5 ends the frame, not the master
+            continue
+        if error is not None:
+            raise error
+
+        assert list(values) == list(range(100, 100 + REGISTER_QTY))
+        baseline.append(plain)
+        latencies.append(latency)
+
+    assert len(latencies) == 10
+    assert _median(latencies) >= wire_s * 0.9
+    # the complete frame ends the read, no t3.5 or poll interval is waited
+    assert _median(latencies) <= _median(baseline) * 1.2
+
+
+def test_silent_slave_costs_the_deadline(master):
+    start = time.monotonic()
+    master._RTU__channel.read(256, 50)
+    baseline = time.monotonic() - start
+
+    start = time.monotonic()
+    with pytest.raises(OSError):
+        master.read_holding_registers(SILENT_ADDR, 0, REGISTER_QTY, timeout=50)
+    elapsed = time.monotonic() - start
+
+    assert 0.045 <= elapsed <= baseline * 1.2 + master._t35_ms / 1000
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import time
+
+import pytest
+
+# custom packages
+from umodbus.scheduler import PollGroup, PollScheduler
+
+
+class FakeMaster(object):
+    """Master lookalike which takes delay_s per read"""
+    def __init__(self, delay_s=0):
+        self.delay_s = delay_s
+        self.reads = []
+
+    def read_holding_registers(self, slave_addr, starting_addr, register_qty, signed=True):
+        self.reads.append(slave_addr)
+        time.sleep(self.delay_s)
+        return [slave_addr] * register_qty
+
+
+def test_earliest_deadline_runs_first():
+    scheduler = PollScheduler(FakeMaster())
+    scheduler.add_group(PollGroup('slow', [(1, 'HREGS', 0, 1)], 1000))
+    scheduler.add_group(PollGroup('fast', [(2, 'HREGS', 0, 1)], 100))
+    scheduler.add_group(PollGroup('fast_low', [(3, 'HREGS', 0, 1)], 100, priority=1))
+
+    # a priority level weighs 1000 ms of deadline
+    assert [scheduler.run_once().name for _ in range(3)] == ['fast', 'slow', 'fast_low']
+    assert scheduler.run_once() is None
+    assert scheduler.get_group('slow').values == [[1]]
+
+
+def test_urgent_group_goes_ahead_of_a_late_one():
+    scheduler = PollScheduler(FakeMaster(), priority_weight_ms=500)
+    scheduler.add_group(PollGroup('late', [(1, 'HREGS', 0, 1)], 50, priority=1))
+    time.sleep(0.15)
+    scheduler.add_group(PollGroup('urgent', [(2, 'HREGS', 0, 1)], 100))
+
+    # late is 100 ms past its deadline, urgent is due in 100 ms
+    assert [scheduler.run_once().name for _ in range(2)] == ['urgent', 'late']
+
+
+def test_groups_change_without_touching_the_running_list():
+    scheduler = PollScheduler(FakeMaster())
+    scheduler.add_group(PollGroup('a', [(1, 'HREGS', 0, 1)], 100))
+    groups = scheduler._groups
+
+    scheduler.add_group(PollGroup('b', [(2, 'HREGS', 0, 1)], 100))
+    scheduler.remove_group('a')
+
+    assert [group.name for group in groups] == ['a']
+    assert [group.name for group in scheduler._groups] == ['b']
+
+
+def test_callback_and_statistics():
+    results = []
+    scheduler = PollScheduler(FakeMaster())
+    scheduler.add_group(PollGroup('group', [(1, 'HREGS', 0, 2)], 20,
+                                  callback=lambda group, values: results.append(values)))
+
+    while len(results) < 3:
+        if scheduler.run_once() is None:
+            time.sleep(0.002)
+
+    stats = scheduler.report()['group']
+    assert stats['runs'] == 3
+    assert stats['overruns'] == 0
+    assert results[-1] == [[1, 1]]
+    assert 0 <= scheduler.next_release_ms() <= 20
+
+    with pytest.raises(ValueError):
+        scheduler.add_group(PollGroup('group', [(1, 'HREGS', 0, 1)], 10))
+
+
+def test_missed_releases_are_skipped():
+    scheduler = PollScheduler(FakeMaster())
+    scheduler.add_group(PollGroup('group', [(1, 'HREGS', 0, 1)], 10))
+
+    time.sleep(0.055)
+    scheduler.run_once()
+
+    assert scheduler.get_group('group').skipped >= 4
+
+
+def test_sheddable_group_only_runs_in_spare_time():
+    scheduler = PollScheduler(FakeMaster(delay_s=0.02))
+    scheduler.add_group(PollGroup('regular', [(1, 'HREGS', 0, 1)], 30))
+    scheduler.add_group(PollGroup('background', [(2, 'HREGS', 0, 1)], 30, sheddable=True))
+
+    # the first runs measure the execution time of 20 ms per group
+    assert [scheduler.run_once().name for _ in range(3)] == ['regular', 'background', 'regular']
+
+    # the background reads would delay the next regular release
+    background = scheduler.get_group('background')
+    assert scheduler.run_once() is None
+    assert background.shed == 1
+
+    scheduler.remove_group('regular')
+    time.sleep(0.03)
+    assert scheduler.run_once() is background
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import random
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+# custom packages
+from umodbus import tcp
+from umodbus.tcp import MBAPReader, PipelinedTCP, TCP
+
+SILENT_ADDRESS = 99
+
+
+def _response(trans_id, unit_id, pdu):
+    return struct.pack('>HHHB', trans_id, 0, len(pdu) + 1, unit_id) + pdu
+
+
+class FakeSlave(object):
+    """
+    Modbus TCP slave answering FC03 with the start address as value.
+
+    Every request is answered from its own thread after delay_s, so the
+    responses of pipelined requests come back out of order. Requests of
+    SILENT_ADDRESS are never answered. With chunk_size the response is
+    sent in segments of that size, with stale a late response of the
+    previous transaction goes first.
+    """
+    def __init__(self, delay_s=0.0):
+        self.delay_s = delay_s
+        self.chunk_size = None
+        self.stale = False
+        self._sock = socket.socket()
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(5)
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        lock = threading.Lock()
+
+        while True:
+            try:
+                request = conn.recv(12)
+            except OSError:
+                return
+            if not request:
+                conn.close()
+                return
+            threading.Thread(target=self._answer, args=(conn, lock, request), daemon=True).start()
+
+    def _answer(self, conn, lock, request):
+        time.sleep(self.delay_s * random.uniform(0.8, 1.2))
+
+        trans_id, unit_id = struct.unpack_from('>H', request)[0], request[6]
+        start, qty = struct.unpack_from('>HH', request, 8)
+        if start == SILENT_ADDRESS:
+            return
+
+        pdu = bytes([3, qty * 2]) + struct.pack('>H', start) * qty
+        data = _response(trans_id, unit_id, pdu)
+        if self.stale:
+            data = _response((trans_id - 1) & 0xFFFF, unit_id, b'\x03\x02\x00\x00') + data
+
+        chunk_size = self.chunk_size or len(data)
+        with lock:
+            try:
+                for pos in range(0, len(data), chunk_size):
+                    conn.sendall(data[pos:pos + chunk_size])
+                    if self.chunk_size:
+                        time.sleep(0.002)
+            except OSError:
+                pass
+
+    def close(self):
+        self._sock.close()
+
+
+@pytest.fixture
+def slave():
+    slave = FakeSlave()
+    yield slave
+    slave.close()
+
+
+def test_reader_splits_and_joins_segments():
+    reader = MBAPReader()
+    stream = _response(1, 1, bytes([3, 250]) + bytes(range(250))) + _response(2, 1, b'\x06\x00\x01\x00\x05')
+
+    frames = []
+    for pos in range(0, len(stream), 7):
+        reader.feed(stream[pos:pos + 7])
+        while True:
+            pdu = reader.next_frame()
+            if pdu is None:
+                break
+            frames.append((reader.trans_id, bytes(pdu)))
+
+    assert frames == [(1, bytes([3, 250]) + bytes(range(250))), (2, b'\x06\x00\x01\x00\x05')]
+    assert reader.pending == 0
+
+    reader.feed(_response(3, 7, b'\x03\x02\x00\x01'))
+    assert bytes(reader.next_frame(include_unit=True)) == b'\x07\x03\x02\x00\x01'
+
+
+def test_reader_rejects_invalid_headers():
+    reader = MBAPReader()
+    reader.feed(b'\x00\x01\x00\x01\x00\x03\x01')
+    with pytest.raises(ValueError, match='protocol'):
+        reader.next_frame()
+
+    reader.reset()
+    reader.feed(b'\x00\x01\x00\x00\x01\x00\x01')
+    with pytest.raises(ValueError, match='length'):
+        reader.next_frame()
+
+    with pytest.raises(ValueError, match='overflow'):
+        MBAPReader(16).feed(bytes(17))
+
+
+def test_given_address_skips_the_name_lookup(slave):
+    master = TCP('slave.invalid', slave.port, timeout=1, addr=('127.0.0.1', slave.port))
+
+    assert list(master.read_holding_registers(1, 5, 1)) == [5]
+    assert master.address == ('127.0.0.1', slave.port)
+    master.close()
+
+
+def test_master_reads_dribbled_responses_and_skips_stale_ones(slave):
+    slave.chunk_size = 40
+    slave.stale = True
+    master = TCP('127.0.0.1', slave.port)
+
+    for _ in range(3):
+        values = master.read_holding_registers(1, 7, 125, signed=False)
+        assert list(values) == [7] * 125
+
+    master.close()
+
+
+def _read_all(master, addresses):
+    results = dict()
+
+    def read(address):
+        try:
+            results[address] = list(master.read_holding_registers(1, address, 2))
+        except Exception as e:
+            results[address] = e
+
+    threads = [threading.Thread(target=read, args=(address,)) for address in addresses]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+def test_pipelined_requests_overlap(slave):
+    slave.delay_s = 0.1
+    master = PipelinedTCP('127.0.0.1', slave.port, timeout=1, window=8)
+
+    start = time.monotonic()
+    results = _read_all(master, range(16))
+    elapsed = time.monotonic() - start
+
+    assert results == dict((address, [address, address]) for address in range(16))
+    # two windows of 8 instead of 16 round trips
+    assert elapsed < 0.6
+    assert master.inflight == 0
+    master.close()
+
+
+def test_lost_response_times_out_under_load(slave):
+    slave.delay_s = 0.01
+    master = PipelinedTCP('127.0.0.1', slave.port, timeout=0.3, window=4)
+    stop = threading.Event()
+
+    def steady():
+        while not stop.is_set():
+            master.read_holding_registers(1, 1, 2)
+
+    threads = [threading.Thread(target=steady) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+
+    start = time.monotonic()
+    with pytest.raises(OSError):
+        master.read_holding_registers(1, SILENT_ADDRESS, 2)
+    elapsed = time.monotonic() - start
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert 0.25 <= elapsed < 0.6
+    assert master.inflight == 0
+    master.close()
+
+
+def test_request_times_out_without_reader(slave):
+    class NoReader(PipelinedTCP):
+        def _open(self):
+            TCP.connect(self)
+
+    master = NoReader('127.0.0.1', slave.port, timeout=0.2)
+
+    start = time.monotonic()
+    with pytest.raises(OSError):
+        master.read_holding_registers(1, 1, 2)
+
+    # the own deadline of a call is the timeout plus the margin for the reader
+    assert time.monotonic() - start < 0.2 + PipelinedTCP.WAIT_MARGIN_MS / 1000 + 0.1
+    assert master.inflight == 0
+    master.close()
+
+
+def test_waiting_calls_block_instead_of_polling(slave, monkeypatch):
+    def sleep_ms(ms):
+        raise AssertionError('polled for the response')
+
+    monkeypatch.setattr(tcp.time, 'sleep_ms', sleep_ms)
+    slave.delay_s = 0.05
+    master = PipelinedTCP('127.0.0.1', slave.port, timeout=1, window=4)
+
+    assert _read_all(master, range(4)) == dict((address, [address, address]) for address in range(4))
+    master.close()
+
+
+def test_every_connection_has_its_own_reader(slave):
+    readers = []
+
+    class Recording(PipelinedTCP):
+        def _read_loop(self, sock, reader):
+            readers.append(reader)
+            super()._read_loop(sock, reader)
+
+    master = Recording('127.0.0.1', slave.port, timeout=1)
+    assert list(master.read_holding_registers(1, 3, 1)) == [3]
+    master.connect()
+    assert list(master.read_holding_registers(1, 4, 1)) == [4]
+
+    assert len(readers) == 2
+    assert readers[0] is not readers[1]
+    master.close()
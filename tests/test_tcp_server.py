@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+# system packages
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+# custom packages
+from umodbus.modbus import ModbusTCP
+from umodbus.tcp import PipelinedTCP, TCP
+
+MAX_CONNECTIONS = 3
+
+
+@pytest.fixture
+def slave():
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    slave = ModbusTCP()
+    slave.bind('127.0.0.1', port, max_connections=MAX_CONNECTIONS)
+    slave.add_hreg(0, [1, 2, 3])
+    slave.add_hreg(9, 0)
+    slave.add_hreg(100, [0] * 123)
+    slave.add_coil(5, True)
+    slave.port = port
+
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            if not slave.process():
+                time.sleep(0.0005)
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+
+    yield slave
+
+    stop.set()
+    thread.join()
+    slave._itf.close()
+
+
+def test_clients_are_served_from_one_loop(slave):
+    masters = [TCP('127.0.0.1', slave.port) for _ in range(MAX_CONNECTIONS)]
+    errors = []
+
+    def work(master, value):
+        try:
+            for _ in range(100):
+                assert list(master.read_holding_registers(1, 0, 3)) == [1, 2, 3]
+                assert master.write_single_register(1, 9, value, False)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(master, value)) for value, master in enumerate(masters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert slave._itf.connections == MAX_CONNECTIONS
+
+    for master in masters:
+        master.close()
+
+
+def test_connections_beyond_the_limit_are_refused(slave):
+    masters = [TCP('127.0.0.1', slave.port) for _ in range(MAX_CONNECTIONS)]
+    for master in masters:
+        master.read_coils(1, 5, 1)
+
+    extra = TCP('127.0.0.1', slave.port, timeout=0.5)
+    with pytest.raises(OSError):
+        extra.read_coils(1, 5, 1)
+    extra.close()
+
+    # a closed connection frees its slot
+    masters[0].close()
+    time.sleep(0.05)
+    master = TCP('127.0.0.1', slave.port)
+    assert list(master.read_coils(1, 5, 1)) == [True]
+
+    master.close()
+    for master in masters[1:]:
+        master.close()
+
+
+def _read_request(trans_id, address):
+    return struct.pack('>HHHBBHH', trans_id, 0, 6, 1, 3, address, 1)
+
+
+def _read_responses(conn, count):
+    responses = []
+    buf = b''
+
+    while len(responses) < count:
+        buf += conn.recv(512)
+        while len(buf) >= 6:
+            trans_id, _, length = struct.unpack_from('>HHH', buf)
+            if len(buf) < 6 + length:
+                break
+            responses.append((trans_id, buf[7:6 + length]))
+            buf = buf[6 + length:]
+
+    return responses
+
+
+def test_pipelined_and_split_requests(slave):
+    conn = socket.create_connection(('127.0.0.1', slave.port))
+    conn.settimeout(2)
+
+    # two requests in one segment, the third split over two segments
+    conn.sendall(_read_request(1, 0) + _read_request(2, 1) + _read_request(3, 2)[:5])
+    time.sleep(0.05)
+    conn.sendall(_read_request(3, 2)[5:])
+
+    # a write of 123 registers is larger than a single receive
+    values = bytes(range(246))
+    conn.sendall(struct.pack('>HHHBBHHB', 4, 0, 7 + len(values), 1, 16, 100, 123, len(values)) + values)
+
+    assert _read_responses(conn, 4) == [
+        (1, b'\x03\x02\x00\x01'),
+        (2, b'\x03\x02\x00\x02'),
+        (3, b'\x03\x02\x00\x03'),
+        (4, b'\x10\x00\x64\x00\x7b'),
+    ]
+    assert slave.get_hreg(100)[:2] == [0x0001, 0x0203]
+    conn.close()
+
+
+def test_pipelined_master(slave):
+    master = PipelinedTCP('127.0.0.1', slave.port, window=8)
+    results = dict()
+
+    def read(address):
+        results[address] = list(master.read_holding_registers(1, address, 1))
+
+    threads = [threading.Thread(target=read, args=(address,)) for address in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {0: [1], 1: [2], 2: [3]}
+    master.close()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus TCP server backend for asyncio
+
+Every connection waits for its next request and answers it from the
+registers of a Modbus slave right away, nothing runs while no client sends.
+Runs on uasyncio and on CPython asyncio.
+"""
+
+# system packages
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+
+# custom packages
+from . import functions
+from .common import Request
+from .common import ModbusException
+from . import const as Const
+
+
+class _Responder(object):
+    """Request interface which keeps the response PDU"""
+    def __init__(self):
+        self.pdu = None
+
+    def send_response(self,
+                      slave_addr,
+                      function_code,
+                      request_register_addr,
+                      request_register_qty,
+                      request_data,
+                      values=None,
+                      signed=True):
+        self.pdu = functions.response(function_code,
+                                      request_register_addr,
+                                      request_register_qty,
+                                      request_data,
+                                      values,
+                                      signed)
+
+    def encode_response(self, slave_addr, modbus_pdu):
+        return bytes(modbus_pdu)
+
+    def send_encoded(self, slave_addr, frame):
+        self.pdu = frame
+
+    def send_exception_response(self,
+                                slave_addr,
+                                function_code,
+                                exception_code):
+        self.pdu = functions.exception_response(function_code,
+                                                exception_code)
+
+
+class AsyncTCPServer(object):
+    def __init__(self, modbus, max_connections: int = 10):
+        """
+        Create an asyncio server answering from the registers of a slave.
+
+        :param      modbus:           The slave holding the registers, e.g.
+                                      ModbusTCP
+        :type       modbus:           Modbus
+        :param      max_connections:  The maximum number of clients
+        :type       max_connections:  int
+        """
+        self._modbus = modbus
+        self._max_connections = max_connections
+        self._server = None
+        self._writers = []
+
+        # statistics
+        self.requests = 0
+
+    @property
+    def is_running(self):
+        return self._server is not None
+
+    @property
+    def connections(self):
+        return len(self._writers)
+
+    async def start(self, local_ip: str, local_port: int = 502) -> None:
+        """
+        Start listening, the requests are served by the running event loop.
+
+        :param      local_ip:    The IP address to listen on
+        :type       local_ip:    str
+        :param      local_port:  The port to listen on
+        :type       local_port:  int
+        """
+        if self._server is not None:
+            await self.stop()
+
+        self._server = await asyncio.start_server(self._serve,
+                                                  local_ip,
+                                                  local_port,
+                                                  backlog=self._max_connections)
+
+    async def stop(self) -> None:
+        """Stop listening and close all client connections."""
+        server = self._server
+        self._server = None
+
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+        for writer in self._writers:
+            writer.close()
+
+        # the sessions end on the closed connection, do not leave them to
+        # be cancelled with the event loop
+        for _ in range(100):
+            if not self._writers:
+                break
+            await asyncio.sleep(0.01)
+        self._writers = []
+
+    def _answer(self, responder, unit_id, modbus_pdu):
+        if not self._modbus.accepts(unit_id):
+            return
+
+        function_code = modbus_pdu[0] & 0x7F
+
+        try:
+            request = Request(responder, bytes([unit_id]) + modbus_pdu)
+        except ModbusException as e:
+            responder.send_exception_response(unit_id,
+                                              e.function_code,
+                                              e.exception_code)
+            return
+        except Exception:
+            # too short or malformed for its function code
+            responder.send_exception_response(unit_id,
+                                              function_code,
+                                              Const.ILLEGAL_DATA_VALUE)
+            return
+
+        try:
+            self._modbus.handle_request(request)
+        except Exception:
+            # a failing provider, hook or register must not end the session
+            responder.send_exception_response(unit_id,
+                                              function_code,
+                                              Const.SERVER_DEVICE_FAILURE)
+
+    async def _serve(self, reader, writer):
+        if len(self._writers) >= self._max_connections:
+            writer.close()
+            return
+
+        self._writers.append(writer)
+        responder = _Responder()
+
+        try:
+            while True:
+                hdr = await reader.readexactly(Const.MBAP_HDR_LENGTH)
+                req_tid, req_pid, req_len, req_uid = struct.unpack('>HHHB', hdr)
+
+                if req_pid != 0 or req_len < 2 or req_len > Const.MAX_PDU_LENGTH + 1:
+                    break
+
+                modbus_pdu = await reader.readexactly(req_len - 1)
+                self.requests += 1
+
+                responder.pdu = None
+                self._answer(responder, req_uid, modbus_pdu)
+
+                if responder.pdu is not None:
+                    writer.write(struct.pack('>HHHB', req_tid, 0, len(responder.pdu) + 1, req_uid) +
+                                 responder.pdu)
+                    await writer.drain()
+        except (OSError, EOFError):
+            pass
+        finally:
+            if writer in self._writers:
+                self._writers.remove(writer)
+                writer.close()
+
+
+async def benchmark(requests: int = 1000,
+                    clients: int = 1,
+                    local_port: int = 5020,
+                    register_qty: int = 10) -> float:
+    """
+    Measure the requests per second of the server against local clients.
+
+    :param      requests:      The number of requests of each client
+    :type       requests:      int
+    :param      clients:       The number of concurrent clients
+    :type       clients:       int
+    :param      local_port:    The port of the benchmark server
+    :type       local_port:    int
+    :param      register_qty:  The number of registers read per request
+    :type       register_qty:  int
+
+    :returns:   The requests per second
+    :rtype:     float
+    """
+    from .modbus import ModbusTCP
+    from .async_tcp import AsyncTCP
+
+    modbus = ModbusTCP()
+    modbus.add_hreg(0, list(range(register_qty)))
+
+    server = AsyncTCPServer(modbus, max_connections=clients)
+    await server.start('127.0.0.1', local_port)
+
+    masters = [AsyncTCP('127.0.0.1', local_port) for _ in range(clients)]
+
+    async def poll(master):
+        for _ in range(requests):
+            await master.read_holding_registers(1, 0, register_qty)
+
+    try:
+        for master in masters:
+            await master.connect()
+
+        start = time.ticks_ms()
+        await asyncio.gather(*[poll(master) for master in masters])
+        elapsed = max(1, time.ticks_diff(time.ticks_ms(), start))
+    finally:
+        for master in masters:
+            await master.close()
+        await server.stop()
+
+    rate = requests * clients * 1000 / elapsed
+    print('{} clients, {} requests in {} ms: {:.0f} requests/s'.format(
+        clients, requests * clients, elapsed, rate))
+
+    return rate
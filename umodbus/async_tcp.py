@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus TCP master for asyncio
+
+The master methods are coroutines with the signatures of the blocking TCP
+master plus an optional per request timeout, so a single event loop can
+poll many slaves concurrently. Runs on uasyncio and on CPython asyncio.
+"""
+
+# system packages
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+# custom packages
+from . import functions
+from .common import BitView
+from .common import registers_from_bytes
+from .common import validate_response_pdu
+from . import const as Const
+
+
+class AsyncTCP(object):
+    def __init__(self, slave_ip, slave_port=502, timeout=5):
+        """
+        Create an asyncio Modbus TCP master, it connects on first use.
+
+        :param      slave_ip:    The IP address or host name of the slave
+        :type       slave_ip:    str
+        :param      slave_port:  The port of the slave
+        :type       slave_port:  int
+        :param      timeout:     The default timeout of a request in seconds
+        :type       timeout:     int
+        """
+        self._slave_ip = slave_ip
+        self._slave_port = slave_port
+        self._timeout = timeout
+        self._reader = None
+        self._writer = None
+
+        # one request at a time on a connection
+        self._lock = asyncio.Lock()
+        self._trans_id = 0
+
+    def _next_trans_id(self):
+        self._trans_id = (self._trans_id + 1) & 0xFFFF
+
+        return self._trans_id
+
+    def _create_mbap_hdr(self, slave_id, modbus_pdu):
+        trans_id = self._next_trans_id()
+
+        mbap_hdr = struct.pack('>HHHB', trans_id, 0, len(modbus_pdu) + 1, slave_id)
+
+        return mbap_hdr, trans_id
+
+    def _to_short(self, byte_array, signed=True):
+        return registers_from_bytes(byte_array, signed)
+
+    @property
+    def is_connected(self):
+        return self._writer is not None
+
+    async def connect(self):
+        await self.close()
+
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self._slave_ip, self._slave_port),
+            self._timeout)
+
+    async def close(self):
+        writer = self._writer
+        self._reader = None
+        self._writer = None
+
+        if writer is not None:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _transact(self, slave_id, modbus_pdu):
+        if self._writer is None:
+            await self.connect()
+
+        mbap_hdr, trans_id = self._create_mbap_hdr(slave_id, modbus_pdu)
+        self._writer.write(mbap_hdr + modbus_pdu)
+        await self._writer.drain()
+
+        # responses to earlier requests which timed out are skipped
+        while True:
+            hdr = await self._reader.readexactly(Const.MBAP_HDR_LENGTH)
+            rec_tid, rec_pid, rec_len, rec_uid = struct.unpack('>HHHB', hdr)
+
+            if rec_pid != 0 or rec_len < 2 or rec_len > Const.MAX_PDU_LENGTH + 1:
+                raise ValueError('invalid MBAP header')
+
+            pdu = await self._reader.readexactly(rec_len - 1)
+            if rec_tid == trans_id:
+                return rec_uid, pdu
+
+    async def _send_receive(self, slave_id, modbus_pdu, count, timeout=None):
+        timeout = self._timeout if timeout is None else timeout
+
+        async with self._lock:
+            try:
+                unit_id, response = await asyncio.wait_for(
+                    self._transact(slave_id, modbus_pdu), timeout)
+            except asyncio.TimeoutError:
+                # a partly read response leaves the stream out of sync
+                await self.close()
+                raise OSError('response timeout')
+            except (OSError, ValueError, EOFError):
+                await self.close()
+                raise
+
+        return validate_response_pdu(response,
+                                     unit_id,
+                                     slave_id,
+                                     modbus_pdu[0],
+                                     count)
+
+    async def read_coils(self, slave_addr, starting_addr, coil_qty, timeout=None):
+        modbus_pdu = functions.read_coils(starting_addr, coil_qty)
+
+        response = await self._send_receive(slave_addr, modbus_pdu, True, timeout)
+        status_pdu = BitView(response, coil_qty)
+
+        return status_pdu
+
+    async def read_discrete_inputs(self, slave_addr, starting_addr, input_qty, timeout=None):
+        modbus_pdu = functions.read_discrete_inputs(starting_addr, input_qty)
+
+        response = await self._send_receive(slave_addr, modbus_pdu, True, timeout)
+        status_pdu = BitView(response, input_qty)
+
+        return status_pdu
+
+    async def read_holding_registers(self,
+                                     slave_addr,
+                                     starting_addr,
+                                     register_qty,
+                                     signed=True,
+                                     timeout=None):
+        modbus_pdu = functions.read_holding_registers(starting_addr,
+                                                      register_qty)
+
+        response = await self._send_receive(slave_addr, modbus_pdu, True, timeout)
+        register_value = self._to_short(response, signed)
+
+        return register_value
+
+    async def read_input_registers(self,
+                                   slave_addr,
+                                   starting_addr,
+                                   register_qty,
+                                   signed=True,
+                                   timeout=None):
+        modbus_pdu = functions.read_input_registers(starting_addr,
+                                                    register_qty)
+
+        response = await self._send_receive(slave_addr, modbus_pdu, True, timeout)
+        register_value = self._to_short(response, signed)
+
+        return register_value
+
+    async def write_single_coil(self, slave_addr, output_address, output_value, timeout=None):
+        modbus_pdu = functions.write_single_coil(output_address, output_value)
+
+        response = await self._send_receive(slave_addr, modbus_pdu, False, timeout)
+        operation_status = functions.validate_resp_data(response,
+                                                        Const.WRITE_SINGLE_COIL,
+                                                        output_address,
+                                                        value=output_value,
+                                                        signed=False)
+
+        return operation_status
+
+    async def write_single_register(self,
+                                    slave_addr,
+                                    register_address,
+                                    register_value,
+                                    signed=True,
+                                    timeout=None):
+        modbus_pdu = functions.write_single_register(register_address,
+                                                     register_value,
+                                                     signed)
+
+        response = await self._send_receive(slave_addr, modbus_pdu, False, timeout)
+        operation_status = functions.validate_resp_data(response,
+                                                        Const.WRITE_SINGLE_REGISTER,
+                                                        register_address,
+                                                        value=register_value,
+                                                        signed=signed)
+
+        return operation_status
+
+    async def write_multiple_coils(self,
+                                   slave_addr,
+                                   starting_address,
+                                   output_values,
+                                   timeout=None):
+        modbus_pdu = functions.write_multiple_coils(starting_address,
+                                                    output_values)
+
+        response = await self._send_receive(slave_addr, modbus_pdu, False, timeout)
+        operation_status = functions.validate_resp_data(response,
+                                                        Const.WRITE_MULTIPLE_COILS,
+                                                        starting_address,
+                                                        quantity=len(output_values))
+
+        return operation_status
+
+    async def write_multiple_registers(self,
+                                       slave_addr,
+                                       starting_address,
+                                       register_values,
+                                       signed=True,
+                                       timeout=None):
+        modbus_pdu = functions.write_multiple_registers(starting_address,
+                                                        register_values,
+                                                        signed)
+
+        response = await self._send_receive(slave_addr, modbus_pdu, False, timeout)
+        operation_status = functions.validate_resp_data(response,
+                                                        Const.WRITE_MULTIPLE_REGISTERS,
+                                                        starting_address,
+                                                        quantity=len(register_values))
+
+        return operation_status
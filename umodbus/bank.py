@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Register banks of a Modbus slave
+
+A bank stores the registers of one table in contiguous segments, adjacent
+or overlapping definitions are merged into one segment. Addresses between
+segments are not defined, a range is readable if it lies in one segment.
+"""
+
+# system packages
+try:
+    from uarray import array
+except ImportError:
+    from array import array
+
+# custom packages
+from .common import BitView
+
+
+class RegisterBank(object):
+    def __init__(self, bits: bool = False):
+        """
+        Create an empty bank.
+
+        :param      bits:  Flag whether the bank holds coils or discrete
+                           inputs packed in a bitset, 16 bit registers
+                           otherwise
+        :type       bits:  bool
+        """
+        self._bits = bits
+
+        # sorted segment start addresses, lengths and storage
+        self._starts = []
+        self._lengths = []
+        self._data = []
+
+    @property
+    def bits(self):
+        return self._bits
+
+    @property
+    def segments(self):
+        """
+        Get the defined address ranges.
+
+        :returns:   The ranges as (start address, length)
+        :rtype:     list
+        """
+        return list(zip(self._starts, self._lengths))
+
+    def _alloc(self, count):
+        if self._bits:
+            return bytearray((count + 7) // 8)
+
+        return array('H', [0] * count)
+
+    def _get(self, data, index):
+        if self._bits:
+            return bool(data[index >> 3] & (1 << (index & 7)))
+
+        return data[index]
+
+    def _set(self, data, index, value):
+        if self._bits:
+            if value:
+                data[index >> 3] |= 1 << (index & 7)
+            else:
+                data[index >> 3] &= ~(1 << (index & 7))
+        else:
+            data[index] = value & 0xFFFF
+
+    def _copy(self, dst, dst_offset, src, src_offset, count):
+        if not self._bits:
+            dst[dst_offset:dst_offset + count] = src[src_offset:src_offset + count]
+            return
+
+        # whole bytes are copied at once if both ranges start on a byte
+        if not dst_offset & 7 and not src_offset & 7:
+            nbytes = count >> 3
+            dst[dst_offset >> 3:(dst_offset >> 3) + nbytes] = \
+                src[src_offset >> 3:(src_offset >> 3) + nbytes]
+            done = nbytes << 3
+            dst_offset += done
+            src_offset += done
+            count -= done
+
+        for i in range(count):
+            self._set(dst, dst_offset + i, self._get(src, src_offset + i))
+
+    def _find(self, address):
+        # index of the last segment starting at or before the address
+        lo = 0
+        hi = len(self._starts)
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._starts[mid] <= address:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo - 1
+
+    def _locate(self, address, count):
+        index = self._find(address)
+        if index < 0:
+            return None
+
+        offset = address - self._starts[index]
+        if offset + count > self._lengths[index]:
+            return None
+
+        return index, offset
+
+    def contains(self, address: int, count: int = 1) -> bool:
+        """
+        Check whether a range is defined.
+
+        :param      address:  The first address
+        :type       address:  int
+        :param      count:    The number of registers
+        :type       count:    int
+
+        :returns:   Flag whether all addresses are defined
+        :rtype:     bool
+        """
+        return count > 0 and self._locate(address, count) is not None
+
+    def define(self, address: int, count: int) -> None:
+        """
+        Define a range, new registers are 0 or False.
+
+        :param      address:  The first address
+        :type       address:  int
+        :param      count:    The number of registers
+        :type       count:    int
+        """
+        start = address
+        end = address + count
+        starts = []
+        lengths = []
+        datas = []
+        merged = []
+
+        # segments which overlap or touch the range are merged
+        for segment in zip(self._starts, self._lengths, self._data):
+            seg_start, length, data = segment
+            if seg_start + length < address or seg_start > address + count:
+                starts.append(seg_start)
+                lengths.append(length)
+                datas.append(data)
+                continue
+
+            merged.append(segment)
+            start = min(start, seg_start)
+            end = max(end, seg_start + length)
+
+        if len(merged) == 1 and merged[0][0] == start and merged[0][1] == end - start:
+            # already defined
+            return
+
+        data = self._alloc(end - start)
+        for seg_start, length, seg_data in merged:
+            self._copy(data, seg_start - start, seg_data, 0, length)
+
+        index = 0
+        while index < len(starts) and starts[index] < start:
+            index += 1
+
+        starts.insert(index, start)
+        lengths.insert(index, end - start)
+        datas.insert(index, data)
+
+        self._starts = starts
+        self._lengths = lengths
+        self._data = datas
+
+    def undefine(self, address: int, count: int) -> None:
+        """
+        Remove a range, segments are split around it.
+
+        :param      address:  The first address
+        :type       address:  int
+        :param      count:    The number of registers
+        :type       count:    int
+        """
+        end = address + count
+        starts = []
+        lengths = []
+        datas = []
+
+        for seg_start, length, data in zip(self._starts, self._lengths, self._data):
+            seg_end = seg_start + length
+            if seg_end <= address or seg_start >= end:
+                starts.append(seg_start)
+                lengths.append(length)
+                datas.append(data)
+                continue
+
+            # keep the parts before and behind the removed range
+            for part_start, part_end in ((seg_start, address), (end, seg_end)):
+                part_start = max(part_start, seg_start)
+                part_end = min(part_end, seg_end)
+                if part_end <= part_start:
+                    continue
+
+                part = self._alloc(part_end - part_start)
+                self._copy(part, 0, data, part_start - seg_start, part_end - part_start)
+                starts.append(part_start)
+                lengths.append(part_end - part_start)
+                datas.append(part)
+
+        self._starts = starts
+        self._lengths = lengths
+        self._data = datas
+
+    def read(self, address: int, count: int):
+        """
+        Read a range.
+
+        Bits are returned as a view on the bank, it follows later writes.
+        Registers are returned as a copy.
+
+        :param      address:  The first address
+        :type       address:  int
+        :param      count:    The number of registers
+        :type       count:    int
+
+        :raise      KeyError:  The range is not defined completely
+        :returns:   The values
+        :rtype:     Union[BitView, array]
+        """
+        location = self._locate(address, count)
+        if location is None:
+            raise KeyError('range {}+{} not defined'.format(address, count))
+
+        index, offset = location
+        data = self._data[index]
+
+        if self._bits:
+            return BitView(data, count, offset)
+
+        return data[offset:offset + count]
+
+    def write(self, address: int, values) -> None:
+        """
+        Write a range.
+
+        :param      address:  The first address
+        :type       address:  int
+        :param      values:   The values, registers are stored modulo 0x10000
+        :type       values:   Union[List[bool], List[int]]
+
+        :raise      KeyError:  The range is not defined completely
+        """
+        location = self._locate(address, len(values))
+        if location is None:
+            raise KeyError('range {}+{} not defined'.format(address, len(values)))
+
+        index, offset = location
+        data = self._data[index]
+
+        if self._bits:
+            for i, value in enumerate(values):
+                self._set(data, offset + i, value)
+            return
+
+        try:
+            values = array('H', values)
+        except OverflowError:
+            # CPython refuses negative values, MicroPython wraps them
+            values = array('H', [value & 0xFFFF for value in values])
+
+        data[offset:offset + len(values)] = values
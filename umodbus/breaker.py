@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Per slave circuit breaker
+
+A slave which did not answer several requests in a row is skipped for an
+exponentially growing backoff time, after which a single probe request is
+let through.
+"""
+
+# system packages
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half-open'
+
+
+class _SlaveHealth(object):
+    def __init__(self):
+        self.failures = 0
+        self.backoff = 0
+        self.open_until = 0
+        self.state = STATE_CLOSED
+
+
+class CircuitBreaker(object):
+    def __init__(self,
+                 threshold: int = 3,
+                 backoff_ms: int = 1000,
+                 max_backoff_ms: int = 60000):
+        """
+        Create a circuit breaker.
+
+        :param      threshold:       Consecutive timeouts opening the circuit
+        :type       threshold:       int
+        :param      backoff_ms:      The first backoff time
+        :type       backoff_ms:      int
+        :param      max_backoff_ms:  The upper limit of the backoff time
+        :type       max_backoff_ms:  int
+        """
+        self.threshold = threshold
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self._slaves = dict()
+
+    def state(self, slave_addr: int) -> str:
+        """
+        Get the circuit state of a slave.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   STATE_CLOSED, STATE_OPEN or STATE_HALF_OPEN
+        :rtype:     str
+        """
+        health = self._slaves.get(slave_addr)
+
+        return STATE_CLOSED if health is None else health.state
+
+    def allow(self, slave_addr: int) -> bool:
+        """
+        Check whether a request to the slave may go on the bus.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+
+        :returns:   False while the circuit is open or a probe is running
+        :rtype:     bool
+        """
+        health = self._slaves.get(slave_addr)
+        if health is None or health.state == STATE_CLOSED:
+            return True
+
+        if health.state == STATE_OPEN and \
+                time.ticks_diff(time.ticks_ms(), health.open_until) >= 0:
+            # let a single probe through
+            health.state = STATE_HALF_OPEN
+            return True
+
+        return False
+
+    def success(self, slave_addr: int) -> None:
+        self._slaves.pop(slave_addr, None)
+
+    def failure(self, slave_addr: int) -> None:
+        health = self._slaves.get(slave_addr)
+        if health is None:
+            health = _SlaveHealth()
+            self._slaves[slave_addr] = health
+
+        health.failures += 1
+
+        if health.state == STATE_HALF_OPEN:
+            health.backoff = min(health.backoff * 2, self.max_backoff_ms)
+        elif health.failures >= self.threshold:
+            health.backoff = self.backoff_ms
+        else:
+            return
+
+        health.state = STATE_OPEN
+        health.open_until = time.ticks_add(time.ticks_ms(), health.backoff)
+
+    def reset(self, slave_addr: int = None) -> None:
+        """
+        Close the circuit of a slave or of all slaves.
+
+        :param      slave_addr:  The slave address, None for all slaves
+        :type       slave_addr:  int
+        """
+        if slave_addr is None:
+            self._slaves = dict()
+        else:
+            self._slaves.pop(slave_addr, None)
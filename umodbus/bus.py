@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Serialized bus access
+
+A single worker thread owns the master and runs the submitted transactions
+one after the other, most urgent priority first.
+"""
+
+# system packages
+import _thread
+from queue import Queue
+
+# transaction priorities, lower runs first
+PRIORITY_WRITE = 0
+PRIORITY_COMMAND = 1
+PRIORITY_POLL = 2
+
+
+class BusTransaction(object):
+    """A master call waiting for its turn on the bus"""
+    def __init__(self, method, args, kwargs, priority):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+
+        self._done = Queue(maxsize=1)
+
+    def complete(self, value, error=None):
+        self._done.put((value, error))
+
+    def result(self):
+        """
+        Wait for the transaction to finish.
+
+        :raise      Exception:  The exception raised by the master call
+        :returns:   The return value of the master call
+        """
+        value, error = self._done.get()
+        if error is not None:
+            raise error
+
+        return value
+
+
+class BusOwner(object):
+    def __init__(self, host):
+        """
+        Create the owner of a bus.
+
+        :param      host:  The master, e.g. RTU
+        :type       host:  object
+        """
+        self._host = host
+        self._lock = _thread.allocate_lock()
+        self._pending = []
+        self._seq = 0
+        self._signal = Queue(maxsize=1)
+        # identifies the running worker, a worker of an earlier start
+        # finishing its transaction after a restart ends on its own
+        self._worker_id = None
+
+    def start(self):
+        """Start the worker thread, only one thread talks on the bus."""
+        if self._worker_id is None:
+            self._worker_id = object()
+            _thread.start_new_thread(self._worker, (self._worker_id,))
+
+    def stop(self):
+        """
+        Stop the worker thread after the current transaction.
+
+        Transactions still queued fail with an OSError.
+        """
+        if self._worker_id is None:
+            return
+
+        self._worker_id = None
+        self._wake()
+
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+
+        for _, _, txn in pending:
+            txn.complete(None, OSError('bus stopped'))
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def submit(self, method, *args, priority=PRIORITY_POLL, **kwargs):
+        """
+        Queue a master call.
+
+        :param      method:    The name of the master method
+        :type       method:    str
+        :param      priority:  The priority of the call
+        :type       priority:  int
+
+        :returns:   The queued transaction
+        :rtype:     BusTransaction
+        """
+        txn = BusTransaction(method, args, kwargs, priority)
+
+        with self._lock:
+            # the sequence number keeps calls of equal priority in order
+            self._seq += 1
+            self._pending.append((priority, self._seq, txn))
+            self._pending.sort(key=lambda item: (item[0], item[1]))
+
+        self._wake()
+
+        return txn
+
+    def call(self, method, *args, priority=PRIORITY_POLL, **kwargs):
+        """
+        Queue a master call and wait for its result.
+
+        Must not be called from the worker thread itself.
+
+        :param      method:    The name of the master method
+        :type       method:    str
+        :param      priority:  The priority of the call
+        :type       priority:  int
+
+        :returns:   The return value of the master call
+        """
+        return self.submit(method, *args, priority=priority, **kwargs).result()
+
+    def client(self, priority=PRIORITY_POLL):
+        """
+        Get a master lookalike which routes every call through the queue.
+
+        :param      priority:  The priority of reads, writes always use
+                               PRIORITY_WRITE
+        :type       priority:  int
+
+        :returns:   The bus client
+        :rtype:     BusClient
+        """
+        return BusClient(self, priority)
+
+    def _wake(self):
+        if self._signal.size() == 0:
+            self._signal.put(None)
+
+    def _next(self):
+        with self._lock:
+            if self._pending:
+                return self._pending.pop(0)[2]
+        return None
+
+    def _worker(self, worker_id):
+        while self._worker_id is worker_id:
+            txn = self._next()
+            if txn is None:
+                self._signal.get()
+                continue
+
+            try:
+                value = getattr(self._host, txn.method)(*txn.args, **txn.kwargs)
+            except Exception as e:
+                txn.complete(None, e)
+            else:
+                txn.complete(value)
+
+
+class BusClient(object):
+    """Master interface of a BusOwner for a fixed priority"""
+    def __init__(self, bus, priority):
+        self._bus = bus
+        self._priority = priority
+
+    def __getattr__(self, method):
+        priority = PRIORITY_WRITE if method.startswith('write_') else self._priority
+
+        def _call(*args, **kwargs):
+            return self._bus.call(method, *args, priority=priority, **kwargs)
+
+        return _call
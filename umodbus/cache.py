@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Bounded caches with least recently used eviction and optional expiry
+"""
+
+# system packages
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+try:
+    from ucollections import OrderedDict
+except ImportError:
+    from collections import OrderedDict
+
+
+class LRUCache(object):
+    def __init__(self, maxsize: int = 256, ttl_ms: int = 0):
+        """
+        Create a cache.
+
+        :param      maxsize:  The maximum number of entries
+        :type       maxsize:  int
+        :param      ttl_ms:   The lifetime of an entry, 0 never expires
+        :type       ttl_ms:   int
+        """
+        self._maxsize = maxsize
+        self._ttl = ttl_ms
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def keys(self):
+        return list(self._entries.keys())
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if self._ttl and time.ticks_diff(time.ticks_ms(), entry[1]) >= self._ttl:
+            del self._entries[key]
+            return None
+
+        # move to the most recently used end
+        del self._entries[key]
+        self._entries[key] = entry
+
+        return entry
+
+    def get(self, key, default=None):
+        """
+        Get a fresh entry.
+
+        :param      key:      The key
+        :param      default:  The value returned on a miss
+
+        :returns:   The cached value or default
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value) -> None:
+        """
+        Add or replace an entry, the least recently used one is evicted
+        if the cache is full.
+
+        :param      key:    The key
+        :param      value:  The value
+        """
+        if key in self._entries:
+            del self._entries[key]
+        elif len(self._entries) >= self._maxsize:
+            del self._entries[next(iter(self._entries))]
+            self.evictions += 1
+
+        self._entries[key] = (value, time.ticks_ms())
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._entries = OrderedDict()
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        :returns:   The counters and current size
+        :rtype:     dict
+        """
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class RegisterCache(LRUCache):
+    """Per (slave, table, address) value cache of a master"""
+    def __init__(self, maxsize: int = 256, ttl_ms: int = 0):
+        super().__init__(maxsize, ttl_ms)
+        # bumped by every write of a (slave, table), a read which overlapped
+        # a write must not store its older values
+        self._generations = dict()
+        self.stale = 0
+
+    def generation(self, slave: int, table: str) -> int:
+        """
+        Get the write generation of a table, take it before a bus read and
+        pass it to put_range.
+
+        :param      slave:  The slave address
+        :type       slave:  int
+        :param      table:  The register table, e.g. HREGS
+        :type       table:  str
+
+        :returns:   The number of writes to the table
+        :rtype:     int
+        """
+        return self._generations.get((slave, table), 0)
+
+    def _bump(self, slave, table):
+        key = (slave, table)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def get_range(self, slave: int, table: str, address: int, quantity: int):
+        """
+        Get the values of a register range if all of them are fresh.
+
+        :param      slave:     The slave address
+        :type       slave:     int
+        :param      table:     The register table, e.g. HREGS
+        :type       table:     str
+        :param      address:   The first register address
+        :type       address:   int
+        :param      quantity:  The number of registers
+        :type       quantity:  int
+
+        :returns:   The values, None on a miss
+        :rtype:     Union[None, list]
+        """
+        values = []
+
+        for offset in range(quantity):
+            entry = self._lookup((slave, table, address + offset))
+            if entry is None:
+                self.misses += 1
+                return None
+            values.append(entry[0])
+
+        self.hits += 1
+        return values
+
+    def put_range(self, slave: int, table: str, address: int, values, generation: int = None) -> bool:
+        """
+        Store the values of a register range read from the bus.
+
+        :param      slave:       The slave address
+        :type       slave:       int
+        :param      table:       The register table, e.g. HREGS
+        :type       table:       str
+        :param      address:     The first register address
+        :type       address:     int
+        :param      values:      The register values
+        :type       values:      list
+        :param      generation:  The table generation taken before the read,
+                                 None stores unconditionally
+        :type       generation:  int
+
+        :returns:   False if the table was written during the read
+        :rtype:     bool
+        """
+        if generation is not None and generation != self.generation(slave, table):
+            self.stale += 1
+            return False
+
+        for offset, value in enumerate(values):
+            self.put((slave, table, address + offset), value)
+
+        return True
+
+    def write_range(self, slave: int, table: str, address: int, values) -> None:
+        """Store the values written to a register range."""
+        self._bump(slave, table)
+        self.put_range(slave, table, address, values)
+
+    def invalidate_range(self, slave: int, table: str, address: int, quantity: int) -> None:
+        self._bump(slave, table)
+        for offset in range(quantity):
+            self._entries.pop((slave, table, address + offset), None)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats['stale'] = self.stale
+
+        return stats
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Change log of registers written by a master
+
+Every write is appended to a ring buffer with a sequence number counting up
+from 1. A consumer keeps the sequence of the last event it handled and reads
+the events after it, events dropped by the ring before they were read are
+reported as lost.
+"""
+
+# system packages
+import _thread
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+
+
+class ChangeLog(object):
+    def __init__(self, capacity: int = 256):
+        """
+        Create an empty change log.
+
+        :param      capacity:  The number of events kept
+        :type       capacity:  int
+        """
+        self._capacity = capacity
+        self._events = [None] * capacity
+        self._seq = 0
+        self._lock = _thread.allocate_lock()
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def seq(self):
+        """
+        Get the sequence number of the latest event, 0 before the first.
+
+        :returns:   The sequence number
+        :rtype:     int
+        """
+        return self._seq
+
+    @property
+    def first_seq(self):
+        """
+        Get the sequence number of the oldest event kept.
+
+        :returns:   The sequence number, 1 if the ring did not overflow yet
+        :rtype:     int
+        """
+        return max(1, self._seq - self._capacity + 1)
+
+    def append(self, reg_type: str, address: int, value, timestamp: int = None) -> int:
+        """
+        Add an event, the oldest one is dropped if the ring is full.
+
+        :param      reg_type:   The register type
+        :type       reg_type:   str
+        :param      address:    The address of the register
+        :type       address:    int
+        :param      value:      The written value
+        :param      timestamp:  The time of the write in milliseconds, None
+                                for now
+        :type       timestamp:  int
+
+        :returns:   The sequence number of the event
+        :rtype:     int
+        """
+        if timestamp is None:
+            timestamp = time.ticks_ms()
+
+        with self._lock:
+            self._seq += 1
+            self._events[self._seq % self._capacity] = (self._seq,
+                                                         timestamp,
+                                                         reg_type,
+                                                         address,
+                                                         value)
+            return self._seq
+
+    def read(self, after_seq: int = 0, limit: int = None):
+        """
+        Get the events following a sequence number.
+
+        :param      after_seq:  The sequence number of the last handled
+                                event, 0 for all events kept
+        :type       after_seq:  int
+        :param      limit:      The maximum number of events, None for all
+        :type       limit:      int
+
+        :returns:   The events as (seq, time, reg_type, address, value),
+                    oldest first, and the number of events lost since
+                    after_seq
+        :rtype:     tuple
+        """
+        with self._lock:
+            if after_seq >= self._seq:
+                return [], 0
+
+            start = max(after_seq + 1, self.first_seq)
+            end = self._seq + 1
+            if limit is not None:
+                end = min(end, start + limit)
+
+            events = [self._events[seq % self._capacity] for seq in range(start, end)]
+
+        return events, start - after_seq - 1
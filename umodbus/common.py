@@ -9,9 +9,18 @@
 #
 
 # system packages
-import ustruct as struct
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    from uarray import array
+except ImportError:
+    from array import array
 
 # custom packages
+from . import functions
+from .structs import layout
 from . import const as Const
 
 
@@ -60,6 +69,22 @@ class Request(object):
             self.data = data[7:]
             if len(self.data) != self.quantity * 2:
                 raise ModbusException(self.function, Const.ILLEGAL_DATA_VALUE)
+        elif self.function == Const.MASK_WRITE_REGISTER:
+            self.quantity = None
+            # AND mask and OR mask
+            self.data = data[4:8]
+            if len(self.data) != 4:
+                raise ModbusException(self.function, Const.ILLEGAL_DATA_VALUE)
+        elif self.function == Const.READ_WRITE_MULTIPLE_REGISTERS:
+            # register_addr and quantity describe the read
+            self.quantity, self.write_addr, self.write_quantity = struct.unpack_from('>HHH', data, 4)
+            if self.quantity < 0x0001 or self.quantity > 0x007D:
+                raise ModbusException(self.function, Const.ILLEGAL_DATA_VALUE)
+            if self.write_quantity < 0x0001 or self.write_quantity > 0x0079:
+                raise ModbusException(self.function, Const.ILLEGAL_DATA_VALUE)
+            self.data = data[11:]
+            if len(self.data) != self.write_quantity * 2:
+                raise ModbusException(self.function, Const.ILLEGAL_DATA_VALUE)
         else:
             # Not implemented functions
             self.quantity = None
@@ -74,6 +99,31 @@ class Request(object):
                                 values,
                                 signed)
 
+    def encode_response(self, values=None, signed=True):
+        """
+        Encode the response into a frame of the interface, it can be sent
+        more than once with send_encoded.
+
+        :param      values:  The values of a read response
+        :type       values:  Union[List[bool], List[int], array]
+        :param      signed:  Flag whether the values are signed
+        :type       signed:  bool
+
+        :returns:   The encoded response
+        :rtype:     bytes
+        """
+        modbus_pdu = functions.response(self.function,
+                                        self.register_addr,
+                                        self.quantity,
+                                        self.data,
+                                        values,
+                                        signed)
+
+        return self._itf.encode_response(self.unit_addr, modbus_pdu)
+
+    def send_encoded(self, frame):
+        self._itf.send_encoded(self.unit_addr, frame)
+
     def send_exception(self, exception_code):
         self._itf.send_exception_response(self.unit_addr,
                                           self.function,
@@ -90,13 +140,137 @@ class Request(object):
                     return bits
 
     def data_as_registers(self, signed=True):
-        qty = self.quantity if (self.quantity is not None) else 1
-        fmt = ('h' if signed else 'H') * qty
-
-        return struct.unpack('>' + fmt, self.data)
+        return layout('>', len(self.data) // 2, signed).unpack_from(self.data)
 
 
 class ModbusException(Exception):
     def __init__(self, function_code, exception_code):
         self.function_code = function_code
         self.exception_code = exception_code
+
+
+def registers_from_bytes(data, signed=True):
+    """
+    Decode big endian registers into a compact array.
+
+    :param      data:    The register bytes of a response
+    :type       data:    Union[bytes, bytearray, memoryview]
+    :param      signed:  Flag whether the registers are signed
+    :type       signed:  bool
+
+    :returns:   The register values
+    :rtype:     array
+    """
+    values = layout('>', len(data) // 2, signed).unpack_from(data)
+
+    return array('h' if signed else 'H', values)
+
+
+def validate_response_pdu(pdu, unit_id, slave_id, function_code, count=False):
+    """
+    Check a response PDU of a Modbus TCP slave.
+
+    :param      pdu:            The response PDU
+    :type       pdu:            Union[bytes, bytearray, memoryview]
+    :param      unit_id:        The unit ID of the response
+    :type       unit_id:        int
+    :param      slave_id:       The unit ID of the request
+    :type       slave_id:       int
+    :param      function_code:  The function code of the request
+    :type       function_code:  int
+    :param      count:          Flag whether the data starts with a byte
+                                count
+    :type       count:          bool
+
+    :raise      ValueError:     The unit ID does not match or the slave
+                                returned an exception
+    :returns:   The data of the response
+    :rtype:     Union[bytes, bytearray, memoryview]
+    """
+    if (slave_id != unit_id):
+        raise ValueError('wrong slave Id')
+
+    if (pdu[0] == (function_code + Const.ERROR_BIAS)):
+        raise ValueError('slave returned exception code: {:d}'.
+                         format(pdu[1] if len(pdu) > 1 else pdu[0]))
+
+    hdr_length = 2 if count else 1
+
+    return pdu[hdr_length:]
+
+
+class BitView(object):
+    """
+    Read only view of packed coils or discrete inputs.
+
+    Bits are stored least significant bit first as in the Modbus PDU, they
+    are only turned into bool when accessed.
+    """
+    def __init__(self, data, length=None, offset=0):
+        self._data = data
+        self._offset = offset
+        available = len(data) * 8 - offset
+        self._len = available if length is None else min(length, available)
+
+    def __len__(self):
+        return self._len
+
+    def _bit(self, index):
+        bit = self._offset + index
+        return bool(self._data[bit >> 3] & (1 << (bit & 7)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = self._slice_indices(index)
+            if step == 1:
+                return BitView(self._data, max(0, stop - start), self._offset + start)
+            return [self._bit(i) for i in range(start, stop, step)]
+
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('bit index out of range')
+
+        return self._bit(index)
+
+    def _slice_indices(self, index):
+        length = self._len
+        step = 1 if index.step is None else index.step
+        if step == 0:
+            raise ValueError('slice step cannot be zero')
+
+        if step > 0:
+            lower, upper = 0, length
+        else:
+            lower, upper = -1, length - 1
+
+        bounds = []
+        for value, default in ((index.start, lower if step > 0 else upper),
+                               (index.stop, upper if step > 0 else lower)):
+            if value is None:
+                value = default
+            elif value < 0:
+                value = max(value + length, lower)
+            else:
+                value = min(value, upper)
+            bounds.append(value)
+
+        return bounds[0], bounds[1], step
+
+    def __iter__(self):
+        data = self._data
+        for bit in range(self._offset, self._offset + self._len):
+            yield bool(data[bit >> 3] & (1 << (bit & 7)))
+
+    def __eq__(self, other):
+        if len(self) != len(other):
+            return False
+
+        for a, b in zip(self, other):
+            if a != b:
+                return False
+
+        return True
+
+    def __repr__(self):
+        return 'BitView({})'.format(list(self))
@@ -52,6 +52,12 @@ RESPONSE_HDR_LENGTH = 0x02
 ERROR_RESP_LEN = 0x05
 FIXED_RESP_LEN = 0x08
 MBAP_HDR_LENGTH = 0x07
+MAX_ADU_LENGTH = 0x100
+MAX_PDU_LENGTH = 0xFD
+
+# quantity limits of the read function codes
+MAX_READ_BITS = 0x07D0
+MAX_READ_REGISTERS = 0x007D
 
 CRC16_TABLE = (
     0x0000, 0xC0C1, 0xC181, 0x0140, 0xC301, 0x03C0, 0x0280, 0xC241, 0xC601,
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2019, Pycom Limited.
+#
+# This software is licensed under the GNU GPL version 3 or any
+# later version, with permitted additional terms. For more information
+# see the Pycom Licence v1.0 document supplied with this file, or
+# available at https://www.pycom.io/opensource/licensing
+#
+
+# system packages
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+
+# custom packages
+from . import const as Const
+
+CRC16_INIT = 0xFFFF
+
+_TABLE = Const.CRC16_TABLE
+# slice-by-2, folds the high byte of a 16 bit step with a second table
+#   T2[i] = T1[T1[i] & 0xFF] ^ (T1[i] >> 8)
+_TABLE2 = tuple((crc >> 8) ^ _TABLE[crc & 0xFF] for crc in _TABLE)
+
+
+def crc16(data, crc=CRC16_INIT, start=0, end=None):
+    """
+    Calculate the Modbus CRC16 of data, two bytes per table step.
+
+    :param      data:   The data
+    :type       data:   Union[bytes, bytearray, memoryview]
+    :param      crc:    The CRC state to continue from
+    :type       crc:    int
+    :param      start:  The first index of data to process
+    :type       start:  int
+    :param      end:    The index after the last byte to process
+    :type       end:    int
+
+    :returns:   The CRC state, 0 if data ends with its own valid CRC
+    :rtype:     int
+    """
+    t1 = _TABLE
+    t2 = _TABLE2
+
+    if end is None:
+        end = len(data)
+    if start or end != len(data):
+        data = memoryview(data)[start:end]
+
+    it = iter(data)
+    for lo in it:
+        for hi in it:
+            x = crc ^ lo ^ (hi << 8)
+            crc = t2[x & 0xFF] ^ t1[x >> 8]
+            break
+        else:
+            # odd length, the last byte takes a single step
+            crc = (crc >> 8) ^ t1[(crc ^ lo) & 0xFF]
+
+    return crc
+
+
+def check(frame):
+    """
+    Check a frame which ends with its CRC.
+
+    :param      frame:  The frame including the CRC
+    :type       frame:  Union[bytes, bytearray, memoryview]
+
+    :returns:   Flag whether the CRC residue is zero
+    :rtype:     bool
+    """
+    return len(frame) > Const.CRC_LENGTH and crc16(frame) == 0
+
+
+class CRC16(object):
+    """Resumable Modbus CRC16 state"""
+    def __init__(self, data=None):
+        self.crc = CRC16_INIT
+
+        if data:
+            self.update(data)
+
+    def reset(self):
+        self.crc = CRC16_INIT
+
+    def update(self, data, start=0, end=None):
+        self.crc = crc16(data, self.crc, start, end)
+
+        return self
+
+    def is_valid(self):
+        # data fed so far ends with its own CRC
+        return self.crc == 0
+
+    def digest(self):
+        return struct.pack('<H', self.crc)
+
+    def pack_into(self, buf, offset):
+        struct.pack_into('<H', buf, offset, self.crc)
+
+
+def _crc16_bytewise(data):
+    crc = CRC16_INIT
+
+    for char in data:
+        crc = (crc >> 8) ^ _TABLE[(crc ^ char) & 0xFF]
+
+    return crc
+
+
+def benchmark(sizes=(8, 256), duration_ms=1000):
+    """
+    Print the CRC16 throughput of the byte-wise and the table driven loops.
+
+    :param      sizes:        The frame sizes in bytes
+    :type       sizes:        tuple
+    :param      duration_ms:  The run time of each measurement
+    :type       duration_ms:  int
+    """
+    for size in sizes:
+        frame = bytes(i & 0xFF for i in range(size))
+
+        for name, func in (('bytewise', _crc16_bytewise), ('table', crc16)):
+            rounds = 0
+            start = time.ticks_us()
+            while True:
+                for _ in range(100):
+                    func(frame)
+                rounds += 100
+                elapsed = time.ticks_diff(time.ticks_us(), start)
+                if elapsed >= duration_ms * 1000:
+                    break
+
+            print('crc16 {:>10} {:4d} B: {:8.3f} MB/s'.
+                  format(name, size, rounds * size / elapsed))
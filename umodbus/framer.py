@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2019, Pycom Limited.
+#
+# This software is licensed under the GNU GPL version 3 or any
+# later version, with permitted additional terms. For more information
+# see the Pycom Licence v1.0 document supplied with this file, or
+# available at https://www.pycom.io/opensource/licensing
+#
+
+# custom packages
+from . import const as Const
+from .crc import CRC16_INIT
+from .crc import crc16
+
+# frame lengths (address + PDU + CRC) of fixed size function codes
+_FIXED_REQUEST_LEN = {
+    Const.READ_COILS: 8,
+    Const.READ_DISCRETE_INPUTS: 8,
+    Const.READ_HOLDING_REGISTERS: 8,
+    Const.READ_INPUT_REGISTER: 8,
+    Const.WRITE_SINGLE_COIL: 8,
+    Const.WRITE_SINGLE_REGISTER: 8,
+    Const.READ_EXCEPTION_STATUS: 4,
+    Const.DIAGNOSTICS: 8,
+    Const.GET_COM_EVENT_COUNTER: 4,
+    Const.GET_COM_EVENT_LOG: 4,
+    Const.REPORT_SERVER_ID: 4,
+    Const.MASK_WRITE_REGISTER: 10,
+    Const.READ_FIFO_QUEUE: 6,
+    Const.READ_DEVICE_IDENTIFICATION: 7,
+}
+
+_FIXED_RESPONSE_LEN = {
+    Const.WRITE_SINGLE_COIL: 8,
+    Const.WRITE_SINGLE_REGISTER: 8,
+    Const.WRITE_MULTIPLE_COILS: 8,
+    Const.WRITE_MULTIPLE_REGISTERS: 8,
+    Const.READ_EXCEPTION_STATUS: 5,
+    Const.DIAGNOSTICS: 8,
+    Const.GET_COM_EVENT_COUNTER: 8,
+    Const.MASK_WRITE_REGISTER: 10,
+}
+
+# offset of the byte count field of variable size function codes
+_COUNTED_REQUEST_OFFSET = {
+    Const.WRITE_MULTIPLE_COILS: 6,
+    Const.WRITE_MULTIPLE_REGISTERS: 6,
+    Const.READ_FILE_RECORD: 2,
+    Const.WRITE_FILE_RECORD: 2,
+    Const.READ_WRITE_MULTIPLE_REGISTERS: 10,
+}
+
+_COUNTED_RESPONSE_OFFSET = {
+    Const.READ_COILS: 2,
+    Const.READ_DISCRETE_INPUTS: 2,
+    Const.READ_HOLDING_REGISTERS: 2,
+    Const.READ_INPUT_REGISTER: 2,
+    Const.GET_COM_EVENT_LOG: 2,
+    Const.REPORT_SERVER_ID: 2,
+    Const.READ_FILE_RECORD: 2,
+    Const.WRITE_FILE_RECORD: 2,
+    Const.READ_WRITE_MULTIPLE_REGISTERS: 2,
+}
+
+# frame length can only be found by inter-frame silence
+UNKNOWN_LENGTH = -1
+# bytes at this position can not start a frame
+INVALID_FRAME = -2
+
+
+def frame_length(buf, pos=0, request=False):
+    """
+    Get the total length of the RTU frame starting at pos.
+
+    :param      buf:      The received bytes
+    :type       buf:      bytearray
+    :param      pos:      The offset of the slave address of the frame
+    :type       pos:      int
+    :param      request:  Flag whether the frame is a request to a slave
+    :type       request:  bool
+
+    :returns:   Frame length, 0 if more bytes are needed to tell it,
+                UNKNOWN_LENGTH if only silence can end the frame,
+                INVALID_FRAME if no frame starts at pos
+    :rtype:     int
+    """
+    available = len(buf) - pos
+    if available < 2:
+        return 0
+
+    function_code = buf[pos + 1]
+    if function_code == 0 or (request and function_code & Const.ERROR_BIAS):
+        return INVALID_FRAME
+
+    if request:
+        fixed = _FIXED_REQUEST_LEN
+        counted = _COUNTED_REQUEST_OFFSET
+    else:
+        if function_code & Const.ERROR_BIAS:
+            return Const.ERROR_RESP_LEN
+
+        fixed = _FIXED_RESPONSE_LEN
+        counted = _COUNTED_RESPONSE_OFFSET
+
+        if function_code == Const.READ_FIFO_QUEUE:
+            if available < 4:
+                return 0
+            return 4 + ((buf[pos + 2] << 8) | buf[pos + 3]) + Const.CRC_LENGTH
+
+    if function_code in fixed:
+        return fixed[function_code]
+
+    if function_code in counted:
+        offset = counted[function_code]
+        if available <= offset:
+            return 0
+        return offset + 1 + buf[pos + offset] + Const.CRC_LENGTH
+
+    return UNKNOWN_LENGTH
+
+
+class RTUFramer(object):
+    """
+    Incremental RTU frame parser.
+
+    Byte chunks are fed as they arrive from the uart, complete frames with
+    a valid CRC are handed out and any leftover bytes are kept for the next
+    chunk. Garbage in front of a frame is skipped one byte at a time.
+
+    The CRC of the current frame is carried along as bytes arrive, so a
+    complete frame is checked by its residue without another pass.
+    """
+    def __init__(self, request=False):
+        self._request = request
+        self._buf = bytearray()
+        self._pos = 0
+        self._crc = CRC16_INIT
+        self._crc_pos = 0
+
+    @property
+    def pending(self):
+        """
+        Get the number of buffered bytes not yet part of a frame.
+
+        :returns:   Number of pending bytes
+        :rtype:     int
+        """
+        return len(self._buf) - self._pos
+
+    def reset(self):
+        """Drop all buffered bytes."""
+        self._buf = bytearray()
+        self._pos = 0
+        self._crc = CRC16_INIT
+        self._crc_pos = 0
+
+    def _skip(self, count):
+        self._pos += count
+        self._crc = CRC16_INIT
+        self._crc_pos = self._pos
+
+    def _update_crc(self, end):
+        if end > self._crc_pos:
+            self._crc = crc16(self._buf, self._crc, self._crc_pos, end)
+            self._crc_pos = end
+
+    def feed(self, data):
+        """
+        Add received bytes and extract all complete frames.
+
+        :param      data:  The received bytes
+        :type       data:  Union[bytes, bytearray]
+
+        :returns:   Complete frames including address and CRC
+        :rtype:     List[bytes]
+        """
+        frames = []
+        if data:
+            self._buf.extend(data)
+
+        buf = self._buf
+        while True:
+            pos = self._pos
+            length = frame_length(buf, pos, self._request)
+
+            if length == INVALID_FRAME:
+                self._skip(1)
+                continue
+
+            if length == UNKNOWN_LENGTH:
+                # wait for the silence unless this can not be a frame anymore
+                if len(buf) - pos <= Const.MAX_ADU_LENGTH:
+                    self._update_crc(len(buf))
+                    break
+                self._skip(1)
+                continue
+
+            if length == 0 or len(buf) - pos < length:
+                self._update_crc(len(buf))
+                break
+
+            self._update_crc(pos + length)
+            if self._crc == 0:
+                frames.append(bytes(buf[pos:pos + length]))
+                self._skip(length)
+            else:
+                # resynchronise on the next byte
+                self._skip(1)
+
+        if self._pos:
+            self._buf = buf[self._pos:]
+            self._crc_pos -= self._pos
+            self._pos = 0
+
+        return frames
+
+    def flush(self):
+        """
+        End the current frame on inter-frame silence.
+
+        :returns:   The pending bytes, may be empty or have an invalid CRC
+        :rtype:     bytes
+        """
+        frame = bytes(self._buf[self._pos:])
+        self.reset()
+
+        return frame
@@ -9,73 +9,121 @@
 #
 
 # system packages
-import ustruct as struct
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
 
 # custom packages
 from . import const as Const
+from .structs import layout
 
-def read_coils(starting_address, quantity):
-    if not (1 <= quantity <= 2000):
-        raise ValueError('invalid number of coils')
-
-    return struct.pack('>BHH', Const.READ_COILS, starting_address, quantity)
-
+# read function code: (max quantity, name used in errors)
+_READ_LIMITS = {
+    Const.READ_COILS: (Const.MAX_READ_BITS, 'coils'),
+    Const.READ_DISCRETE_INPUTS: (Const.MAX_READ_BITS, 'discrete inputs'),
+    Const.READ_HOLDING_REGISTERS: (Const.MAX_READ_REGISTERS, 'holding registers'),
+    Const.READ_INPUT_REGISTER: (Const.MAX_READ_REGISTERS, 'input registers'),
+}
 
-def read_discrete_inputs(starting_address, quantity):
-    if not (1 <= quantity <= 2000):
-        raise ValueError('invalid number of discrete inputs')
 
-    return struct.pack('>BHH', Const.READ_DISCRETE_INPUTS, starting_address, quantity)
+def _pack(encode_into, size, *args):
+    buf = bytearray(size)
+    length = encode_into(buf, 0, *args)
 
+    return bytes(buf[:length])
 
-def read_holding_registers(starting_address, quantity):
-    if not (1 <= quantity <= 125):
-        raise ValueError('invalid number of holding registers')
 
-    return struct.pack('>BHH', Const.READ_HOLDING_REGISTERS, starting_address, quantity)
+# The *_into functions encode the request PDU in place at buf[offset:] and
+# return its length, so a master can reuse one ADU buffer for all requests.
 
+def read_request_into(buf, offset, function_code, starting_address, quantity):
+    max_quantity, name = _READ_LIMITS[function_code]
+    if not (1 <= quantity <= max_quantity):
+        raise ValueError('invalid number of {}'.format(name))
 
-def read_input_registers(starting_address, quantity):
-    if not (1 <= quantity <= 125):
-        raise ValueError('invalid number of input registers')
+    struct.pack_into('>BHH', buf, offset, function_code, starting_address, quantity)
 
-    return struct.pack('>BHH', Const.READ_INPUT_REGISTER, starting_address, quantity)
+    return 5
 
 
-def write_single_coil(output_address, output_value):
+def write_single_coil_into(buf, offset, output_address, output_value):
     if output_value not in [0, 0xFF00]:
         raise ValueError('Illegal coil value')
 
-    return struct.pack('>BHH', Const.WRITE_SINGLE_COIL, output_address, output_value)
+    struct.pack_into('>BHH', buf, offset, Const.WRITE_SINGLE_COIL, output_address, output_value)
 
+    return 5
 
-def write_single_register(register_address, register_value, signed=True):
-    fmt = 'h' if signed else 'H'
 
-    return struct.pack('>BH' + fmt, Const.WRITE_SINGLE_REGISTER, register_address, register_value)
+def write_single_register_into(buf, offset, register_address, register_value, signed=True):
+    layout('>BH', 1, signed).pack_into(buf, offset, Const.WRITE_SINGLE_REGISTER, register_address, register_value)
 
+    return 5
 
-def write_multiple_coils(starting_address, value_list):
-    sectioned_list = [value_list[i:i + 8] for i in range(0, len(value_list), 8)]
 
-    output_value = []
-    for index, byte in enumerate(sectioned_list):
-        output = sum(v << i for i, v in enumerate(byte))
-        output_value.append(output)
+def write_multiple_coils_into(buf, offset, starting_address, value_list):
+    quantity = len(value_list)
 
-    fmt = 'B' * len(output_value)
+    if not (1 <= quantity <= 0x07B0):
+        raise ValueError('invalid number of coils')
 
-    return struct.pack('>BHHB' + fmt, Const.WRITE_MULTIPLE_COILS, starting_address, len(value_list), ((len(value_list) - 1) // 8) + 1, *output_value)
+    byte_count = ((quantity - 1) // 8) + 1
+    struct.pack_into('>BHHB', buf, offset, Const.WRITE_MULTIPLE_COILS, starting_address, quantity, byte_count)
 
+    pos = offset + 6
+    for index in range(byte_count):
+        buf[pos + index] = 0
 
-def write_multiple_registers(starting_address, register_values, signed=True):
+    for index, value in enumerate(value_list):
+        if value:
+            buf[pos + (index >> 3)] |= 1 << (index & 7)
+
+    return 6 + byte_count
+
+
+def write_multiple_registers_into(buf, offset, starting_address, register_values, signed=True):
     quantity = len(register_values)
 
     if not (1 <= quantity <= 123):
         raise ValueError('invalid number of registers')
 
-    fmt = ('h' if signed else 'H') * quantity
-    return struct.pack('>BHHB' + fmt, Const.WRITE_MULTIPLE_REGISTERS, starting_address, quantity, quantity * 2, *register_values)
+    layout('>BHHB', quantity, signed).pack_into(buf, offset, Const.WRITE_MULTIPLE_REGISTERS, starting_address,
+                                                quantity, quantity * 2, *register_values)
+
+    return 6 + quantity * 2
+
+
+def read_coils(starting_address, quantity):
+    return _pack(read_request_into, 5, Const.READ_COILS, starting_address, quantity)
+
+
+def read_discrete_inputs(starting_address, quantity):
+    return _pack(read_request_into, 5, Const.READ_DISCRETE_INPUTS, starting_address, quantity)
+
+
+def read_holding_registers(starting_address, quantity):
+    return _pack(read_request_into, 5, Const.READ_HOLDING_REGISTERS, starting_address, quantity)
+
+
+def read_input_registers(starting_address, quantity):
+    return _pack(read_request_into, 5, Const.READ_INPUT_REGISTER, starting_address, quantity)
+
+
+def write_single_coil(output_address, output_value):
+    return _pack(write_single_coil_into, 5, output_address, output_value)
+
+
+def write_single_register(register_address, register_value, signed=True):
+    return _pack(write_single_register_into, 5, register_address, register_value, signed)
+
+
+def write_multiple_coils(starting_address, value_list):
+    return _pack(write_multiple_coils_into, 6 + ((len(value_list) + 7) // 8), starting_address, value_list)
+
+
+def write_multiple_registers(starting_address, register_values, signed=True):
+    return _pack(write_multiple_registers_into, 6 + len(register_values) * 2, starting_address, register_values, signed)
 
 
 def validate_resp_data(data,
@@ -85,14 +133,13 @@ def validate_resp_data(data,
                        quantity=None,
                        signed=True):
     if function_code in [Const.WRITE_SINGLE_COIL, Const.WRITE_SINGLE_REGISTER]:
-        fmt = '>H' + ('h' if signed else 'H')
-        resp_addr, resp_value = struct.unpack(fmt, data)
+        resp_addr, resp_value = layout('>H', 1, signed).unpack_from(data)
 
         if (address == resp_addr) and (value == resp_value):
             return True
 
     elif function_code in [Const.WRITE_MULTIPLE_COILS, Const.WRITE_MULTIPLE_REGISTERS]:
-        resp_addr, resp_qty = struct.unpack('>HH', data)
+        resp_addr, resp_qty = layout('>H', 1, False).unpack_from(data)
 
         if (address == resp_addr) and (quantity == resp_qty):
             return True
@@ -100,43 +147,82 @@ def validate_resp_data(data,
     return False
 
 
-def response(function_code,
-             request_register_addr,
-             request_register_qty,
-             request_data,
-             value_list=None,
-             signed=True):
+def response_into(buf,
+                  offset,
+                  function_code,
+                  request_register_addr,
+                  request_register_qty,
+                  request_data,
+                  value_list=None,
+                  signed=True):
+    """
+    Encode a response PDU in place at buf[offset:].
+
+    :returns:   The length of the PDU, 0 for unsupported function codes
+    :rtype:     int
+    """
     if function_code in [Const.READ_COILS, Const.READ_DISCRETE_INPUTS]:
-        output_value = []
-        sectioned_list = [value_list[i:i + 8] for i in range(0, len(value_list), 8)]
+        byte_count = ((len(value_list) - 1) // 8) + 1
+        buf[offset] = function_code
+        buf[offset + 1] = byte_count
+
+        pos = offset + 2
+        for index in range(byte_count):
+            buf[pos + index] = 0
 
-        for index, byte in enumerate(sectioned_list):
-            output = sum(v << i for i, v in enumerate(byte))
-            output_value.append(output)
+        for index, value in enumerate(value_list):
+            if value:
+                buf[pos + (index >> 3)] |= 1 << (index & 7)
 
-        fmt = 'B' * len(output_value)
-        return struct.pack('>BB' + fmt, function_code, ((len(value_list) - 1) // 8) + 1, *output_value)
+        return 2 + byte_count
 
-    elif function_code in [Const.READ_HOLDING_REGISTERS, Const.READ_INPUT_REGISTER]:
+    elif function_code in [Const.READ_HOLDING_REGISTERS,
+                           Const.READ_INPUT_REGISTER,
+                           Const.READ_WRITE_MULTIPLE_REGISTERS]:
         quantity = len(value_list)
 
         if not (0x0001 <= quantity <= 0x007D):
             raise ValueError('invalid number of registers')
 
         if signed is True or signed is False:
-            fmt = ('h' if signed else 'H') * quantity
-        else:
-            fmt = ''
-            for s in signed:
-                fmt += 'h' if s else 'H'
+            layout('>BB', quantity, signed).pack_into(buf, offset, function_code, quantity * 2, *value_list)
+            return 2 + quantity * 2
 
-        return struct.pack('>BB' + fmt, function_code, quantity * 2, *value_list)
+        # signedness per register, not worth caching
+        fmt = ''
+        for s in signed:
+            fmt += 'h' if s else 'H'
+
+        struct.pack_into('>BB' + fmt, buf, offset, function_code, quantity * 2, *value_list)
+        return 2 + quantity * 2
 
     elif function_code in [Const.WRITE_SINGLE_COIL, Const.WRITE_SINGLE_REGISTER]:
-        return struct.pack('>BHBB', function_code, request_register_addr, *request_data)
+        struct.pack_into('>BHBB', buf, offset, function_code, request_register_addr, *request_data)
+        return 5
 
     elif function_code in [Const.WRITE_MULTIPLE_COILS, Const.WRITE_MULTIPLE_REGISTERS]:
-        return struct.pack('>BHH', function_code, request_register_addr, request_register_qty)
+        struct.pack_into('>BHH', buf, offset, function_code, request_register_addr, request_register_qty)
+        return 5
+
+    elif function_code == Const.MASK_WRITE_REGISTER:
+        struct.pack_into('>BHBBBB', buf, offset, function_code, request_register_addr, *request_data)
+        return 7
+
+    return 0
+
+
+def response(function_code,
+             request_register_addr,
+             request_register_qty,
+             request_data,
+             value_list=None,
+             signed=True):
+    # large enough for the register values or the echo of a write
+    size = 7 + 2 * len(value_list) if value_list else 7
+    pdu = _pack(response_into, size, function_code, request_register_addr,
+                request_register_qty, request_data, value_list, signed)
+
+    return pdu if pdu else None
 
 
 def exception_response(function_code, exception_code):
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Modbus TCP to RTU gateway
+
+Requests of TCP clients are routed by unit ID to a serial bus. Every client
+has its own queue, the queues are served round robin so a busy client can
+not starve the others. A unit which does not answer in time is reported
+with exception 0x0B instead of stalling the client.
+"""
+
+# system packages
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+
+# custom packages
+from . import functions
+from . import const as Const
+
+
+class _Route(object):
+    def __init__(self, bus, timeout):
+        self.bus = bus
+        self.timeout = timeout
+
+
+class ModbusGateway(object):
+    def __init__(self, server, timeout: int = 1000, max_queue: int = 16):
+        """
+        Create a gateway.
+
+        :param      server:     The bound TCP server receiving the requests
+        :type       server:     TCPServer
+        :param      timeout:    The default response timeout of a unit in
+                                milliseconds
+        :type       timeout:    int
+        :param      max_queue:  The maximum number of queued requests per
+                                client, further requests are answered with
+                                a busy exception
+        :type       max_queue:  int
+        """
+        self._server = server
+        self._timeout = timeout
+        self._max_queue = max_queue
+        self._routes = dict()
+
+        # queued requests per client and the round robin order of clients
+        self._queues = dict()
+        self._order = []
+        self._running = False
+
+        # statistics
+        self.forwarded = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def add_route(self, unit_id: int, bus, timeout: int = None) -> None:
+        """
+        Route a unit ID to a serial bus.
+
+        :param      unit_id:  The unit ID, it is the slave address on the bus
+        :type       unit_id:  int
+        :param      bus:      The RTU master or a BusClient sharing it
+        :type       bus:      object
+        :param      timeout:  The response timeout of the unit in
+                              milliseconds, None for the gateway default
+        :type       timeout:  int
+        """
+        self._routes[unit_id] = _Route(bus, self._timeout if timeout is None else timeout)
+
+    def remove_route(self, unit_id: int) -> None:
+        self._routes.pop(unit_id, None)
+
+    @property
+    def pending(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _reply(self, client, trans_id, unit_id, modbus_pdu):
+        try:
+            self._server.send_adu(client, trans_id, unit_id, modbus_pdu)
+        except OSError:
+            # the client is gone, drop what it still has queued
+            self._queues.pop(client, None)
+            if client in self._order:
+                self._order.remove(client)
+
+    def _reject(self, client, trans_id, unit_id, function_code, exception_code):
+        self.rejected += 1
+        self._reply(client,
+                    trans_id,
+                    unit_id,
+                    functions.exception_response(function_code & 0x7F, exception_code))
+
+    def _enqueue(self, adu):
+        client, trans_id, unit_id, modbus_pdu = adu
+
+        if unit_id not in self._routes:
+            self._reject(client, trans_id, unit_id, modbus_pdu[0],
+                         Const.GATEWAY_PATH_UNAVAILABLE)
+            return
+
+        queue = self._queues.get(client)
+        if queue is None:
+            queue = []
+            self._queues[client] = queue
+
+        if len(queue) >= self._max_queue:
+            self._reject(client, trans_id, unit_id, modbus_pdu[0],
+                         Const.SERVER_DEVICE_BUSY)
+            return
+
+        queue.append((time.ticks_ms(), trans_id, unit_id, bytes(modbus_pdu)))
+        if client not in self._order:
+            self._order.append(client)
+
+    def _forward_next(self):
+        if not self._order:
+            return False
+
+        # round robin, a client with more requests goes to the back
+        client = self._order.pop(0)
+        queue = self._queues[client]
+        received, trans_id, unit_id, modbus_pdu = queue.pop(0)
+        if queue:
+            self._order.append(client)
+        else:
+            del self._queues[client]
+
+        route = self._routes.get(unit_id)
+        if route is None:
+            self._reject(client, trans_id, unit_id, modbus_pdu[0],
+                         Const.GATEWAY_PATH_UNAVAILABLE)
+            return True
+
+        # the client gave up on requests which waited longer than the unit
+        # may take to answer, do not spend bus time on them
+        remaining = route.timeout - time.ticks_diff(time.ticks_ms(), received)
+        if remaining <= 0:
+            self.timeouts += 1
+            self._reject(client, trans_id, unit_id, modbus_pdu[0],
+                         Const.DEVICE_FAILED_TO_RESPOND)
+            return True
+
+        try:
+            response = route.bus.send_receive_pdu(unit_id, modbus_pdu, remaining)
+        except (OSError, ValueError):
+            self.timeouts += 1
+            self._reject(client, trans_id, unit_id, modbus_pdu[0],
+                         Const.DEVICE_FAILED_TO_RESPOND)
+            return True
+
+        self.forwarded += 1
+        self._reply(client, trans_id, unit_id, response)
+
+        return True
+
+    def process(self, timeout: int = 0) -> bool:
+        """
+        Take a new request from the server and forward one queued request.
+
+        :param      timeout:  Time to wait for a new client in milliseconds
+        :type       timeout:  int
+
+        :returns:   Flag whether a request was forwarded or answered
+        :rtype:     bool
+        """
+        adu = self._server.get_adu(timeout)
+        if adu is not None:
+            self._enqueue(adu)
+
+        return self._forward_next()
+
+    def run(self) -> None:
+        """Run the gateway until stop is called."""
+        self._running = True
+
+        while self._running:
+            self.process(0 if self._order else 100)
+
+    def stop(self) -> None:
+        self._running = False
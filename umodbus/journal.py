@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Persistence of the registers written by a master
+
+Written ranges are appended to a journal file as records with their own CRC,
+so a record torn by a power loss is detected and ignored on replay. Writes
+are taken from the change log of the slave and flushed in batches, the
+journal is rewritten as a snapshot of the registers once it grew too large.
+
+Record layout, little endian:
+    magic (B), table (B), address (H), count (H), values (H * count), CRC16 (H)
+"""
+
+# system packages
+import _thread
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    import uos
+except ImportError:
+    import os as uos
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+
+# memory mapped replay on the host, MicroPython reads the file instead
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+# custom packages
+from .crc import crc16
+from .structs import layout
+
+_MAGIC = 0xA5
+_HDR_FMT = '<BBHH'
+_HDR_LENGTH = 6
+_CRC_LENGTH = 2
+_TABLES = ('COILS', 'HREGS', 'IREGS', 'ISTS')
+
+# registers per record, keeps the encode buffer small
+_MAX_RECORD_COUNT = 256
+
+
+def _exists(path):
+    try:
+        uos.stat(path)
+    except OSError:
+        return False
+
+    return True
+
+
+def _remove(path):
+    try:
+        uos.remove(path)
+    except OSError:
+        pass
+
+
+def _sync(f):
+    # MicroPython has no fsync, flushing hands the data to the filesystem
+    f.flush()
+
+    fsync = getattr(uos, 'fsync', None)
+    if fsync is not None:
+        fsync(f.fileno())
+
+
+class RegisterJournal(object):
+    def __init__(self,
+                 modbus,
+                 path: str,
+                 tables: tuple = ('HREGS', 'COILS'),
+                 flush_ms: int = 5000,
+                 max_size: int = 32768):
+        """
+        Create a journal of a slave, call restore after adding the registers.
+
+        :param      modbus:    The slave
+        :type       modbus:    Modbus
+        :param      path:      The journal file
+        :type       path:      str
+        :param      tables:    The register types to persist
+        :type       tables:    tuple
+        :param      flush_ms:  The write behind time in milliseconds
+        :type       flush_ms:  int
+        :param      max_size:  The file size in bytes which triggers a
+                               compaction
+        :type       max_size:  int
+        """
+        self._modbus = modbus
+        self._path = path
+        self._tables = tables
+        self.flush_ms = flush_ms
+        self.max_size = max_size
+
+        self._lock = _thread.allocate_lock()
+        self._seq = modbus.change_log.seq
+        self._size = 0
+        self._last_flush = time.ticks_ms()
+        self._thread_running = False
+
+        # statistics
+        self.records = 0
+        self.compactions = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def _encode(self, buf, table, address, values):
+        start = len(buf)
+        count = len(values)
+
+        buf.extend(struct.pack(_HDR_FMT, _MAGIC, _TABLES.index(table), address, count))
+        buf.extend(layout('<', count, False).pack(*[int(value) & 0xFFFF for value in values]))
+        buf.extend(struct.pack('<H', crc16(buf, start=start)))
+
+        self.records += 1
+
+    def _apply(self, table, address, values):
+        if table in self._tables:
+            self._modbus.restore_range(table, address, values)
+
+    def _replay(self, data):
+        """
+        Apply the valid records of a journal.
+
+        :param      data:  The journal content
+        :type       data:  Union[bytes, mmap]
+
+        :returns:   The length of the valid records, the rest is torn
+        :rtype:     int
+        """
+        offset = 0
+        length = len(data)
+
+        while offset + _HDR_LENGTH + _CRC_LENGTH <= length:
+            magic, table, address, count = struct.unpack_from(_HDR_FMT, data, offset)
+            end = offset + _HDR_LENGTH + count * 2
+
+            if magic != _MAGIC or table >= len(_TABLES) or end + _CRC_LENGTH > length:
+                break
+            if crc16(data, start=offset, end=end + _CRC_LENGTH) != 0:
+                break
+
+            values = layout('<', count, False).unpack_from(data, offset + _HDR_LENGTH)
+            self._apply(_TABLES[table], address, values)
+            offset = end + _CRC_LENGTH
+
+        return offset
+
+    def restore(self) -> int:
+        """
+        Replay the journal into the registers of the slave.
+
+        A torn or corrupted tail is dropped by compacting the journal. If a
+        compaction was cut off after the old journal was removed, its
+        snapshot is used.
+
+        :returns:   The number of valid bytes replayed
+        :rtype:     int
+        """
+        with self._lock:
+            tmp_path = self._path + '.tmp'
+            if _exists(self._path):
+                # a compaction stopped before the old journal was removed,
+                # the snapshot may be incomplete
+                _remove(tmp_path)
+            elif _exists(tmp_path):
+                # a compaction stopped between removing the old journal
+                # and the rename, the snapshot is complete
+                uos.rename(tmp_path, self._path)
+
+            try:
+                f = open(self._path, 'rb')
+            except OSError:
+                self._size = 0
+                return 0
+
+            with f:
+                mapped = None
+                if mmap is not None:
+                    try:
+                        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    except (OSError, ValueError):
+                        # empty files can not be mapped
+                        pass
+
+                # iterating a mmap yields bytes, the CRC needs a byte view
+                data = f.read() if mapped is None else memoryview(mapped)
+
+                try:
+                    valid = self._replay(data)
+                    size = len(data)
+                finally:
+                    if mapped is not None:
+                        data.release()
+                        mapped.close()
+
+            # writes done before the restore are not journaled again
+            self._seq = self._modbus.change_log.seq
+            self._size = size
+
+            if valid < size or size > self.max_size:
+                self._compact()
+
+            return valid
+
+    def _compact(self):
+        buf = bytearray()
+
+        for table in self._tables:
+            for start, length in self._modbus.register_ranges(table):
+                for offset in range(0, length, _MAX_RECORD_COUNT):
+                    count = min(_MAX_RECORD_COUNT, length - offset)
+                    self._encode(buf, table, start + offset,
+                                 self._modbus.read_range(table, start + offset, count))
+
+        # the snapshot is complete on flash before the old journal is
+        # removed, restore falls back to it if the rename did not happen
+        tmp_path = self._path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(buf)
+            _sync(f)
+
+        # FAT and LittleFS ports can not rename over an existing file
+        _remove(self._path)
+        uos.rename(tmp_path, self._path)
+
+        self._size = len(buf)
+        self.compactions += 1
+
+    def compact(self) -> None:
+        """Rewrite the journal as a snapshot of the persisted registers."""
+        with self._lock:
+            self._seq = self._modbus.change_log.seq
+            self._compact()
+
+    def _dirty_ranges(self, events):
+        # written addresses per table merged to contiguous ranges
+        addresses = dict()
+        for seq, timestamp, table, address, value in events:
+            if table in self._tables:
+                addresses.setdefault(table, set()).add(address)
+
+        ranges = []
+        for table, written in addresses.items():
+            start = None
+            for address in sorted(written):
+                if start is not None and address == end and end - start < _MAX_RECORD_COUNT:
+                    end += 1
+                    continue
+                if start is not None:
+                    ranges.append((table, start, end - start))
+                start = address
+                end = address + 1
+            ranges.append((table, start, end - start))
+
+        return ranges
+
+    def flush(self) -> int:
+        """
+        Append the ranges written since the last flush to the journal.
+
+        A change log which overflowed since the last flush lost writes, the
+        journal is compacted instead.
+
+        :returns:   The number of records written
+        :rtype:     int
+        """
+        with self._lock:
+            self._last_flush = time.ticks_ms()
+
+            events, lost = self._modbus.changes_since(self._seq)
+            if not events:
+                return 0
+
+            self._seq = events[-1][0]
+            records = self.records
+
+            if lost or self._size > self.max_size:
+                self._compact()
+                return self.records - records
+
+            buf = bytearray()
+            for table, address, count in self._dirty_ranges(events):
+                try:
+                    self._encode(buf, table, address,
+                                 self._modbus.read_range(table, address, count))
+                    continue
+                except KeyError:
+                    # registers were removed since the write
+                    pass
+
+                for offset in range(count):
+                    try:
+                        value = self._modbus.read_range(table, address + offset, 1)
+                    except KeyError:
+                        continue
+                    self._encode(buf, table, address + offset, value)
+
+            if buf:
+                with open(self._path, 'ab') as f:
+                    f.write(buf)
+                    _sync(f)
+                self._size += len(buf)
+
+            return self.records - records
+
+    def poll(self) -> int:
+        """
+        Flush if the write behind time passed, call it from the main loop.
+
+        :returns:   The number of records written
+        :rtype:     int
+        """
+        if time.ticks_diff(time.ticks_ms(), self._last_flush) < self.flush_ms:
+            return 0
+
+        return self.flush()
+
+    def _worker(self):
+        while self._thread_running:
+            time.sleep_ms(self.flush_ms)
+            self.flush()
+
+    def start(self) -> None:
+        """Flush in a thread every flush_ms instead of calling poll."""
+        if not self._thread_running:
+            self._thread_running = True
+            _thread.start_new_thread(self._worker, ())
+
+    def stop(self) -> None:
+        """Stop the flush thread and write the pending ranges."""
+        self._thread_running = False
+        self.flush()
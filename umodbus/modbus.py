@@ -6,32 +6,86 @@ modbus script
 """
 
 # system packages
-import utime as time
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
 
 # custom packages
 from .rtu import RTU
 from .tcp import TCPServer
+from .bank import RegisterBank
+from .cache import LRUCache
+from .changelog import ChangeLog
 from . import const as ModbusConst
 
 # typing not natively supported on MicroPython
-from .typing import List
-from .typing import Union
+try:
+    from typing import List
+    from typing import Union
+except ImportError:
+    from .typing import List
+    from .typing import Union
+
+
+class _Provider(object):
+    def __init__(self, provider, cache_ms):
+        self.provider = provider
+        self.cache_ms = cache_ms
+        self.updated = None
+
 
 class Modbus(object):
-    def __init__(self, itf, addr_list: list):
+    # register table read by a function code, used to find cached responses
+    _read_functions = {
+        ModbusConst.READ_COILS: 'COILS',
+        ModbusConst.READ_DISCRETE_INPUTS: 'ISTS',
+        ModbusConst.READ_HOLDING_REGISTERS: 'HREGS',
+        ModbusConst.READ_INPUT_REGISTER: 'IREGS',
+    }
+
+    def __init__(self,
+                 itf,
+                 addr_list: list,
+                 response_cache_size: int = 32,
+                 change_log_size: int = 256):
         self._itf = itf
         self._addr_list = addr_list
 
+        # encoded read responses by (unit, function, address, quantity),
+        # dropped as soon as a register of their range changes
+        self._response_cache = LRUCache(response_cache_size) if response_cache_size else None
+
         # modbus register types with their default value
         self._available_register_types = ['COILS', 'HREGS', 'IREGS', 'ISTS']
+        self._banks = dict()
+        for reg_type in self._available_register_types:
+            self._banks[reg_type] = RegisterBank(bits=reg_type in ['COILS', 'ISTS'])
+
+        # registers as added, start address and length or None for a
+        # single value, reads may span several of them
         self._register_dict = dict()
         for reg_type in self._available_register_types:
             self._register_dict[reg_type] = dict()
         self._default_vals = dict(zip(self._available_register_types,
                                       [True, 999, 999, True]))
 
+        # value providers called on reads and hooks called after writes of
+        # a master, by register address
+        self._providers = dict()
+        self._write_hooks = dict()
+        for reg_type in self._available_register_types:
+            self._providers[reg_type] = dict()
+            self._write_hooks[reg_type] = dict()
+
         # registers which can be set by remote channel
         self._changeable_register_types = ['COILS', 'HREGS']
+        self._change_log = ChangeLog(change_log_size)
+        # latest change per address as {'val': value, 'time': time} until
+        # removed by _remove_changed_register, kept apart from the ring so it
+        # loses no change when the ring overflows. It holds at most one
+        # entry per defined coil and holding register, entries of removed
+        # registers are dropped.
         self._changed_registers = dict()
         for reg_type in self._changeable_register_types:
             self._changed_registers[reg_type] = dict()
@@ -146,7 +200,8 @@ class Modbus(object):
         :param      address:  The address (ID) of the register
         :type       address:  int
 
-        :returns:   Holding register value
+        :returns:   Holding register value, unsigned 16 bit, e.g. 65531 after
+                    setting -5
         :rtype:     Union[int, List[int]]
         """
         return self._get_reg_in_dict(reg_type='HREGS',
@@ -270,7 +325,8 @@ class Modbus(object):
         :param      address:  The address (ID) of the register
         :type       address:  int
 
-        :returns:   Input register value
+        :returns:   Input register value, unsigned 16 bit, e.g. 65531 after
+                    setting -5
         :rtype:     Union[int, List[int]]
         """
         return self._get_reg_in_dict(reg_type='IREGS',
@@ -286,6 +342,122 @@ class Modbus(object):
         """
         return self._get_regs_of_dict(reg_type='IREGS')
 
+    def set_provider(self,
+                     reg_type: str,
+                     address: int,
+                     provider,
+                     cache_ms: int = 0) -> None:
+        """
+        Bind a register to a provider which is called when a master reads
+        it, the register is not refreshed otherwise.
+
+        The provider returns the value like it is passed to the setter of
+        the register type, e.g. a list for a register added with a list.
+        get_* returns the value of the last read.
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
+        :param      address:   The address (ID) of the added register
+        :type       address:   int
+        :param      provider:  The callable without arguments, None to
+                               unbind the register
+        :type       provider:  Callable
+        :param      cache_ms:  Time the provided value is reused in
+                               milliseconds, 0 calls the provider on
+                               every read
+        :type       cache_ms:  int
+
+        :raise      KeyError:  No register at specified address found
+        """
+        if address not in self._register_dict.get(reg_type, ()):
+            raise KeyError('No {} available for the register address {}'.
+                           format(reg_type, address))
+
+        if provider is None:
+            self._providers[reg_type].pop(address, None)
+        else:
+            self._providers[reg_type][address] = _Provider(provider, cache_ms)
+
+    def set_write_hook(self, reg_type: str, address: int, hook) -> None:
+        """
+        Bind a register to a hook which is called after a master wrote it.
+
+        The hook is called with the register type, the address and the new
+        value like it is returned by the getter of the register type.
+
+        :param      reg_type:  The register type, COILS or HREGS
+        :type       reg_type:  str
+        :param      address:   The address (ID) of the added register
+        :type       address:   int
+        :param      hook:      The callable, None to unbind the register
+        :type       hook:      Callable
+
+        :raise      KeyError:  No register at specified address found
+        """
+        if address not in self._register_dict.get(reg_type, ()):
+            raise KeyError('No {} available for the register address {}'.
+                           format(reg_type, address))
+
+        if hook is None:
+            self._write_hooks[reg_type].pop(address, None)
+        else:
+            self._write_hooks[reg_type][address] = hook
+
+    def _bound_regs(self, bound: dict, reg_type: str, address: int, count: int):
+        # addresses of the registers in bound overlapping a range
+        registers = self._register_dict[reg_type]
+        end = address + count
+
+        return [start for start in bound
+                if start < end and start + (registers[start] or 1) > address]
+
+    def _refresh_providers(self, reg_type: str, address: int, count: int):
+        """
+        Update the registers of a range which are bound to a provider and
+        whose value is older than its cache time.
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
+        :param      address:   The first address
+        :type       address:   int
+        :param      count:     The number of registers
+        :type       count:     int
+
+        :returns:   Flag whether all providers succeeded
+        :rtype:     bool
+        """
+        providers = self._providers[reg_type]
+        if not providers:
+            return True
+
+        now = time.ticks_ms()
+
+        for start in self._bound_regs(providers, reg_type, address, count):
+            entry = providers[start]
+            if entry.updated is not None and entry.cache_ms and \
+                    time.ticks_diff(now, entry.updated) < entry.cache_ms:
+                continue
+
+            try:
+                value = entry.provider()
+            except Exception:
+                return False
+
+            # an unchanged value keeps the cached responses
+            if value != self._get_reg_in_dict(reg_type=reg_type, address=start):
+                self._set_reg_in_dict(reg_type=reg_type, address=start, value=value)
+            entry.updated = now
+
+        return True
+
+    def _call_write_hooks(self, reg_type: str, address: int, count: int):
+        hooks = self._write_hooks[reg_type]
+        if not hooks:
+            return
+
+        for start in self._bound_regs(hooks, reg_type, address, count):
+            hooks[start](reg_type, start, self._get_reg_in_dict(reg_type, start))
+
     def _set_reg_in_dict(self,
                          reg_type: str,
                          address: int,
@@ -308,7 +480,47 @@ class Modbus(object):
             raise KeyError('{} is not a valid register type of {}'.
                            format(reg_type, self._available_register_types))
 
-        self._register_dict[reg_type][address] = value
+        values = value if isinstance(value, (list, tuple)) else [value]
+        length = len(values) if isinstance(value, (list, tuple)) else None
+        registers = self._register_dict[reg_type]
+
+        if address in registers and registers[address] != length:
+            self._release_reg(reg_type, address)
+
+        if address not in registers:
+            self._banks[reg_type].define(address, len(values))
+            registers[address] = length
+
+        self._banks[reg_type].write(address, values)
+        self._invalidate_responses(reg_type, address, len(values))
+
+    def _release_reg(self, reg_type: str, address: int):
+        """
+        Remove the register from the dictionary of registers, addresses not
+        covered by another register are removed from the bank.
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
+        :param      address:   The address (ID) of the register
+        :type       address:   int
+        """
+        registers = self._register_dict[reg_type]
+        length = registers.pop(address)
+        end = address + (1 if length is None else length)
+        self._invalidate_responses(reg_type, address, end - address)
+
+        others = [(other, other + (1 if other_length is None else other_length))
+                  for other, other_length in registers.items()
+                  if other < end and other + (1 if other_length is None else other_length) > address]
+
+        if not others:
+            self._banks[reg_type].undefine(address, end - address)
+            return
+
+        # keep the addresses still covered by another register
+        for addr in range(address, end):
+            if not any(start <= addr < stop for start, stop in others):
+                self._banks[reg_type].undefine(addr, 1)
 
     def _remove_reg_from_dict(self,
                               reg_type: str,
@@ -329,7 +541,24 @@ class Modbus(object):
             raise KeyError('{} is not a valid register type of {}'.
                            format(reg_type, self._available_register_types))
 
-        return self._register_dict[reg_type].pop(address, None)
+        if address not in self._register_dict[reg_type]:
+            return None
+
+        value = self._get_reg_in_dict(reg_type=reg_type, address=address)
+        length = self._register_dict[reg_type][address]
+        self._release_reg(reg_type, address)
+        self._providers[reg_type].pop(address, None)
+        self._write_hooks[reg_type].pop(address, None)
+
+        # changes are only kept for defined registers
+        changed = self._changed_registers.get(reg_type)
+        if changed:
+            bank = self._banks[reg_type]
+            for addr in range(address, address + (1 if length is None else length)):
+                if addr in changed and not bank.contains(addr):
+                    del changed[addr]
+
+        return value
 
     def _get_reg_in_dict(self,
                          reg_type: str,
@@ -351,7 +580,10 @@ class Modbus(object):
                            format(reg_type, self._available_register_types))
 
         if address in self._register_dict[reg_type]:
-            return self._register_dict[reg_type][address]
+            length = self._register_dict[reg_type][address]
+            if length is None:
+                return self._banks[reg_type].read(address, 1)[0]
+            return list(self._banks[reg_type].read(address, length))
         else:
             raise KeyError('No {} available for the register address {}'.
                            format(reg_type, address))
@@ -388,11 +620,42 @@ class Modbus(object):
         else:
             return False
 
+    @property
+    def change_log(self):
+        """
+        Get the log of the registers written by a master.
+
+        :returns:   The change log
+        :rtype:     ChangeLog
+        """
+        return self._change_log
+
+    def changes_since(self, seq: int = 0, limit: int = None):
+        """
+        Get the writes of a master following a sequence number.
+
+        :param      seq:    The sequence number of the last handled write,
+                            0 for all writes kept
+        :type       seq:    int
+        :param      limit:  The maximum number of writes, None for all
+        :type       limit:  int
+
+        :returns:   The writes as (seq, time, reg_type, address, value),
+                    oldest first, and the number of writes lost since seq
+                    because the log overflowed
+        :rtype:     tuple
+        """
+        return self._change_log.read(seq, limit)
+
     @property
     def changed_registers(self):
         """
         Get the changed registers.
 
+        Every address keeps its latest change until it is removed, also if
+        the change log dropped it since. Use changes_since to get every
+        write in order.
+
         :returns:   The changed registers.
         :rtype:     dict
         """
@@ -423,7 +686,7 @@ class Modbus(object):
                               address: int,
                               value: Union[bool, int, List[bool], List[int]]):
         """
-        Set the register value in the dictionary of changed registers.
+        Append the register value to the change log.
 
         :param      reg_type:  The register type
         :type       reg_type:  str
@@ -435,8 +698,9 @@ class Modbus(object):
         :raise      KeyError:  Register can not be changed externally
         """
         if reg_type in self._changeable_register_types:
-            content = {'val': value, 'time': time.ticks_ms()}
-            self._changed_registers[reg_type][address] = content
+            timestamp = time.ticks_ms()
+            self._change_log.append(reg_type, address, value, timestamp)
+            self._changed_registers[reg_type][address] = {'val': value, 'time': timestamp}
         else:
             raise KeyError('{} can not be changed externally'.format(reg_type))
 
@@ -445,7 +709,10 @@ class Modbus(object):
                                  address: int,
                                  timestamp: int):
         """
-        Remove the register from the dictionary of changed registers.
+        Remove the register from the changed registers.
+
+        The change log is not modified, consumers of changes_since still
+        get the change.
 
         :param      reg_type:  The register type
         :type       reg_type:  str
@@ -461,10 +728,11 @@ class Modbus(object):
         result = False
 
         if reg_type in self._changeable_register_types:
-            _changed_register_timestamp = self._changed_registers[reg_type][address]['time']
+            changed = self._changed_registers[reg_type]
 
-            if _changed_register_timestamp == timestamp:
-                self._changed_registers[reg_type].pop(address, None)
+            # a newer change with another timestamp stays
+            if changed[address]['time'] == timestamp:
+                changed.pop(address, None)
                 result = True
         else:
             raise KeyError('{} is not a valid register type of {}'.
@@ -479,14 +747,48 @@ class Modbus(object):
         :returns:   Result of processing, True on success, False otherwise
         :rtype:     bool
         """
-        reg_type = None
-        req_type = None
-
         request = self._itf.get_request(unit_addr_list=self._addr_list,
                                         timeout=0)
         if request is None:
             return False
 
+        self._process_request(request)
+
+        return True
+
+    def accepts(self, unit_addr: int) -> bool:
+        """
+        Check whether requests to a unit address are answered.
+
+        :param      unit_addr:  The unit address of the request
+        :type       unit_addr:  int
+
+        :returns:   Flag whether the unit address is served
+        :rtype:     bool
+        """
+        return (self._addr_list is None) or (unit_addr in self._addr_list)
+
+    def handle_request(self, request) -> None:
+        """
+        Answer a request received by another transport, e.g. asyncio.
+
+        The response is sent through the interface of the request.
+
+        :param      request:  The request
+        :type       request:  Request
+        """
+        self._process_request(request)
+
+    def _process_request(self, request):
+        """
+        Answer a request from the registers.
+
+        :param      request:  The request
+        :type       request:  Request
+        """
+        reg_type = None
+        req_type = None
+
         if request.function == ModbusConst.READ_COILS:
             # Coils (setter+getter) [0, 1]
             # function 01 - read single register
@@ -517,6 +819,26 @@ class Modbus(object):
             # function 06 - write holding register
             reg_type = 'HREGS'
             req_type = 'WRITE'
+        elif request.function == ModbusConst.WRITE_MULTIPLE_COILS:
+            # Coils (setter+getter) [0, 1]
+            # function 15 - write multiple coils
+            reg_type = 'COILS'
+            req_type = 'WRITE'
+        elif request.function == ModbusConst.WRITE_MULTIPLE_REGISTERS:
+            # Hregs (setter+getter) [0, 65535]
+            # function 16 - write multiple holding registers
+            reg_type = 'HREGS'
+            req_type = 'WRITE'
+        elif request.function == ModbusConst.MASK_WRITE_REGISTER:
+            # Hregs (setter+getter) [0, 65535]
+            # function 22 - mask write holding register
+            reg_type = 'HREGS'
+            req_type = 'WRITE'
+        elif request.function == ModbusConst.READ_WRITE_MULTIPLE_REGISTERS:
+            # Hregs (setter+getter) [0, 65535]
+            # function 23 - write, then read holding registers
+            reg_type = 'HREGS'
+            req_type = 'WRITE'
         else:
             request.send_exception(ModbusConst.ILLEGAL_FUNCTION)
 
@@ -526,8 +848,6 @@ class Modbus(object):
             elif req_type == 'WRITE':
                 self._process_write_access(request=request, reg_type=reg_type)
 
-        return True
-
     def _create_response(self, request, reg_type):
         """
         Create a response.
@@ -537,13 +857,10 @@ class Modbus(object):
         :param      reg_type:  The register type
         :type       reg_type:  str
 
-        :returns:   Values of this register
-        :rtype:     Union[bool, int, List[int], List[bool]]
+        :returns:   Values of the requested range
+        :rtype:     Union[List[bool], array]
         """
-        if type(self._register_dict[reg_type][request.register_addr]) is list:
-            return self._register_dict[reg_type][request.register_addr]
-        else:
-            return [self._register_dict[reg_type][request.register_addr]]
+        return self._banks[reg_type].read(request.register_addr, request.quantity)
 
     def _process_read_access(self, request, reg_type):
         """
@@ -554,12 +871,62 @@ class Modbus(object):
         :param      reg_type:  The register type
         :type       reg_type:  str
         """
-        if request.register_addr in self._register_dict[reg_type]:
+        if not self._refresh_providers(reg_type, request.register_addr, request.quantity):
+            request.send_exception(ModbusConst.SERVER_DEVICE_FAILURE)
+            return
+
+        cache = self._response_cache
+        key = (request.unit_addr, request.function, request.register_addr, request.quantity)
+
+        frame = None if cache is None else cache.get(key)
+        if frame is not None:
+            request.send_encoded(frame)
+            return
+
+        if self._banks[reg_type].contains(request.register_addr, request.quantity):
             vals = self._create_response(request=request, reg_type=reg_type)
-            request.send_response(vals)
+            # registers are stored as unsigned 16 bit values
+            frame = request.encode_response(vals, signed=False)
+            if cache is not None:
+                cache.put(key, frame)
+            request.send_encoded(frame)
         else:
             request.send_exception(ModbusConst.ILLEGAL_DATA_ADDRESS)
 
+    def _invalidate_responses(self, reg_type: str, address: int, count: int):
+        """
+        Drop the cached responses of reads overlapping a changed range.
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
+        :param      address:   The first changed address
+        :type       address:   int
+        :param      count:     The number of changed registers
+        :type       count:     int
+        """
+        cache = self._response_cache
+        if not cache:
+            return
+
+        end = address + count
+        for key in cache.keys():
+            unit_addr, function, start, quantity = key
+            if self._read_functions[function] == reg_type and \
+                    start < end and start + quantity > address:
+                cache.pop(key)
+
+    def response_cache_stats(self) -> dict:
+        """
+        Get the counters of the encoded response cache.
+
+        :returns:   The counters and current size, empty if disabled
+        :rtype:     dict
+        """
+        if self._response_cache is None:
+            return dict()
+
+        return self._response_cache.stats()
+
     def _process_write_access(self, request, reg_type):
         """
         Process write access to register
@@ -570,44 +937,124 @@ class Modbus(object):
         :type       reg_type:  str
         """
         address = request.register_addr
-        val = 0
-        valid_register = False
+        bank = self._banks[reg_type]
+
+        if request.function == ModbusConst.WRITE_SINGLE_COIL:
+            # the request only allows 0x0000 and 0xFF00
+            vals = [request.data[0] == 0xFF]
+        elif request.function == ModbusConst.WRITE_MULTIPLE_COILS:
+            vals = [bool(bit) for bit in request.data_as_bits()]
+        elif request.function == ModbusConst.MASK_WRITE_REGISTER:
+            if not bank.contains(address):
+                request.send_exception(ModbusConst.ILLEGAL_DATA_ADDRESS)
+                return
+
+            and_mask, or_mask = request.data_as_registers(signed=False)
+            current = bank.read(address, 1)[0]
+            vals = [(current & and_mask) | (or_mask & ~and_mask & 0xFFFF)]
+        elif request.function == ModbusConst.READ_WRITE_MULTIPLE_REGISTERS:
+            vals = request.data_as_registers(signed=False)
+
+            # both ranges are checked before any provider is asked
+            if not bank.contains(address, request.quantity) or \
+                    not bank.contains(request.write_addr, len(vals)):
+                request.send_exception(ModbusConst.ILLEGAL_DATA_ADDRESS)
+                return
+
+            # the write is done before the read
+            if not self._refresh_providers(reg_type, address, request.quantity):
+                request.send_exception(ModbusConst.SERVER_DEVICE_FAILURE)
+                return
+
+            address = request.write_addr
+        else:
+            vals = request.data_as_registers(signed=False)
 
-        if address in self._register_dict[reg_type]:
-            if reg_type == 'COILS':
-                val = request.data[0]
-                if val == 0x00:
-                    val = False
-                    valid_register = True
+        if not bank.contains(address, len(vals)):
+            request.send_exception(ModbusConst.ILLEGAL_DATA_ADDRESS)
+            return
 
-                    request.send_response()
+        bank.write(address, vals)
+        self._invalidate_responses(reg_type, address, len(vals))
 
-                    self.set_coil(address=address, value=val)
-                elif val == 0xFF:
-                    val = True
-                    valid_register = True
+        if request.function == ModbusConst.READ_WRITE_MULTIPLE_REGISTERS:
+            request.send_response(bank.read(request.register_addr, request.quantity),
+                                  signed=False)
+        else:
+            request.send_response()
 
-                    request.send_response()
+        for offset, val in enumerate(vals):
+            self._set_changed_register(reg_type=reg_type,
+                                       address=address + offset,
+                                       value=val)
 
-                    self.set_coil(address=address, value=val)
-                else:
-                    request.send_exception(ModbusConst.ILLEGAL_DATA_VALUE)
-            elif reg_type == 'HREGS':
-                valid_register = True
-                val = request.data_as_registers(signed=False)[0]
+        self._call_write_hooks(reg_type, address, len(vals))
 
-                request.send_response()
+    def _bank(self, reg_type: str):
+        if not self._check_valid_register(reg_type=reg_type):
+            raise KeyError('{} is not a valid register type of {}'.
+                           format(reg_type, self._available_register_types))
 
-                self.set_hreg(address=address, value=val)
-            else:
-                pass
+        return self._banks[reg_type]
+
+    def register_ranges(self, reg_type: str) -> list:
+        """
+        Get the defined address ranges of a register type.
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
 
-            if valid_register:
-                self._set_changed_register(reg_type=reg_type,
-                                           address=address,
-                                           value=val)
+        :raise      KeyError:  The register type is not valid
+        :returns:   The ranges as (start address, length)
+        :rtype:     list
+        """
+        return self._bank(reg_type).segments
+
+    def read_range(self, reg_type: str, address: int, count: int) -> list:
+        """
+        Read a range of registers, it may span several added registers.
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
+        :param      address:   The first address
+        :type       address:   int
+        :param      count:     The number of registers
+        :type       count:     int
+
+        :raise      KeyError:  The range is not defined completely
+        :returns:   The values
+        :rtype:     Union[List[bool], List[int]]
+        """
+        return list(self._bank(reg_type).read(address, count))
+
+    def restore_range(self, reg_type: str, address: int, values: list) -> None:
+        """
+        Load saved values into the registers, e.g. from a journal.
+
+        Addresses which are not defined are skipped. The values are not
+        reported as changed and no write hook is called.
+
+        :param      reg_type:  The register type
+        :type       reg_type:  str
+        :param      address:   The first address
+        :type       address:   int
+        :param      values:    The values, 0 or 1 for coils and inputs
+        :type       values:    Union[List[bool], List[int]]
+
+        :raise      KeyError:  The register type is not valid
+        """
+        bank = self._bank(reg_type)
+        if bank.bits:
+            values = [bool(value) for value in values]
+
+        if bank.contains(address, len(values)):
+            bank.write(address, values)
         else:
-            request.send_exception(ModbusConst.ILLEGAL_DATA_ADDRESS)
+            for offset, value in enumerate(values):
+                if bank.contains(address + offset):
+                    bank.write(address + offset, [value])
+
+        self._invalidate_responses(reg_type, address, len(values))
 
     def setup_registers(self,
                         registers: dict = dict(),
@@ -647,22 +1094,28 @@ class Modbus(object):
 
 class ModbusRTU(Modbus):
     def __init__(self,
-                 addr):
+                 addr,
+                 response_cache_size: int = 32,
+                 change_log_size: int = 256):
         super().__init__(
             # set itf to Serial object, addr_list to [addr]
             RTU(None),
-            [addr]
+            [addr],
+            response_cache_size,
+            change_log_size
         )
 
     def add_channel(self, module):
         self._itf.add_channel(module)
 
 class ModbusTCP(Modbus):
-    def __init__(self):
+    def __init__(self, response_cache_size: int = 32, change_log_size: int = 256):
         super().__init__(
             # set itf to TCPServer object, addr_list to None
             TCPServer(),
-            None
+            None,
+            response_cache_size,
+            change_log_size
         )
 
     def bind(self,
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Read coalescing planner
+
+Merges scattered point reads into the fewest read requests per slave and
+register table and splits the responses back out per point.
+"""
+
+# custom packages
+from . import const as Const
+
+# register table: (read function code, max quantity per request)
+READ_TABLES = {
+    'COILS': (Const.READ_COILS, Const.MAX_READ_BITS),
+    'ISTS': (Const.READ_DISCRETE_INPUTS, Const.MAX_READ_BITS),
+    'HREGS': (Const.READ_HOLDING_REGISTERS, Const.MAX_READ_REGISTERS),
+    'IREGS': (Const.READ_INPUT_REGISTER, Const.MAX_READ_REGISTERS),
+}
+
+
+class ReadBlock(object):
+    """A single read request covering one or more points"""
+    def __init__(self, slave, table, address, quantity):
+        self.slave = slave
+        self.table = table
+        self.address = address
+        self.quantity = quantity
+        self.function = READ_TABLES[table][0]
+
+        # indices of the planned points served by this block
+        self.points = []
+        self.values = None
+        self.error = None
+
+    def __repr__(self):
+        return 'ReadBlock(slave={}, table={}, address={}, quantity={})'.\
+            format(self.slave, self.table, self.address, self.quantity)
+
+
+class ReadPlanner(object):
+    def __init__(self, gap: int = 0, bit_gap: int = None):
+        """
+        Create a read planner.
+
+        :param      gap:      Unrequested registers allowed between two
+                              merged ranges
+        :type       gap:      int
+        :param      bit_gap:  Unrequested coils or inputs allowed between two
+                              merged ranges, defaults to 16 bits per register
+        :type       bit_gap:  int
+        """
+        self._gap = gap
+        self._bit_gap = (gap * 16) if bit_gap is None else bit_gap
+
+    def plan(self, points: list) -> list:
+        """
+        Merge the points into read blocks.
+
+        :param      points:  The points as (slave, table, address, count)
+        :type       points:  list
+
+        :raise      ValueError:  Invalid table or count of a point
+        :returns:   The read blocks, ordered by slave, table and address
+        :rtype:     List[ReadBlock]
+        """
+        groups = dict()
+
+        for index, (slave, table, address, count) in enumerate(points):
+            if table not in READ_TABLES:
+                raise ValueError('{} is not a readable register table of {}'.
+                                 format(table, list(READ_TABLES.keys())))
+
+            if not (1 <= count <= READ_TABLES[table][1]):
+                raise ValueError('invalid count {} of {} at address {}'.
+                                 format(count, table, address))
+
+            key = (slave, table)
+            if key not in groups:
+                groups[key] = []
+            groups[key].append((address, count, index))
+
+        blocks = []
+        for key in sorted(groups.keys()):
+            slave, table = key
+            max_qty = READ_TABLES[table][1]
+            gap = self._gap if max_qty == Const.MAX_READ_REGISTERS else self._bit_gap
+
+            block = None
+            for address, count, index in sorted(groups[key]):
+                end = address + count
+
+                if block is not None:
+                    block_end = block.address + block.quantity
+                    new_end = end if end > block_end else block_end
+
+                    if address <= block_end + gap and \
+                            new_end - block.address <= max_qty:
+                        block.quantity = new_end - block.address
+                        block.points.append(index)
+                        continue
+
+                block = ReadBlock(slave, table, address, count)
+                block.points.append(index)
+                blocks.append(block)
+
+        return blocks
+
+    def execute(self, host, blocks: list, signed: bool = False) -> None:
+        """
+        Run the read requests of the blocks on a master.
+
+        A failing block keeps its exception in the error attribute, the
+        other blocks are still read.
+
+        :param      host:    The master, e.g. RTU or TCP
+        :type       host:    object
+        :param      blocks:  The planned read blocks
+        :type       blocks:  List[ReadBlock]
+        :param      signed:  Flag whether registers are signed
+        :type       signed:  bool
+        """
+        for block in blocks:
+            try:
+                if block.function == Const.READ_COILS:
+                    block.values = host.read_coils(block.slave, block.address, block.quantity)
+                elif block.function == Const.READ_DISCRETE_INPUTS:
+                    block.values = host.read_discrete_inputs(block.slave, block.address, block.quantity)
+                elif block.function == Const.READ_HOLDING_REGISTERS:
+                    block.values = host.read_holding_registers(block.slave, block.address,
+                                                               block.quantity, signed=signed)
+                else:
+                    block.values = host.read_input_registers(block.slave, block.address,
+                                                             block.quantity, signed=signed)
+                block.error = None
+            except Exception as e:
+                block.values = None
+                block.error = e
+
+    def split(self, points: list, blocks: list) -> list:
+        """
+        Split the values of read blocks back out per point.
+
+        :param      points:  The points as (slave, table, address, count)
+        :type       points:  list
+        :param      blocks:  The executed read blocks of these points
+        :type       blocks:  List[ReadBlock]
+
+        :returns:   Values per point in the order of points, None for points
+                    of failed blocks
+        :rtype:     list
+        """
+        results = [None] * len(points)
+
+        for block in blocks:
+            if block.values is None:
+                continue
+
+            for index in block.points:
+                offset = points[index][2] - block.address
+                results[index] = block.values[offset:offset + points[index][3]]
+
+        return results
+
+    def read(self, host, points: list, signed: bool = False) -> list:
+        """
+        Plan, execute and split the reads of the points.
+
+        :param      host:    The master, e.g. RTU or TCP
+        :type       host:    object
+        :param      points:  The points as (slave, table, address, count)
+        :type       points:  list
+        :param      signed:  Flag whether registers are signed
+        :type       signed:  bool
+
+        :returns:   Values per point in the order of points
+        :rtype:     list
+        """
+        blocks = self.plan(points)
+        self.execute(host, blocks, signed)
+
+        return self.split(points, blocks)
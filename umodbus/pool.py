@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Pool of persistent Modbus TCP client connections
+
+Connections are kept open per (host, port) endpoint and health checked on
+checkout. The host name of an endpoint is resolved once, new connections
+reuse the address. An endpoint which refuses connections is retried after
+an exponentially growing backoff time, a checkout waits for the retry if
+it is due within the wait time.
+"""
+
+# system packages
+import _thread
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+
+# custom packages
+from .tcp import TCP
+
+
+class _Endpoint(object):
+    def __init__(self):
+        self.idle = []
+        self.in_use = 0
+        self.backoff = 0
+        self.retry_at = 0
+        self.addr = None
+
+
+class TCPPool(object):
+    def __init__(self,
+                 max_per_endpoint: int = 1,
+                 timeout: int = 5,
+                 backoff_ms: int = 1000,
+                 max_backoff_ms: int = 60000,
+                 wait_ms: int = 5000):
+        """
+        Create a connection pool.
+
+        :param      max_per_endpoint:  Concurrent connections per endpoint
+        :type       max_per_endpoint:  int
+        :param      timeout:           The socket timeout in seconds
+        :type       timeout:           int
+        :param      backoff_ms:        The first reconnect backoff time
+        :type       backoff_ms:        int
+        :param      max_backoff_ms:    The upper limit of the backoff time
+        :type       max_backoff_ms:    int
+        :param      wait_ms:           Time to wait for a free connection
+                                       or the reconnect of an endpoint in
+                                       backoff
+        :type       wait_ms:           int
+        """
+        self.max_per_endpoint = max_per_endpoint
+        self.timeout = timeout
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.wait_ms = wait_ms
+
+        self._lock = _thread.allocate_lock()
+        self._endpoints = dict()
+
+    def _endpoint(self, key):
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = _Endpoint()
+            self._endpoints[key] = endpoint
+
+        return endpoint
+
+    def _checkout(self, key, deadline):
+        # returns a healthy idle connection, True if a new one may be
+        # opened or None if the endpoint is at its limit or in backoff
+        with self._lock:
+            endpoint = self._endpoint(key)
+
+            while endpoint.idle:
+                conn = endpoint.idle.pop()
+                if conn.is_healthy():
+                    endpoint.in_use += 1
+                    return conn
+                conn.close()
+
+            if endpoint.in_use >= self.max_per_endpoint:
+                return None
+
+            if endpoint.backoff and \
+                    time.ticks_diff(time.ticks_ms(), endpoint.retry_at) < 0:
+                # waiting is pointless if the retry is not due in time
+                if time.ticks_diff(endpoint.retry_at, deadline) >= 0:
+                    raise OSError('{}:{} unreachable, retry in {} ms'.format(
+                        key[0], key[1],
+                        time.ticks_diff(endpoint.retry_at, time.ticks_ms())))
+                return None
+
+            endpoint.in_use += 1
+            return True
+
+    def _connect_failed(self, key, conn):
+        with self._lock:
+            endpoint = self._endpoint(key)
+            if endpoint.addr is None and conn is not None:
+                # a refused connect resolved the address all the same
+                endpoint.addr = conn.address
+            endpoint.in_use -= 1
+            endpoint.backoff = min(endpoint.backoff * 2, self.max_backoff_ms) \
+                if endpoint.backoff else self.backoff_ms
+            endpoint.retry_at = time.ticks_add(time.ticks_ms(), endpoint.backoff)
+
+    def acquire(self, host: str, port: int = 502) -> TCP:
+        """
+        Check out a connection to an endpoint.
+
+        :param      host:  The IP address or host name of the slave
+        :type       host:  str
+        :param      port:  The port of the slave
+        :type       port:  int
+
+        :raise      OSError:  The endpoint did not accept a connection
+                              or no connection got free within wait_ms
+        :returns:   The connection, return it with release
+        :rtype:     TCP
+        """
+        key = (host, port)
+        deadline = time.ticks_add(time.ticks_ms(), self.wait_ms)
+
+        while True:
+            conn = self._checkout(key, deadline)
+            if conn is None:
+                if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                    raise OSError('no free connection to {}:{}'.format(host, port))
+                time.sleep_ms(10)
+                continue
+
+            if conn is not True:
+                return conn
+
+            conn = None
+            try:
+                # a name lookup may block for long, it is done only once
+                conn = TCP(host, port, self.timeout, connect=False, addr=self._endpoint(key).addr)
+                conn.connect()
+            except OSError:
+                # retried once the backoff passed, if that is in time
+                self._connect_failed(key, conn)
+                if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                    raise
+                continue
+            except Exception:
+                # the slot is given back on any error
+                self._connect_failed(key, conn)
+                raise
+
+            with self._lock:
+                endpoint = self._endpoint(key)
+                endpoint.backoff = 0
+                endpoint.addr = conn.address
+
+            return conn
+
+    def release(self, conn: TCP, discard: bool = False) -> None:
+        """
+        Return a connection to the pool.
+
+        :param      conn:     The connection
+        :type       conn:     TCP
+        :param      discard:  Flag whether to close the connection
+        :type       discard:  bool
+        """
+        with self._lock:
+            endpoint = self._endpoint(conn.endpoint)
+            endpoint.in_use -= 1
+
+            if discard or not conn.is_connected:
+                conn.close()
+            else:
+                endpoint.idle.append(conn)
+
+    def call(self, host: str, port: int, method: str, *args, **kwargs):
+        """
+        Run a master call on a pooled connection.
+
+        A connection which failed with an OSError is closed by TCP and not
+        returned to the pool, stale data left by a failed call is caught by
+        the health check of the next checkout.
+
+        :param      host:    The IP address or host name of the slave
+        :type       host:    str
+        :param      port:    The port of the slave
+        :type       port:    int
+        :param      method:  The name of the TCP method, e.g. read_coils
+        :type       method:  str
+
+        :returns:   The return value of the call
+        """
+        conn = self.acquire(host, port)
+
+        try:
+            return getattr(conn, method)(*args, **kwargs)
+        finally:
+            self.release(conn)
+
+    def close_all(self) -> None:
+        """Close all idle connections and reset the reconnect backoff."""
+        with self._lock:
+            for endpoint in self._endpoints.values():
+                for conn in endpoint.idle:
+                    conn.close()
+                endpoint.idle = []
+                endpoint.backoff = 0
@@ -9,19 +9,36 @@
 #
 
 # system packages
-from machine import Pin
-import ustruct as struct
-import utime as time
+try:
+    from machine import Pin
+except ImportError:
+    # no GPIO on a host, the channel has to switch the direction itself
+    Pin = None
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
 
 # custom packages
 from . import const as Const
 from . import functions
 from .common import Request
 from .common import ModbusException
+from .common import BitView
+from .common import registers_from_bytes
+from .breaker import CircuitBreaker
+from .crc import CRC16_INIT
+from .crc import crc16
+from .crc import check as check_crc
+from .framer import RTUFramer
 
 
 class RTU(object):
-    def __init__(self, ctrl_pin):
+    def __init__(self, ctrl_pin, baudrate=9600, timeout=2000):
         self.__channel = None
 
         if ctrl_pin is not None:
@@ -29,96 +46,188 @@ class RTU(object):
         else:
             self._ctrlPin = None
 
-    def update_channel(self, module):
-        self.__channel = module
+        # default response deadline in milliseconds
+        self._timeout = timeout
+        self.set_baudrate(baudrate)
 
-    def _calculate_crc16(self, data):
-        crc = 0xFFFF
+        # master side responses and slave side requests
+        self._resp_framer = RTUFramer()
+        self._req_framer = RTUFramer(request=True)
+        self._requests = []
+        self._req_ticks = 0
 
-        for char in data:
-            crc = (crc >> 8) ^ Const.CRC16_TABLE[((crc) ^ char) & 0xFF]
+        # slaves which stopped answering fail fast
+        self.breaker = CircuitBreaker()
 
-        return struct.pack('<H', crc)
+        # requests are encoded in place, address at 0 and the PDU from 1 on
+        self._tx_buf = bytearray(Const.MAX_ADU_LENGTH)
+        self._tx_view = memoryview(self._tx_buf)
+        # views of the frame lengths in use, slicing per send allocates
+        self._tx_frames = dict()
 
-    def _bytes_to_bool(self, byte_list):
-        bool_list = []
+    def update_channel(self, module):
+        self.__channel = module
+
+        baudrate = getattr(module, 'baudrate', None)
+        if baudrate:
+            self.set_baudrate(baudrate)
 
-        for index, byte in enumerate(byte_list):
-            bool_list.extend([bool(byte & (1 << n)) for n in range(8)])
+    def set_baudrate(self, baudrate):
+        # inter-frame silence t3.5, a character is 11 bits on the wire
+        # above 19200 baud the spec fixes t3.5 to 1.75 ms
+        if baudrate > 19200:
+            t35_us = 1750
+        else:
+            t35_us = (3500 * 11 * 1000) // baudrate
+        self._t35_ms = max(1, (t35_us + 999) // 1000)
 
-        return bool_list
+    def _calculate_crc16(self, data):
+        return struct.pack('<H', crc16(data))
 
     def _to_short(self, byte_array, signed=True):
-        response_quantity = int(len(byte_array) / 2)
+        return registers_from_bytes(byte_array, signed)
 
-        fmt = '>' + (('h' if signed else 'H') * response_quantity)
+    def _uart_read(self, timeout=None, received=None):
+        # received collects every byte as it came in, the framer drops
+        # bytes which do not belong to a frame
+        framer = self._resp_framer
+        framer.reset()
 
-        return struct.unpack(fmt, byte_array)
+        if timeout is None:
+            timeout = self._timeout
+        deadline = time.ticks_add(time.ticks_ms(), timeout)
 
-    def _exit_read(self, response):
-        if response[1] >= Const.ERROR_BIAS:
-            if len(response) < Const.ERROR_RESP_LEN:
-                return False
-        elif (Const.READ_COILS <= response[1] <= Const.READ_INPUT_REGISTER):
-            expected_len = Const.RESPONSE_HDR_LENGTH + 1 + response[2] + Const.CRC_LENGTH
-            if len(response) < expected_len:
-                return False
-        elif len(response) < Const.FIXED_RESP_LEN:
-            return False
+        # block on the uart until the first bytes arrive or the deadline expires
+        while True:
+            remaining = time.ticks_diff(deadline, time.ticks_ms())
+            if remaining <= 0:
+                return framer.flush()
 
-        return True
+            data = self.__channel.read(1024, remaining)
+            if data:
+                if received is not None:
+                    received.extend(data)
+                frames = framer.feed(data)
+                break
 
-    def _uart_read(self):
-        response = bytearray()
+        # the frame ends when it is complete or the line stays silent for t3.5
+        while not frames:
+            if framer.pending >= Const.MAX_ADU_LENGTH:
+                break
 
-        for x in range(1, 40):
-            data = self.__channel.read(1024, 0)
-            if data:
-                # response.extend(self.__channel.readall())
-                response.extend(data)
+            data = self.__channel.read(1024, self._t35_ms)
+            if not data:
+                break
+            if received is not None:
+                received.extend(data)
+            frames = framer.feed(data)
 
-                # variable length function codes may require multiple reads
-                if self._exit_read(response):
-                    break
-            time.sleep(0.05)
-        return response
+        if frames:
+            framer.reset()
+            return frames[0]
+
+        return framer.flush()
 
     def _uart_read_frame(self, timeout=None):
+        framer = self._req_framer
         received_bytes = self.__channel.read(1024, timeout)
-        # return the result in case the overall timeout has been reached
-        return received_bytes
+
+        if received_bytes:
+            self._req_ticks = time.ticks_ms()
+            self._requests.extend(framer.feed(received_bytes))
+        elif framer.pending and \
+                time.ticks_diff(time.ticks_ms(), self._req_ticks) >= self._t35_ms:
+            # frames of unknown length are ended by the inter-frame silence
+            frame = framer.flush()
+            if check_crc(frame):
+                self._requests.append(frame)
+
+        if self._requests:
+            return self._requests.pop(0)
+
+        return None
+
+    def _load_pdu(self, modbus_pdu):
+        # a longer PDU would resize the exported buffer
+        pdu_length = len(modbus_pdu)
+        if pdu_length > Const.MAX_ADU_LENGTH - 1 - Const.CRC_LENGTH:
+            raise ValueError('PDU too long')
+
+        self._tx_buf[1:1 + pdu_length] = modbus_pdu
+
+        return pdu_length
+
+    def _frame_view(self, length):
+        view = self._tx_frames.get(length)
+        if view is None:
+            view = self._tx_view[:length]
+            self._tx_frames[length] = view
+
+        return view
 
     def _send(self, modbus_pdu, slave_addr):
-        serial_pdu = bytearray()
-        serial_pdu.append(slave_addr)
-        serial_pdu.extend(modbus_pdu)
+        self._send_buffered(self._load_pdu(modbus_pdu), slave_addr)
 
-        crc = self._calculate_crc16(serial_pdu)
-        serial_pdu.extend(crc)
+    def _send_buffered(self, pdu_length, slave_addr):
+        # the PDU is already in the ADU buffer, add address and CRC in place
+        buf = self._tx_buf
+        buf[0] = slave_addr
+        end = 1 + pdu_length
+        struct.pack_into('<H', buf, end, crc16(buf, CRC16_INIT, 0, end))
 
         if self._ctrlPin:
             self._ctrlPin(1)
-        self.__channel.write(serial_pdu)
+        self.__channel.write(self._frame_view(end + Const.CRC_LENGTH))
 
         if self._ctrlPin:
             self._ctrlPin(0)
 
-    def _send_receive(self, modbus_pdu, slave_addr, count):
-        # flush the Rx FIFO
-        self.__channel.read(1024, 0)
+    def set_breaker(self, threshold=3, backoff_ms=1000, max_backoff_ms=60000):
+        self.breaker = CircuitBreaker(threshold, backoff_ms, max_backoff_ms)
 
-        self._send(modbus_pdu, slave_addr)
+    def _send_receive(self, modbus_pdu, slave_addr, count, timeout=None):
+        pdu_length = self._load_pdu(modbus_pdu)
+
+        return self._send_receive_buffered(pdu_length, slave_addr, count, timeout)
+
+    def _transact(self, pdu_length, slave_addr, timeout=None):
+        # send the request in the ADU buffer and return the raw response,
+        # empty if the slave did not answer in time
+        if not self.breaker.allow(slave_addr):
+            raise OSError('slave {} not responding, request skipped'.format(slave_addr))
+
+        try:
+            # flush the Rx FIFO
+            self.__channel.read(1024, 0)
+
+            self._send_buffered(pdu_length, slave_addr)
+
+            response = self._uart_read(timeout)
+        except Exception:
+            # a failing uart counts like a silent slave, otherwise a probe
+            # would leave the circuit half open for good
+            self.breaker.failure(slave_addr)
+            raise
 
-        return self._validate_resp_hdr(self._uart_read(), slave_addr, modbus_pdu[0], count)
+        if len(response) == 0:
+            self.breaker.failure(slave_addr)
+        else:
+            self.breaker.success(slave_addr)
+
+        return response
+
+    def _send_receive_buffered(self, pdu_length, slave_addr, count, timeout=None):
+        function_code = self._tx_buf[1]
+
+        response = self._transact(pdu_length, slave_addr, timeout)
+
+        return self._validate_resp_hdr(response, slave_addr, function_code, count)
 
     def _validate_resp_hdr(self, response, slave_addr, function_code, count):
         if len(response) == 0:
             raise OSError('no data received from slave')
 
-        resp_crc = response[-Const.CRC_LENGTH:]
-        expected_crc = self._calculate_crc16(response[0:len(response) - Const.CRC_LENGTH])
-
-        if ((resp_crc[0] is not expected_crc[0]) or (resp_crc[1] is not expected_crc[1])):
+        if not check_crc(response):
             raise OSError('invalid response CRC')
 
         if (response[0] != slave_addr):
@@ -132,19 +241,19 @@ class RTU(object):
 
         return response[hdr_length:len(response) - Const.CRC_LENGTH]
 
-    def read_coils(self, slave_addr, starting_addr, coil_qty):
-        modbus_pdu = functions.read_coils(starting_addr, coil_qty)
+    def read_coils(self, slave_addr, starting_addr, coil_qty, timeout=None):
+        pdu_length = functions.read_request_into(self._tx_buf, 1, Const.READ_COILS, starting_addr, coil_qty)
 
-        resp_data = self._send_receive(modbus_pdu, slave_addr, True)
-        status_pdu = self._bytes_to_bool(resp_data)
+        resp_data = self._send_receive_buffered(pdu_length, slave_addr, True, timeout)
+        status_pdu = BitView(resp_data, coil_qty)
 
         return status_pdu
 
-    def read_discrete_inputs(self, slave_addr, starting_addr, input_qty):
-        modbus_pdu = functions.read_discrete_inputs(starting_addr, input_qty)
+    def read_discrete_inputs(self, slave_addr, starting_addr, input_qty, timeout=None):
+        pdu_length = functions.read_request_into(self._tx_buf, 1, Const.READ_DISCRETE_INPUTS, starting_addr, input_qty)
 
-        resp_data = self._send_receive(modbus_pdu, slave_addr, True)
-        status_pdu = self._bytes_to_bool(resp_data)
+        resp_data = self._send_receive_buffered(pdu_length, slave_addr, True, timeout)
+        status_pdu = BitView(resp_data, input_qty)
 
         return status_pdu
 
@@ -152,10 +261,12 @@ class RTU(object):
                                slave_addr,
                                starting_addr,
                                register_qty,
-                               signed=True):
+                               signed=True,
+                               timeout=None):
 
-        modbus_pdu = functions.read_holding_registers(starting_addr, register_qty)
-        resp_data = self._send_receive(modbus_pdu, slave_addr, True)
+        pdu_length = functions.read_request_into(self._tx_buf, 1, Const.READ_HOLDING_REGISTERS,
+                                                 starting_addr, register_qty)
+        resp_data = self._send_receive_buffered(pdu_length, slave_addr, True, timeout)
         register_value = self._to_short(resp_data, signed)
 
         return register_value
@@ -164,19 +275,20 @@ class RTU(object):
                              slave_addr,
                              starting_addr,
                              register_qty,
-                             signed=True):
-        modbus_pdu = functions.read_input_registers(starting_addr,
-                                                    register_qty)
+                             signed=True,
+                             timeout=None):
+        pdu_length = functions.read_request_into(self._tx_buf, 1, Const.READ_INPUT_REGISTER,
+                                                 starting_addr, register_qty)
 
-        resp_data = self._send_receive(modbus_pdu, slave_addr, True)
+        resp_data = self._send_receive_buffered(pdu_length, slave_addr, True, timeout)
         register_value = self._to_short(resp_data, signed)
 
         return register_value
 
-    def write_single_coil(self, slave_addr, output_address, output_value):
-        modbus_pdu = functions.write_single_coil(output_address, output_value)
+    def write_single_coil(self, slave_addr, output_address, output_value, timeout=None):
+        pdu_length = functions.write_single_coil_into(self._tx_buf, 1, output_address, output_value)
 
-        resp_data = self._send_receive(modbus_pdu, slave_addr, False)
+        resp_data = self._send_receive_buffered(pdu_length, slave_addr, False, timeout)
         operation_status = functions.validate_resp_data(resp_data,
                                                         Const.WRITE_SINGLE_COIL,
                                                         output_address,
@@ -189,12 +301,14 @@ class RTU(object):
                               slave_addr,
                               register_address,
                               register_value,
-                              signed=True):
-        modbus_pdu = functions.write_single_register(register_address,
-                                                     register_value,
-                                                     signed)
-
-        resp_data = self._send_receive(modbus_pdu, slave_addr, False)
+                              signed=True,
+                              timeout=None):
+        pdu_length = functions.write_single_register_into(self._tx_buf, 1,
+                                                          register_address,
+                                                          register_value,
+                                                          signed)
+
+        resp_data = self._send_receive_buffered(pdu_length, slave_addr, False, timeout)
         operation_status = functions.validate_resp_data(resp_data,
                                                         Const.WRITE_SINGLE_REGISTER,
                                                         register_address,
@@ -206,11 +320,13 @@ class RTU(object):
     def write_multiple_coils(self,
                              slave_addr,
                              starting_address,
-                             output_values):
-        modbus_pdu = functions.write_multiple_coils(starting_address,
-                                                    output_values)
+                             output_values,
+                             timeout=None):
+        pdu_length = functions.write_multiple_coils_into(self._tx_buf, 1,
+                                                         starting_address,
+                                                         output_values)
 
-        resp_data = self._send_receive(modbus_pdu, slave_addr, False)
+        resp_data = self._send_receive_buffered(pdu_length, slave_addr, False, timeout)
         operation_status = functions.validate_resp_data(resp_data,
                                                         Const.WRITE_MULTIPLE_COILS,
                                                         starting_address,
@@ -222,12 +338,14 @@ class RTU(object):
                                  slave_addr,
                                  starting_address,
                                  register_values,
-                                 signed=True):
-        modbus_pdu = functions.write_multiple_registers(starting_address,
-                                                        register_values,
-                                                        signed)
-
-        resp_data = self._send_receive(modbus_pdu, slave_addr, False)
+                                 signed=True,
+                                 timeout=None):
+        pdu_length = functions.write_multiple_registers_into(self._tx_buf, 1,
+                                                             starting_address,
+                                                             register_values,
+                                                             signed)
+
+        resp_data = self._send_receive_buffered(pdu_length, slave_addr, False, timeout)
         operation_status = functions.validate_resp_data(resp_data,
                                                         Const.WRITE_MULTIPLE_REGISTERS,
                                                         starting_address,
@@ -243,13 +361,39 @@ class RTU(object):
                       request_data,
                       values=None,
                       signed=True):
-        modbus_pdu = functions.response(function_code,
-                                        request_register_addr,
-                                        request_register_qty,
-                                        request_data,
-                                        values,
-                                        signed)
-        self._send(modbus_pdu, slave_addr)
+        # encoded in place behind the address like the requests of a master
+        pdu_length = functions.response_into(self._tx_buf, 1,
+                                             function_code,
+                                             request_register_addr,
+                                             request_register_qty,
+                                             request_data,
+                                             values,
+                                             signed)
+        self._send_buffered(pdu_length, slave_addr)
+
+    def encode_response(self, slave_addr, modbus_pdu):
+        """
+        Encode a response PDU into the complete frame for send_encoded.
+
+        :param      slave_addr:  The slave address of the response
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The response PDU
+        :type       modbus_pdu:  Union[bytes, bytearray]
+
+        :returns:   The frame with address and CRC
+        :rtype:     bytes
+        """
+        adu = bytes([slave_addr]) + bytes(modbus_pdu)
+
+        return adu + self._calculate_crc16(adu)
+
+    def send_encoded(self, slave_addr, frame):
+        if self._ctrlPin:
+            self._ctrlPin(1)
+        self.__channel.write(frame)
+
+        if self._ctrlPin:
+            self._ctrlPin(0)
 
     def send_exception_response(self,
                                 slave_addr,
@@ -260,20 +404,16 @@ class RTU(object):
         self._send(modbus_pdu, slave_addr)
 
     def get_request(self, unit_addr_list, timeout=None):
+        # frames handed out by the framer already passed the CRC check
         req = self._uart_read_frame(timeout)
 
-        if len(req) < 8:
+        if req is None:
             return None
 
         if req[0] not in unit_addr_list:
             return None
 
-        req_crc = req[-Const.CRC_LENGTH:]
         req_no_crc = req[:-Const.CRC_LENGTH]
-        expected_crc = self._calculate_crc16(req_no_crc)
-
-        if (req_crc[0] != expected_crc[0]) or (req_crc[1] != expected_crc[1]):
-            return None
 
         try:
             request = Request(self, req_no_crc)
@@ -285,14 +425,49 @@ class RTU(object):
 
         return request
 
-    def passthrough_send_receive(self, data):
+    def passthrough_send_receive(self, data, timeout=None):
         if self._ctrlPin:
             self._ctrlPin(1)
         self.__channel.write(data)
 
         if self._ctrlPin:
             self._ctrlPin(0)
-        response = self._uart_read()
+        # forwarded as received, also with a bad CRC or no Modbus frame
+        response = bytearray()
+        self._uart_read(timeout, response)
         if len(response) == 0:
             raise OSError('no data received from slave')
-        return response
+        return bytes(response)
+
+    def send_receive_pdu(self, slave_addr, modbus_pdu, timeout=None):
+        """
+        Send a raw request PDU and return the raw response PDU.
+
+        Exception responses of the slave are returned as they are, e.g. to
+        be forwarded by a gateway.
+
+        :param      slave_addr:  The slave address
+        :type       slave_addr:  int
+        :param      modbus_pdu:  The request PDU
+        :type       modbus_pdu:  Union[bytes, bytearray, memoryview]
+        :param      timeout:     The response timeout in milliseconds
+        :type       timeout:     int
+
+        :raise      OSError:     No valid response within the timeout
+        :raise      ValueError:  The response came from another slave
+        :returns:   The response PDU
+        :rtype:     bytes
+        """
+        pdu_length = self._load_pdu(modbus_pdu)
+
+        response = self._transact(pdu_length, slave_addr, timeout)
+        if len(response) == 0:
+            raise OSError('no data received from slave')
+
+        if not check_crc(response):
+            raise OSError('invalid response CRC')
+
+        if (response[0] != slave_addr):
+            raise ValueError('wrong slave address')
+
+        return response[1:len(response) - Const.CRC_LENGTH]
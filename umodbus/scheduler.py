@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Periodic polling scheduler
+
+Runs poll groups on a single bus earliest deadline first. Every group has
+its own interval, the deadline of a release is the start of the next one.
+The priority of a group moves its deadline back by a fixed weight per
+level, so an urgent group goes ahead of a less urgent one running late.
+"""
+
+# system packages
+import _thread
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+
+# custom packages
+from .planner import ReadPlanner
+
+
+class PollGroup(object):
+    def __init__(self,
+                 name: str,
+                 points: list,
+                 interval_ms: int,
+                 priority: int = 0,
+                 sheddable: bool = False,
+                 callback=None):
+        """
+        Create a poll group.
+
+        :param      name:         The unique name of the group
+        :type       name:         str
+        :param      points:       The points as (slave, table, address, count)
+        :type       points:       list
+        :param      interval_ms:  The refresh interval in milliseconds
+        :type       interval_ms:  int
+        :param      priority:     The priority level, lower runs first
+        :type       priority:     int
+        :param      sheddable:    Flag whether the group only runs in spare
+                                  bus time
+        :type       sheddable:    bool
+        :param      callback:     Called with the group and the values per
+                                  point after every run
+        :type       callback:     Callable
+        """
+        self.name = name
+        self.points = points
+        self.interval = interval_ms
+        self.priority = priority
+        self.sheddable = sheddable
+        self.callback = callback
+
+        self.blocks = None
+        self.release = None
+        self.values = None
+
+        # statistics
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.shed = 0
+        self.last_jitter = 0
+        self.max_jitter = 0
+        self.exec_ms = 0
+
+    @property
+    def deadline(self):
+        return time.ticks_add(self.release, self.interval)
+
+    def stats(self) -> dict:
+        """
+        Get the statistics of the group.
+
+        :returns:   The statistics
+        :rtype:     dict
+        """
+        return {
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'shed': self.shed,
+            'last_jitter': self.last_jitter,
+            'max_jitter': self.max_jitter,
+            'exec_ms': self.exec_ms,
+        }
+
+
+class PollScheduler(object):
+    def __init__(self,
+                 host,
+                 planner: ReadPlanner = None,
+                 signed: bool = False,
+                 priority_weight_ms: int = 1000):
+        """
+        Create a poll scheduler.
+
+        :param      host:                The bus master, e.g. RTU
+        :type       host:                object
+        :param      planner:             The planner merging the points of a
+                                         group
+        :type       planner:             ReadPlanner
+        :param      signed:              Flag whether registers are signed
+        :type       signed:              bool
+        :param      priority_weight_ms:  The time a priority level moves the
+                                         deadline of a group back
+        :type       priority_weight_ms:  int
+        """
+        self._host = host
+        self._planner = planner if planner is not None else ReadPlanner()
+        self._signed = signed
+        self._priority_weight = priority_weight_ms
+        self._running = False
+
+        # groups are added and removed from other threads while run walks
+        # the list, changes replace the list instead of modifying it
+        self._lock = _thread.allocate_lock()
+        self._groups = []
+
+    def add_group(self, group: PollGroup) -> None:
+        """
+        Add a poll group, it is released immediately.
+
+        :param      group:  The poll group
+        :type       group:  PollGroup
+
+        :raise      ValueError:  A group with this name exists
+        """
+        group.blocks = self._planner.plan(group.points)
+
+        with self._lock:
+            if self.get_group(group.name) is not None:
+                raise ValueError('poll group {} already exists'.format(group.name))
+
+            group.release = time.ticks_ms()
+            self._groups = self._groups + [group]
+
+    def remove_group(self, name: str):
+        """
+        Remove a poll group.
+
+        :param      name:  The name of the group
+        :type       name:  str
+
+        :returns:   The removed group, None if it did not exist
+        :rtype:     Union[None, PollGroup]
+        """
+        with self._lock:
+            group = self.get_group(name)
+            if group is not None:
+                self._groups = [other for other in self._groups if other is not group]
+
+        return group
+
+    def get_group(self, name: str):
+        for group in self._groups:
+            if group.name == name:
+                return group
+
+        return None
+
+    @property
+    def utilization(self) -> float:
+        """
+        Get the estimated share of bus time used by all groups.
+
+        :returns:   Sum of execution time over interval of all groups
+        :rtype:     float
+        """
+        return sum(group.exec_ms / group.interval for group in self._groups)
+
+    def report(self) -> dict:
+        """
+        Get the statistics of all groups.
+
+        :returns:   Statistics by group name
+        :rtype:     dict
+        """
+        return dict((group.name, group.stats()) for group in self._groups)
+
+    def _next_ready(self, now):
+        ready = None
+        ready_key = 0
+
+        for group in self._groups:
+            if time.ticks_diff(now, group.release) < 0:
+                continue
+
+            # every priority level moves the deadline back by the weight
+            key = time.ticks_diff(group.deadline, now) + group.priority * self._priority_weight
+            if ready is None or key < ready_key:
+                ready = group
+                ready_key = key
+
+        return ready
+
+    def _fits_spare_time(self, group, now):
+        # a sheddable group may not delay the next release of a regular group
+        finish = time.ticks_add(now, group.exec_ms)
+
+        for other in self._groups:
+            if other.sheddable or other is group:
+                continue
+            if time.ticks_diff(other.release, finish) < 0:
+                return False
+
+        return True
+
+    def _advance(self, group, now):
+        group.release = time.ticks_add(group.release, group.interval)
+
+        # skip releases which were missed completely
+        late = time.ticks_diff(now, group.release)
+        if late >= group.interval:
+            missed = late // group.interval
+            group.skipped += missed
+            group.release = time.ticks_add(group.release, missed * group.interval)
+
+    def run_once(self):
+        """
+        Run the most urgent ready poll group.
+
+        :returns:   The group which ran, None if no group was ready
+        :rtype:     Union[None, PollGroup]
+        """
+        now = time.ticks_ms()
+        group = self._next_ready(now)
+
+        if group is None:
+            return None
+
+        if group.sheddable and not self._fits_spare_time(group, now):
+            group.shed += 1
+            self._advance(group, now)
+            return None
+
+        group.last_jitter = time.ticks_diff(now, group.release)
+        if group.last_jitter > group.max_jitter:
+            group.max_jitter = group.last_jitter
+
+        self._planner.execute(self._host, group.blocks, self._signed)
+        group.values = self._planner.split(group.points, group.blocks)
+
+        finish = time.ticks_ms()
+        elapsed = time.ticks_diff(finish, now)
+        # moving average of the execution time
+        group.exec_ms = elapsed if group.runs == 0 else (group.exec_ms * 7 + elapsed) // 8
+        group.runs += 1
+
+        if time.ticks_diff(finish, group.deadline) > 0:
+            group.overruns += 1
+
+        self._advance(group, finish)
+
+        if group.callback is not None:
+            group.callback(group, group.values)
+
+        return group
+
+    def next_release_ms(self) -> int:
+        """
+        Get the time until the next release.
+
+        :returns:   Milliseconds until a group is ready, -1 without groups
+        :rtype:     int
+        """
+        now = time.ticks_ms()
+        wait = -1
+
+        for group in self._groups:
+            diff = time.ticks_diff(group.release, now)
+            diff = diff if diff > 0 else 0
+            if wait < 0 or diff < wait:
+                wait = diff
+
+        return wait
+
+    def run(self) -> None:
+        """Run the poll groups until stop is called."""
+        self._running = True
+
+        while self._running:
+            if self.run_once() is None:
+                wait = self.next_release_ms()
+                time.sleep_ms(wait if wait > 0 else 1)
+
+    def stop(self) -> None:
+        """Stop the run loop after the current group."""
+        self._running = False
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+Cache of precompiled struct layouts
+
+Register PDUs use a fixed header followed by a variable number of 16 bit
+registers. The layout of every (header, quantity, signedness) is built and
+parsed once and kept for the following transactions. Once MAX_LAYOUTS
+layouts are kept, the least recently used one makes room for a new one.
+"""
+
+# system packages
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+try:
+    from ucollections import OrderedDict
+except ImportError:
+    # dicts keep their insertion order on CPython
+    OrderedDict = dict
+
+
+class _Layout(object):
+    """
+    Struct lookalike for ports without it
+
+    The struct functions are bound to the format string, a call goes
+    straight to the struct module.
+    """
+    def __init__(self, fmt):
+        self.format = fmt
+        self.size = struct.calcsize(fmt)
+
+        self.pack = lambda *values: struct.pack(fmt, *values)
+        self.pack_into = lambda buf, offset, *values: struct.pack_into(fmt, buf, offset, *values)
+        self.unpack = lambda data: struct.unpack(fmt, data)
+        self.unpack_from = lambda data, offset=0: struct.unpack_from(fmt, data, offset)
+
+
+Struct = getattr(struct, 'Struct', _Layout)
+
+# a poll loop uses a handful of quantities, every (header, quantity,
+# signedness) would be more than 1000 layouts
+MAX_LAYOUTS = 32
+
+# ordered from the least to the most recently used layout
+_layouts = OrderedDict()
+
+
+def layout(header: str, quantity: int = 0, signed: bool = True) -> Struct:
+    """
+    Get the precompiled layout of a header followed by registers.
+
+    :param      header:    The byte order and header fields, e.g. '>BB'
+    :type       header:    str
+    :param      quantity:  The number of registers behind the header
+    :type       quantity:  int
+    :param      signed:    Flag whether the registers are signed
+    :type       signed:    bool
+
+    :returns:   The layout
+    :rtype:     Struct
+    """
+    key = (header, quantity, signed)
+    compiled = _layouts.pop(key, None)
+
+    if compiled is None:
+        if len(_layouts) >= MAX_LAYOUTS:
+            del _layouts[next(iter(_layouts))]
+        compiled = Struct(header + ('h' if signed else 'H') * quantity)
+
+    # reinserted as the most recently used one
+    _layouts[key] = compiled
+
+    return compiled
+
+
+def benchmark(quantities=(1, 10, 125), duration_ms=1000):
+    """
+    Print the encode and decode rate of register PDUs with format strings
+    built per call and with cached layouts.
+
+    :param      quantities:   The numbers of registers
+    :type       quantities:   tuple
+    :param      duration_ms:  The run time of each measurement
+    :type       duration_ms:  int
+    """
+    def built(buf, values):
+        quantity = len(values)
+        fmt = '>BB' + 'H' * quantity
+        struct.pack_into(fmt, buf, 0, 3, quantity * 2, *values)
+        return struct.unpack_from('>' + 'H' * quantity, buf, 2)
+
+    def cached(buf, values):
+        quantity = len(values)
+        layout('>BB', quantity, False).pack_into(buf, 0, 3, quantity * 2, *values)
+        return layout('>', quantity, False).unpack_from(buf, 2)
+
+    for quantity in quantities:
+        values = list(range(quantity))
+        buf = bytearray(2 + quantity * 2)
+
+        for name, func in (('built', built), ('cached', cached)):
+            rounds = 0
+            start = time.ticks_us()
+            while True:
+                for _ in range(100):
+                    func(buf, values)
+                rounds += 100
+                elapsed = time.ticks_diff(time.ticks_us(), start)
+                if elapsed >= duration_ms * 1000:
+                    break
+
+            print('{:>6} {:3d} registers: {:8.1f} PDUs/ms'.
+                  format(name, quantity, rounds * 1000 / elapsed))
@@ -9,82 +9,288 @@
 #
 
 # system packages
-import urandom as random
-import ustruct as struct
-import usocket as socket
-import utime as time
+try:
+    import urandom as random
+except ImportError:
+    import random
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+try:
+    import uselect as select
+except ImportError:
+    import select
+try:
+    import utime as time
+except ImportError:
+    from . import host_time as time
+import _thread
+from queue import Queue
 
 # custom packages
 from . import functions
 from .common import Request
 from .common import ModbusException
+from .common import BitView
+from .common import registers_from_bytes
+from .common import validate_response_pdu
 from . import const as Const
 
 
-class TCP(object):
-    def __init__(self, slave_ip, slave_port=502, timeout=5):
-        self._sock = socket.socket()
+class MBAPReader(object):
+    """
+    Reassembles Modbus TCP frames from a byte stream
+
+    A segment may carry a part of a frame or several frames, bytes behind
+    the current frame are kept for the next one. The returned PDU is a view
+    into the reused buffer and only valid until the next call.
+    """
+    def __init__(self, size=2 * (Const.MBAP_HDR_LENGTH + Const.MAX_PDU_LENGTH)):
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+        # header fields of the last frame
+        self.trans_id = 0
+        self.unit_id = 0
+
+    @property
+    def pending(self):
+        return self._end - self._start
+
+    @property
+    def room(self):
+        return len(self._buf) - self.pending
+
+    def reset(self):
+        self._start = 0
+        self._end = 0
+
+    def feed(self, data):
+        """
+        Append received bytes.
+
+        :param      data:  The received bytes
+        :type       data:  Union[bytes, bytearray, memoryview]
+
+        :raise      ValueError:  The buffer can not hold the bytes
+        """
+        size = len(data)
+        self._compact(size)
+        self._buf[self._end:self._end + size] = data
+        self._end += size
+
+    def _compact(self, room):
+        if len(self._buf) - self._end >= room:
+            return
+
+        pending = self._end - self._start
+        if len(self._buf) - pending < room:
+            raise ValueError('MBAP receive buffer overflow')
+
+        self._buf[:pending] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = pending
+
+    def next_frame(self, include_unit=False):
+        """
+        Take the next complete frame from the buffered bytes.
+
+        :param      include_unit:  Flag whether the view starts with the
+                                   unit ID instead of the PDU
+        :type       include_unit:  bool
+
+        :raise      ValueError:  The header is invalid, the stream is out
+                                 of sync and has to be closed
+        :returns:   The PDU, None if no complete frame is buffered
+        :rtype:     Union[None, memoryview]
+        """
+        if self._end - self._start < Const.MBAP_HDR_LENGTH:
+            return None
+
+        trans_id, prot_id, length, unit_id = struct.unpack_from('>HHHB', self._buf, self._start)
+
+        if prot_id != 0:
+            raise ValueError('invalid protocol Id')
 
-        # print(socket.getaddrinfo(slave_ip, slave_port))
-        # [(2, 1, 0, '192.168.178.47', ('192.168.178.47', 502))]
-        self._sock.connect(socket.getaddrinfo(slave_ip, slave_port)[0][-1])
+        if length < 2 or length > Const.MAX_PDU_LENGTH + 1:
+            raise ValueError('invalid MBAP length {}'.format(length))
 
-        self._sock.settimeout(timeout)
+        end = self._start + Const.MBAP_HDR_LENGTH - 1 + length
+        if end > self._end:
+            return None
+
+        first = Const.MBAP_HDR_LENGTH - 1 if include_unit else Const.MBAP_HDR_LENGTH
+        pdu = self._view[self._start + first:end]
+        self._start = end
+        if self._start == self._end:
+            self._start = 0
+            self._end = 0
+
+        self.trans_id = trans_id
+        self.unit_id = unit_id
+
+        return pdu
+
+    def read(self, sock):
+        """
+        Read the next frame from a socket.
+
+        :param      sock:  The socket, reads may time out
+        :type       sock:  socket
+
+        :raise      OSError:     The socket timed out or was closed
+        :raise      ValueError:  The stream is out of sync
+        :returns:   The PDU
+        :rtype:     memoryview
+        """
+        while True:
+            pdu = self.next_frame()
+            if pdu is not None:
+                return pdu
+
+            if self.pending < Const.MBAP_HDR_LENGTH:
+                missing = Const.MBAP_HDR_LENGTH - self.pending
+            else:
+                length = struct.unpack_from('>H', self._buf, self._start + 4)[0]
+                missing = Const.MBAP_HDR_LENGTH - 1 + length - self.pending
+
+            # keep room for a whole frame behind the current one
+            self._compact(missing)
+            data = sock.recv(len(self._buf) - self._end)
+            if len(data) == 0:
+                raise OSError('connection closed by peer')
+            self.feed(data)
+
+
+class TCP(object):
+    def __init__(self, slave_ip, slave_port=502, timeout=5, connect=True, addr=None):
+        self._slave_ip = slave_ip
+        self._slave_port = slave_port
+        self._timeout = timeout
+        # the socket address, resolved on the first connect if not given
+        self._addr = addr
+        self._sock = None
+        self._reader = MBAPReader()
 
-    def _create_mbap_hdr(self, slave_id, modbus_pdu):
         # only available on WiPy
         # trans_id = machine.rng() & 0xFFFF
-        # use builtin function to generate random 24 bit integer
-        trans_id = random.getrandbits(24) & 0xFFFF
+        # start the transaction counter at a random 16 bit value, responses
+        # of a previous connection can not be mistaken for new ones
+        self._trans_id = random.getrandbits(16)
 
-        mbap_hdr = struct.pack('>HHHB', trans_id, 0, len(modbus_pdu) + 1, slave_id)
+        if connect:
+            self.connect()
 
-        return mbap_hdr, trans_id
+    @property
+    def endpoint(self):
+        return (self._slave_ip, self._slave_port)
 
-    def _bytes_to_bool(self, byte_list):
-        bool_list = []
-        for index, byte in enumerate(byte_list):
-            bool_list.extend([bool(byte & (1 << n)) for n in range(8)])
+    @property
+    def address(self):
+        return self._addr
 
-        return bool_list
+    @property
+    def is_connected(self):
+        return self._sock is not None
 
-    def _to_short(self, byte_array, signed=True):
-        response_quantity = int(len(byte_array) / 2)
-        fmt = '>' + (('h' if signed else 'H') * response_quantity)
+    def connect(self):
+        self.close()
 
-        return struct.unpack(fmt, byte_array)
+        # resolve once, reconnects reuse the address
+        if self._addr is None:
+            # print(socket.getaddrinfo(slave_ip, slave_port))
+            # [(2, 1, 0, '192.168.178.47', ('192.168.178.47', 502))]
+            self._addr = socket.getaddrinfo(self._slave_ip, self._slave_port)[0][-1]
 
-    def _validate_resp_hdr(self,
-                           response,
-                           trans_id,
-                           slave_id,
-                           function_code,
-                           count=False):
-        rec_tid, rec_pid, rec_len, rec_uid, rec_fc = struct.unpack('>HHHBB', response[:Const.MBAP_HDR_LENGTH + 1])
-        if (trans_id != rec_tid):
-            raise ValueError('wrong transaction Id')
+        sock = socket.socket()
+        try:
+            sock.connect(self._addr)
+        except OSError:
+            sock.close()
+            raise
 
-        if (rec_pid != 0):
-            raise ValueError('invalid protocol Id')
+        sock.settimeout(self._timeout)
+        self._reader.reset()
+        self._sock = sock
 
-        if (slave_id != rec_uid):
-            raise ValueError('wrong slave Id')
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def is_healthy(self):
+        """
+        Check the idle connection without blocking.
+
+        An idle connection must not be readable, readable means the peer
+        closed it, reset it or sent stale data.
+
+        :returns:   Flag whether the connection can be used
+        :rtype:     bool
+        """
+        if self._sock is None:
+            return False
 
-        if (rec_fc == (function_code + Const.ERROR_BIAS)):
-            raise ValueError('slave returned exception code: {:d}'.
-                             format(rec_fc))
+        poller = select.poll()
+        poller.register(self._sock, select.POLLIN | select.POLLERR | select.POLLHUP)
+        healthy = len(poller.poll(0)) == 0
+        poller.unregister(self._sock)
+
+        return healthy
+
+    def _next_trans_id(self):
+        self._trans_id = (self._trans_id + 1) & 0xFFFF
+
+        return self._trans_id
+
+    def _create_mbap_hdr(self, slave_id, modbus_pdu):
+        trans_id = self._next_trans_id()
+
+        mbap_hdr = struct.pack('>HHHB', trans_id, 0, len(modbus_pdu) + 1, slave_id)
+
+        return mbap_hdr, trans_id
 
-        hdr_length = (Const.MBAP_HDR_LENGTH + 2) if count else (Const.MBAP_HDR_LENGTH + 1)
+    def _to_short(self, byte_array, signed=True):
+        return registers_from_bytes(byte_array, signed)
 
-        return response[hdr_length:]
+    def _validate_resp_pdu(self,
+                           pdu,
+                           unit_id,
+                           slave_id,
+                           function_code,
+                           count=False):
+        return validate_response_pdu(pdu, unit_id, slave_id, function_code, count)
 
     def _send_receive(self, slave_id, modbus_pdu, count):
+        if self._sock is None:
+            self.connect()
+
         mbap_hdr, trans_id = self._create_mbap_hdr(slave_id, modbus_pdu)
-        self._sock.send(mbap_hdr + modbus_pdu)
+        try:
+            self._sock.send(mbap_hdr + modbus_pdu)
 
-        response = self._sock.recv(256)
-        modbus_data = self._validate_resp_hdr(response,
-                                              trans_id,
+            # responses to earlier requests which timed out are skipped
+            while True:
+                response = self._reader.read(self._sock)
+                if self._reader.trans_id == trans_id:
+                    break
+        except (OSError, ValueError):
+            # the connection is in an unknown state, reconnect on next use
+            self.close()
+            raise
+
+        modbus_data = self._validate_resp_pdu(response,
+                                              self._reader.unit_id,
                                               slave_id,
                                               modbus_pdu[0],
                                               count)
@@ -95,7 +301,7 @@ class TCP(object):
         modbus_pdu = functions.read_coils(starting_addr, coil_qty)
 
         response = self._send_receive(slave_addr, modbus_pdu, True)
-        status_pdu = self._bytes_to_bool(response)
+        status_pdu = BitView(bytes(response), coil_qty)
 
         return status_pdu
 
@@ -103,7 +309,7 @@ class TCP(object):
         modbus_pdu = functions.read_discrete_inputs(starting_addr, input_qty)
 
         response = self._send_receive(slave_addr, modbus_pdu, True)
-        status_pdu = self._bytes_to_bool(response)
+        status_pdu = BitView(bytes(response), input_qty)
 
         return status_pdu
 
@@ -196,37 +402,424 @@ class TCP(object):
         return operation_status
 
 
+class _Waiter(object):
+    """A call waiting for its response, completed once by the reader"""
+    def __init__(self):
+        self.result = None
+        self._lock = _thread.allocate_lock()
+        self._lock.acquire()
+
+    def complete(self, response, error=None):
+        self.result = (response, error)
+        self._lock.release()
+
+    def wait(self, timeout_ms=None):
+        """
+        Block until the waiter is completed.
+
+        :param      timeout_ms:  The maximum time to block, None blocks
+                                 until completed
+        :type       timeout_ms:  int
+
+        :returns:   Flag whether the waiter was completed
+        :rtype:     bool
+        """
+        if timeout_ms is None:
+            return self._lock.acquire()
+
+        try:
+            return self._lock.acquire(1, timeout_ms / 1000)
+        except TypeError:
+            # the lock of MicroPython has no timeout, the reader expires
+            # the request instead
+            return self._lock.acquire()
+
+
+class PipelinedTCP(TCP):
+    """
+    TCP master with several requests in flight on one connection
+
+    The master methods may be called from several threads at once, every
+    call sends its request right away as long as less than window requests
+    are in flight. A reader thread matches the responses to the waiting
+    calls by transaction ID, so they may complete out of order.
+    """
+    # time a call waits beyond the timeout for the reader to expire it
+    WAIT_MARGIN_MS = 200
+
+    def __init__(self, slave_ip, slave_port=502, timeout=5, window=4, connect=True):
+        self._window = window
+        self._slots = Queue(window)
+        for _ in range(window):
+            self._slots.put(None)
+
+        self._lock = _thread.allocate_lock()
+        self._send_lock = _thread.allocate_lock()
+        self._inflight = dict()
+
+        super().__init__(slave_ip, slave_port, timeout, connect)
+
+    @property
+    def window(self):
+        return self._window
+
+    @property
+    def inflight(self):
+        return len(self._inflight)
+
+    def connect(self):
+        with self._send_lock:
+            self._open()
+
+    def _open(self):
+        super().connect()
+        # bytes a reader of an earlier connection still receives must not
+        # end up in the frames of this one
+        _thread.start_new_thread(self._read_loop, (self._sock, MBAPReader()))
+
+    def close(self):
+        super().close()
+        self._fail_all(OSError('connection closed'))
+
+    def _fail_all(self, error):
+        with self._lock:
+            waiters = list(self._inflight.values())
+            self._inflight = dict()
+
+        for waiter, _ in waiters:
+            waiter.complete(None, error)
+
+    def _expire(self):
+        # fail the requests which waited longer than the timeout
+        now = time.ticks_ms()
+        expired = []
+
+        with self._lock:
+            for trans_id, (waiter, sent) in list(self._inflight.items()):
+                if time.ticks_diff(now, sent) >= self._timeout * 1000:
+                    del self._inflight[trans_id]
+                    expired.append(waiter)
+
+        for waiter in expired:
+            waiter.complete(None, OSError('response timeout'))
+
+    def _read_loop(self, sock, reader):
+        poller = select.poll()
+        poller.register(sock, select.POLLIN | select.POLLERR | select.POLLHUP)
+
+        while self._sock is sock:
+            # a lost response must not hold its window slot while other
+            # responses keep the connection busy
+            self._expire()
+
+            if not poller.poll(100):
+                continue
+
+            try:
+                data = sock.recv(reader.room)
+                if len(data) == 0:
+                    raise OSError('connection closed by peer')
+                reader.feed(data)
+
+                # one segment may carry several responses or a part of one
+                while True:
+                    pdu = reader.next_frame()
+                    if pdu is None:
+                        break
+
+                    with self._lock:
+                        entry = self._inflight.pop(reader.trans_id, None)
+
+                    # responses of expired requests are dropped
+                    if entry is not None:
+                        entry[0].complete((reader.unit_id, bytes(pdu)))
+            except Exception as e:
+                # the waiting calls must not outlive the reader
+                if self._sock is sock:
+                    super().close()
+                    self._fail_all(e)
+                break
+
+        try:
+            poller.unregister(sock)
+        except (OSError, ValueError):
+            # the socket was closed meanwhile
+            pass
+
+    def _wait(self, waiter, trans_id):
+        """
+        Wait for the response of a request.
+
+        The reader completes the waiter with the response or expires it
+        after the timeout. The own deadline only applies if the reader is
+        gone and the lock supports timeouts.
+
+        :param      waiter:    The waiter the reader completes
+        :type       waiter:    _Waiter
+        :param      trans_id:  The transaction ID of the request
+        :type       trans_id:  int
+
+        :returns:   The response as ((unit ID, PDU), None) or
+                    (None, exception)
+        :rtype:     tuple
+        """
+        if waiter.wait(int(self._timeout * 1000) + self.WAIT_MARGIN_MS):
+            return waiter.result
+
+        with self._lock:
+            entry = self._inflight.pop(trans_id, None)
+
+        if entry is None:
+            # completed meanwhile, the result is about to be set
+            waiter.wait()
+            return waiter.result
+
+        return None, OSError('response timeout')
+
+    def _send_receive(self, slave_id, modbus_pdu, count):
+        self._slots.get()
+        try:
+            waiter = _Waiter()
+
+            with self._send_lock:
+                if self._sock is None:
+                    self._open()
+
+                mbap_hdr, trans_id = self._create_mbap_hdr(slave_id, modbus_pdu)
+
+                # register before sending, the response may be quicker
+                with self._lock:
+                    self._inflight[trans_id] = (waiter, time.ticks_ms())
+
+                try:
+                    self._sock.send(mbap_hdr + modbus_pdu)
+                except OSError as e:
+                    with self._lock:
+                        self._inflight.pop(trans_id, None)
+                    self.close()
+                    raise e
+
+            response, error = self._wait(waiter, trans_id)
+        finally:
+            self._slots.put(None)
+
+        if error is not None:
+            raise error
+
+        return self._validate_resp_pdu(response[1],
+                                       response[0],
+                                       slave_id,
+                                       modbus_pdu[0],
+                                       count)
+
+
+class _Client(object):
+    """A client connection of the TCP server"""
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.reader = MBAPReader()
+        self.tx = bytearray()
+
+
 class TCPServer(object):
+    """
+    Modbus TCP server for several clients at once
+
+    All sockets are non-blocking and watched by one poll object. Every
+    client has its own framing buffer, requests sent back to back or split
+    over several segments are answered one after the other in the order
+    they were sent. Responses which do not fit in the socket send buffer
+    are kept and written once the socket is writable.
+    """
     def __init__(self):
         self._sock = None
-        self._client_sock = None
+        self._poller = None
+        self._clients = dict()
+        self._max_connections = 0
         self._is_bound = False
 
+        # the client and transaction ID of the request being answered
+        self._req_client = None
+        self._req_tid = 0
+        # the next client to take a request from, clients take turns
+        self._turn = 0
+
     def get_is_bound(self):
         return self._is_bound
 
-    def bind(self, local_ip, local_port=502, max_connections=10):
-        if self._client_sock:
-            self._client_sock.close()
+    @property
+    def connections(self):
+        return len(self._clients)
 
-        if self._sock:
-            self._sock.close()
+    def bind(self, local_ip, local_port=502, max_connections=10):
+        self.close()
 
         self._sock = socket.socket()
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
         # print(socket.getaddrinfo(local_ip, local_port))
         # [(2, 1, 0, '192.168.178.47', ('192.168.178.47', 502))]
         self._sock.bind(socket.getaddrinfo(local_ip, local_port)[0][-1])
 
         self._sock.listen(max_connections)
+        self._sock.setblocking(False)
+
+        self._poller = select.poll()
+        self._poller.register(self._sock, select.POLLIN)
+        self._max_connections = max_connections
 
         self._is_bound = True
 
+    def close(self):
+        """Close all client connections and the listening socket."""
+        for client in list(self._clients.values()):
+            self._close_client(client)
+
+        if self._sock is not None:
+            self._poller.unregister(self._sock)
+            self._sock.close()
+            self._sock = None
+
+        self._is_bound = False
+
+    def _key(self, obj):
+        # poll returns the socket on MicroPython and the descriptor on CPython
+        if isinstance(obj, int):
+            return obj
+
+        return obj.fileno() if hasattr(obj, 'fileno') else obj
+
+    def _accept(self):
+        try:
+            sock, address = self._sock.accept()
+        except OSError:
+            return
+
+        if len(self._clients) >= self._max_connections:
+            sock.close()
+            return
+
+        sock.setblocking(False)
+        self._poller.register(sock, select.POLLIN)
+        self._clients[self._key(sock)] = _Client(sock, address)
+
+    def _close_client(self, client):
+        if self._clients.pop(self._key(client.sock), None) is None:
+            return
+
+        self._poller.unregister(client.sock)
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+
+    def _receive(self, client):
+        # a full buffer holds complete requests, take them first
+        if client.reader.room == 0:
+            return
+
+        try:
+            data = client.sock.recv(client.reader.room)
+        except OSError:
+            data = b''
+
+        if len(data) == 0:
+            # closed by the client or reset
+            self._close_client(client)
+        else:
+            client.reader.feed(data)
+
+    def _flush(self, client):
+        if client.tx:
+            try:
+                sent = client.sock.send(client.tx)
+            except OSError as e:
+                if e.args[0] != 11:     # 11 = EAGAIN, send buffer full
+                    self._close_client(client)
+                    return
+                sent = 0
+
+            if sent:
+                del client.tx[:sent]
+
+        # only wait for writability while a response is pending
+        mask = select.POLLIN | select.POLLOUT if client.tx else select.POLLIN
+        self._poller.modify(client.sock, mask)
+
+    def _poll(self, timeout):
+        for obj, event in self._poller.poll(timeout):
+            key = self._key(obj)
+
+            if key == self._key(self._sock):
+                self._accept()
+                continue
+
+            client = self._clients.get(key)
+            if client is None:
+                continue
+
+            if event & (select.POLLERR | select.POLLHUP):
+                self._close_client(client)
+                continue
+
+            if event & select.POLLOUT:
+                self._flush(client)
+
+            if event & select.POLLIN:
+                self._receive(client)
+
+    def _take_adu(self, client):
+        # the request is a view into the framing buffer of the client, it
+        # stays valid until the client is polled again
+        try:
+            req_uid_and_pdu = client.reader.next_frame(include_unit=True)
+        except ValueError:
+            # print("Modbus request error: invalid MBAP header")
+            self._close_client(client)
+            return None
+
+        if req_uid_and_pdu is None:
+            return None
+
+        return client.reader.trans_id, req_uid_and_pdu
+
+    def _next_adu(self):
+        clients = list(self._clients.values())
+
+        for offset in range(len(clients)):
+            index = (self._turn + offset) % len(clients)
+            adu = self._take_adu(clients[index])
+            if adu is not None:
+                self._turn = index + 1
+                return clients[index], adu[0], adu[1]
+
+        return None
+
+    def _wait_adu(self, timeout):
+        if self._sock is None:
+            raise Exception('Modbus TCP server not bound')
+
+        if timeout is not None:
+            deadline = time.ticks_add(time.ticks_ms(), timeout)
+
+        while True:
+            adu = self._next_adu()
+            if adu is not None:
+                return adu
+
+            if timeout is None:
+                self._poll(-1)
+                continue
+
+            remaining = time.ticks_diff(deadline, time.ticks_ms())
+            self._poll(remaining if remaining > 0 else 0)
+
+            if remaining <= 0:
+                return self._next_adu()
+
     def _send(self, modbus_pdu, slave_addr):
-        size = len(modbus_pdu)
-        fmt = 'B' * size
-        adu = struct.pack('>HHHB' + fmt, self._req_tid, 0, size + 1, slave_addr, *modbus_pdu)
-        self._client_sock.send(adu)
+        self.send_adu(self._req_client, self._req_tid, slave_addr, modbus_pdu)
 
     def send_response(self,
                       slave_addr,
@@ -244,6 +837,13 @@ class TCPServer(object):
                                         signed)
         self._send(modbus_pdu, slave_addr)
 
+    def encode_response(self, slave_addr, modbus_pdu):
+        # the MBAP header depends on the transaction, only the PDU is kept
+        return bytes(modbus_pdu)
+
+    def send_encoded(self, slave_addr, frame):
+        self._send(frame, slave_addr)
+
     def send_exception_response(self,
                                 slave_addr,
                                 function_code,
@@ -252,81 +852,78 @@ class TCPServer(object):
                                                   exception_code)
         self._send(modbus_pdu, slave_addr)
 
-    def _accept_request(self, accept_timeout, unit_addr_list):
-        self._sock.settimeout(accept_timeout)
-        new_client_sock = None
-
-        try:
-            new_client_sock, client_address = self._sock.accept()
-        except OSError as e:
-            if e.args[0] != 11:     # 11 = timeout expired
-                raise e
-
-        if new_client_sock is not None:
-            if self._client_sock is not None:
-                self._client_sock.close()
-
-            self._client_sock = new_client_sock
+    def send_adu(self, client, trans_id, unit_id, modbus_pdu):
+        """
+        Send a raw response to a client.
+
+        The response is written without blocking, what does not fit in the
+        socket send buffer is written by the following polls.
+
+        :param      client:      The client of the request
+        :type       client:      _Client
+        :param      trans_id:    The transaction ID of the request
+        :type       trans_id:    int
+        :param      unit_id:     The unit ID of the request
+        :type       unit_id:     int
+        :param      modbus_pdu:  The response PDU
+        :type       modbus_pdu:  Union[bytes, bytearray, memoryview]
+
+        :raise      OSError:     The client is disconnected
+        """
+        if self._clients.get(self._key(client.sock)) is not client:
+            raise OSError('client disconnected')
+
+        client.tx.extend(struct.pack('>HHHB', trans_id, 0, len(modbus_pdu) + 1, unit_id))
+        client.tx.extend(modbus_pdu)
+        self._flush(client)
+
+    def get_adu(self, timeout=0):
+        """
+        Get a raw request without decoding it.
+
+        :param      timeout:  Time to wait for a request in milliseconds,
+                              None waits forever
+        :type       timeout:  int
+
+        :returns:   Client, transaction ID, unit ID and PDU of the request,
+                    None if there is none
+        :rtype:     Union[None, tuple]
+        """
+        while True:
+            adu = self._wait_adu(timeout)
+            if adu is None:
+                return None
 
-            # recv() timeout, setting to 0 might lead to the following error
-            # "Modbus request error: [Errno 11] EAGAIN"
-            # This is a socket timeout error
-            self._client_sock.settimeout(0.5)
+            client, req_tid, req_uid_and_pdu = adu
+            if len(req_uid_and_pdu) >= 2:
+                return client, req_tid, req_uid_and_pdu[0], req_uid_and_pdu[1:]
 
-        if self._client_sock is not None:
-            try:
-                req = self._client_sock.recv(128)
+    def get_request(self, unit_addr_list=None, timeout=None):
+        """
+        Get the next request of any client.
 
-                if len(req) == 0:
-                    return None
+        :param      unit_addr_list:  The unit IDs to answer, None for all
+        :type       unit_addr_list:  list
+        :param      timeout:         Time to wait for a request in
+                                     milliseconds, None waits forever
+        :type       timeout:         int
 
-                req_header_no_uid = req[:Const.MBAP_HDR_LENGTH - 1]
-                self._req_tid, req_pid, req_len = struct.unpack('>HHH', req_header_no_uid)
-                req_uid_and_pdu = req[Const.MBAP_HDR_LENGTH - 1:Const.MBAP_HDR_LENGTH + req_len - 1]
-            except OSError as e:
-                # MicroPython raises an OSError instead of socket.timeout
-                # print("Socket OSError aka TimeoutError: {}".format(e))
-                return None
-            except Exception as e:
-                # print("Modbus request error:", e)
-                self._client_sock.close()
-                self._client_sock = None
-                return None
+        :returns:   The request, None if there is none
+        :rtype:     Union[None, Request]
+        """
+        adu = self._wait_adu(timeout)
+        if adu is None:
+            return None
 
-            if (req_pid != 0):
-                # print("Modbus request error: PID not 0")
-                self._client_sock.close()
-                self._client_sock = None
-                return None
+        self._req_client, self._req_tid, req_uid_and_pdu = adu
 
-            if ((unit_addr_list is not None) and (req_uid_and_pdu[0] not in unit_addr_list)):
-                return None
+        if ((unit_addr_list is not None) and (req_uid_and_pdu[0] not in unit_addr_list)):
+            return None
 
-            try:
-                return Request(self, req_uid_and_pdu)
-            except ModbusException as e:
-                self.send_exception_response(req[0],
-                                             e.function_code,
-                                             e.exception_code)
-                return None
-
-    def get_request(self, unit_addr_list=None, timeout=None):
-        if self._sock is None:
-            raise Exception('Modbus TCP server not bound')
-
-        if timeout > 0:
-            start_ms = time.ticks_ms()
-            elapsed = 0
-            while True:
-                if self._client_sock is None:
-                    accept_timeout = None if timeout is None else (timeout - elapsed) / 1000
-                else:
-                    accept_timeout = 0
-                req = self._accept_request(accept_timeout, unit_addr_list)
-                if req:
-                    return req
-                elapsed = time.ticks_diff(start_ms, time.ticks_ms())
-                if elapsed > timeout:
-                    return None
-        else:
-            return self._accept_request(0, unit_addr_list)
+        try:
+            return Request(self, req_uid_and_pdu)
+        except ModbusException as e:
+            self.send_exception_response(req_uid_and_pdu[0],
+                                         e.function_code,
+                                         e.exception_code)
+            return None